@@ -18,11 +18,17 @@ from pathlib import Path
 import argparse
 import logging
 
+# Shared host tooling lives in <repo>/scripts
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'scripts'))
+from scan_profile import ScanProfile
+
 class FirmwareAnalyzer:
-    def __init__(self, firmware_path):
+    def __init__(self, firmware_path, profile=None):
         self.firmware_path = Path(firmware_path)
         self.firmware_data = None
         self.baseline = {}
+        # Phase timings and counters, emitted as baseline['timing']
+        self.profile = profile or ScanProfile()
         
         # Known UEFI/AMI signatures and patterns
         self.signatures = {
@@ -48,8 +54,9 @@ class FirmwareAnalyzer:
     def load_firmware(self):
         """Load firmware dump into memory"""
         try:
-            with open(self.firmware_path, 'rb') as f:
+            with self.profile.phase('load_firmware'), open(self.firmware_path, 'rb') as f:
                 self.firmware_data = f.read()
+            self.profile.count('bytes_read', len(self.firmware_data))
             logging.info(f"Loaded firmware: {len(self.firmware_data)} bytes")
             return True
         except Exception as e:
@@ -185,11 +192,19 @@ class FirmwareAnalyzer:
                 'hardware_model': 'ASUS ROG G615LP',
                 'bios_version': 'AS.325'
             },
-            'hashes': self.calculate_hashes(),
-            'signatures': self.find_signatures(),
-            'certificates': self.extract_certificates(),
-            'uefi_volumes': self.analyze_uefi_volumes(),
         }
+        try:
+            with self.profile.phase('calculate_hashes'):
+                self.baseline['hashes'] = self.calculate_hashes()
+            with self.profile.phase('find_signatures'):
+                self.baseline['signatures'] = self.find_signatures()
+            with self.profile.phase('extract_certificates'):
+                self.baseline['certificates'] = self.extract_certificates()
+            with self.profile.phase('analyze_uefi_volumes'):
+                self.baseline['uefi_volumes'] = self.analyze_uefi_volumes()
+        finally:
+            # Ends the profile's subprocess accounting (and writes any dumps)
+            self.profile.stop()
         
         # Add bootkit detection patterns
         self.baseline['bootkit_indicators'] = {
@@ -208,6 +223,7 @@ class FirmwareAnalyzer:
             ]
         }
         
+        self.baseline['timing'] = self.profile.report()
         logging.info("Baseline analysis complete")
         return self.baseline
 
@@ -229,6 +245,8 @@ def main():
                        default='firmware_baseline.json')
     parser.add_argument('-v', '--verbose', action='store_true', 
                        help='Verbose logging')
+    parser.add_argument('--profile-dump', metavar='PATH',
+                       help='Write cProfile (PATH.pstats) and tracemalloc (PATH.tracemalloc.txt) dumps')
     
     args = parser.parse_args()
     
@@ -245,7 +263,7 @@ def main():
         return 1
     
     # Create analyzer and process firmware
-    analyzer = FirmwareAnalyzer(args.firmware)
+    analyzer = FirmwareAnalyzer(args.firmware, ScanProfile(args.profile_dump))
     
     if not analyzer.load_firmware():
         return 1
@@ -21,13 +21,29 @@ from pathlib import Path
 import argparse
 import logging
 
+# Shared host tooling lives in <repo>/scripts
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'scripts'))
+from host_snapshot import HostSnapshot, is_snapshot
+from baseline_index import BaselineIndex
+from scan_profile import ScanProfile
+from scan_budget import ScanInterrupted, add_budget_arguments, budget_from_args
+
 class HardwareFirmwareRecovery:
-    def __init__(self, recovery_image_path, verify_only=False):
+    def __init__(self, recovery_image_path, verify_only=False, snapshot=None, budget=None,
+                 profile=None):
         self.recovery_image_path = Path(recovery_image_path)
-        self.verify_only = verify_only
+        # A HostSnapshot can only be verified against, never flashed
+        self.snapshot = snapshot
+        self.verify_only = verify_only or snapshot is not None
+        # Optional ScanBudget pacing image hashing on production hosts
+        self.budget = budget
+        # Phase timings and counters, emitted as results['timing']
+        self.profile = profile or ScanProfile()
         self.flash_chip = None
         self.flash_size = None
         self.backup_path = None
+        # Compiled baseline databases, by path; loaded once per run
+        self._baseline_indexes = {}
         
         # Hardware tools we'll use
         self.tools = {
@@ -116,6 +132,10 @@ class HardwareFirmwareRecovery:
         """Detect hardware platform and SPI flash chip"""
         logging.info("🔍 Detecting hardware platform...")
         
+        if self.snapshot:
+            self._detect_hardware_from_snapshot()
+            return
+        
         try:
             # Get system info via dmidecode
             result = subprocess.run([self.tools['dmidecode'], '-t', 'system'], 
@@ -146,6 +166,21 @@ class HardwareFirmwareRecovery:
             logging.warning(f"Hardware detection failed: {e}")
             self.results['warnings'].append(f"Hardware detection failed: {e}")
 
+    def _detect_hardware_from_snapshot(self):
+        """Populate hardware_detected from a captured host snapshot"""
+        detected = self.results['hardware_detected']
+        detected['snapshot'] = str(self.snapshot.path)
+        detected['manufacturer'] = self.snapshot.dmi_field('sys_vendor') or ''
+        detected['product'] = self.snapshot.dmi_field('product_name') or ''
+        system_info = self.snapshot.dmidecode('system')
+        if system_info:
+            detected['system_info'] = system_info
+        bios_info = self.snapshot.dmidecode('bios')
+        if bios_info:
+            detected['bios_info'] = bios_info
+        logging.info(f"  📦 Snapshot host: {self.snapshot.host_id} "
+                     f"({detected['manufacturer']} {detected['product']})")
+
     def detect_flash_chip(self):
         """Detect SPI flash chip using flashrom"""
         logging.info("🔍 Detecting SPI flash chip...")
@@ -558,7 +593,7 @@ class HardwareFirmwareRecovery:
             return False
 
     def load_firmware_baselines(self, baseline_db_path=None):
-        """Load known-good firmware baselines database"""
+        """Load known-good firmware baselines database (compiled index, memoized)"""
         if not baseline_db_path:
             # Check for default baseline database locations
             possible_paths = [
@@ -575,71 +610,63 @@ class HardwareFirmwareRecovery:
         if not baseline_db_path or not Path(baseline_db_path).exists():
             logging.warning("⚠️  No firmware baseline database found")
             logging.warning("   Cannot perform baseline integrity verification")
-            return {}
+            return None
+        
+        if baseline_db_path in self._baseline_indexes:
+            self.profile.count('cache_hits')
+            return self._baseline_indexes[baseline_db_path]
             
         try:
-            with open(baseline_db_path, 'r') as f:
-                baselines = json.load(f)
-                logging.info(f"📚 Loaded firmware baselines from: {baseline_db_path}")
-                return baselines.get('firmware_hashes', {})
+            with self.profile.phase('load_baselines'):
+                index = BaselineIndex.load(baseline_db_path)
+            if not index.compiled:
+                self.profile.count('cache_hits')
+            logging.info(f"📚 Loaded firmware baselines from: {baseline_db_path}")
         except Exception as e:
             logging.warning(f"Failed to load baseline database: {e}")
-            return {}
+            index = None
+        self._baseline_indexes[baseline_db_path] = index
+        return index
     
     def verify_against_baseline(self, firmware_hash, hardware_info=None):
         """Verify firmware hash against known-good baselines"""
         baselines = self.load_firmware_baselines()
         
-        if not baselines:
+        if not baselines or not baselines.firmware_hash_count:
             logging.info("🔍 No baselines available - cannot verify firmware integrity")
             return {'verified': False, 'reason': 'no_baselines', 'status': 'unknown'}
-            
+        
+        # Known-bad wins over any known-good listing
+        if baselines.is_known_malicious(firmware_hash):
+            logging.error("🚨 CRITICAL: Firmware matches KNOWN MALICIOUS hash!")
+            logging.error("   This firmware is confirmed to be compromised.")
+            return {
+                'verified': True, 
+                'baseline_match': 'known_malicious',
+                'status': 'malicious'
+            }
+        
+        matching_keys = baselines.known_good_keys(firmware_hash)
+        
         # Try to match against hardware-specific baselines first
-        if hardware_info:
+        if hardware_info and matching_keys:
             manufacturer = hardware_info.get('manufacturer', '').lower()
             product = hardware_info.get('product', '').lower()
             
-            # Look for hardware-specific entries
-            for baseline_key, baseline_data in baselines.items():
+            for baseline_key in matching_keys:
                 if manufacturer in baseline_key.lower() or product in baseline_key.lower():
-                    if isinstance(baseline_data, dict):
-                        baseline_hashes = baseline_data.get('hashes', [])
-                    else:
-                        baseline_hashes = [baseline_data] if isinstance(baseline_data, str) else []
-                    
-                    if firmware_hash.lower() in [h.lower() for h in baseline_hashes]:
-                        logging.info(f"✅ Firmware verified against baseline: {baseline_key}")
-                        return {
-                            'verified': True, 
-                            'baseline_match': baseline_key,
-                            'status': 'clean'
-                        }
+                    logging.info(f"✅ Firmware verified against baseline: {baseline_key}")
+                    return {
+                        'verified': True, 
+                        'baseline_match': baseline_key,
+                        'status': 'clean'
+                    }
         
         # Check against general known-good hashes
-        all_known_good = []
-        for baseline_data in baselines.values():
-            if isinstance(baseline_data, dict):
-                all_known_good.extend(baseline_data.get('hashes', []))
-            elif isinstance(baseline_data, str):
-                all_known_good.append(baseline_data)
-            elif isinstance(baseline_data, list):
-                all_known_good.extend(baseline_data)
-        
-        if firmware_hash.lower() in [h.lower() for h in all_known_good]:
+        if matching_keys:
             logging.info("✅ Firmware hash found in known-good baseline database")
             return {'verified': True, 'baseline_match': 'general', 'status': 'clean'}
         
-        # Check against known-bad hashes if available
-        known_bad = baselines.get('known_malicious', [])
-        if firmware_hash.lower() in [h.lower() for h in known_bad]:
-            logging.error("🚨 CRITICAL: Firmware matches KNOWN MALICIOUS hash!")
-            logging.error("   This firmware is confirmed to be compromised.")
-            return {
-                'verified': True, 
-                'baseline_match': 'known_malicious',
-                'status': 'malicious'
-            }
-        
         # Unknown hash - could be compromised
         logging.warning("⚠️  Firmware hash NOT found in baseline database")
         logging.warning("   This could indicate firmware compromise or a new/unknown version")
@@ -834,9 +861,15 @@ class HardwareFirmwareRecovery:
     def _calculate_file_hash(self, file_path):
         """Calculate SHA256 hash of a file"""
         sha256_hash = hashlib.sha256()
+        if self.budget is not None:
+            self.budget.apply()
         with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
                 sha256_hash.update(chunk)
+                self.profile.count('bytes_read', len(chunk))
+                if self.budget is not None:
+                    self.budget.charge(len(chunk))
+        self.profile.count('files_hashed')
         return sha256_hash.hexdigest()
 
     def save_results(self, output_path="hardware_recovery_results.json"):
@@ -850,47 +883,77 @@ class HardwareFirmwareRecovery:
 
     def run_recovery(self):
         """Execute the complete hardware recovery process"""
+        try:
+            with self.profile.phase('run_recovery'):
+                return self._run_recovery_steps()
+        finally:
+            self.profile.stop()
+            self.results['timing'] = self.profile.report()
+
+    def _run_recovery_steps(self):
         logging.info("🚀 PhoenixGuard Hardware-Level Firmware Recovery")
         logging.info("=" * 60)
         
+        if self.snapshot:
+            return self.run_snapshot_verification()
+        
         # Step 1: Check requirements
-        if not self.check_requirements():
-            return False
+        with self.profile.phase('check_requirements'):
+            if not self.check_requirements():
+                return False
         
         # Step 2: Detect hardware
-        self.detect_hardware_info()
+        with self.profile.phase('detect_hardware'):
+            self.detect_hardware_info()
         
         # Step 3: Detect flash chip
-        if not self.detect_flash_chip():
-            return False
+        with self.profile.phase('detect_flash_chip'):
+            if not self.detect_flash_chip():
+                return False
         
         # Step 4: Detect bootkit protections  
-        protections = self.detect_bootkit_protections()
+        with self.profile.phase('detect_protections'):
+            protections = self.detect_bootkit_protections()
         
         # Step 5: Bypass bootkit protections if detected
         if any([protections['spi_flash_locked'], protections['bios_write_enable_locked'], 
                 protections['protected_ranges_active'], protections['flash_descriptor_locked']]):
             logging.warning("🚨 BOOTKIT PROTECTIONS ACTIVE - attempting bypass...")
-            if not self.bypass_bootkit_protections():
-                logging.error("❌ Failed to bypass bootkit protections!")
-                logging.error("   This firmware recovery cannot proceed with hardware locks active.")
-                return False
+            with self.profile.phase('bypass_protections'):
+                if not self.bypass_bootkit_protections():
+                    logging.error("❌ Failed to bypass bootkit protections!")
+                    logging.error("   This firmware recovery cannot proceed with hardware locks active.")
+                    return False
         
         # Step 6: Verify recovery image
-        if not self.verify_recovery_image():
-            return False
+        with self.profile.phase('verify_image'):
+            if not self.verify_recovery_image():
+                return False
         
         # Step 7: Backup current firmware
-        if not self.backup_current_firmware():
-            return False
+        with self.profile.phase('backup'):
+            if not self.backup_current_firmware():
+                return False
         
         # Step 8: Perform recovery (if not verify-only)
-        if not self.hardware_firmware_recovery():
-            return False
+        with self.profile.phase('flash'):
+            if not self.hardware_firmware_recovery():
+                return False
         
         logging.info("\n🎉 Hardware firmware recovery process completed!")
         return True
 
+    def run_snapshot_verification(self):
+        """Verify a recovery image for a captured host without touching hardware"""
+        logging.info(f"📦 Offline verification against snapshot: {self.snapshot.path}")
+        with self.profile.phase('detect_hardware'):
+            self.detect_hardware_info()
+        with self.profile.phase('verify_image'):
+            if not self.verify_recovery_image():
+                return False
+        logging.info("\n🎉 Offline recovery image verification completed!")
+        return True
+
 def main():
     parser = argparse.ArgumentParser(
         description='PhoenixGuard Hardware-Level Firmware Recovery',
@@ -899,9 +962,14 @@ def main():
     parser.add_argument('recovery_image', help='Path to clean firmware image (e.g., G615LPAS.325)')
     parser.add_argument('--verify-only', action='store_true',
                        help='Only verify hardware/image, do not perform recovery')
+    parser.add_argument('--snapshot',
+                       help='Verify against a host snapshot archive instead of live hardware (implies --verify-only)')
     parser.add_argument('-v', '--verbose', action='store_true', help='Verbose logging')
     parser.add_argument('--output', help='Output results JSON file', 
                        default='hardware_recovery_results.json')
+    add_budget_arguments(parser, checkpoint=False)
+    parser.add_argument('--profile-dump', metavar='PATH',
+                       help='Write cProfile (PATH.pstats) and tracemalloc (PATH.tracemalloc.txt) dumps')
     
     args = parser.parse_args()
     
@@ -917,15 +985,24 @@ def main():
         logging.error(f"Recovery image not found: {args.recovery_image}")
         return 1
     
+    snapshot = None
+    if args.snapshot:
+        if not is_snapshot(args.snapshot):
+            logging.error(f"Snapshot not found or not an archive: {args.snapshot}")
+            return 1
+        snapshot = HostSnapshot(args.snapshot)
+    
     # Create recovery instance
-    recovery = HardwareFirmwareRecovery(args.recovery_image, args.verify_only)
+    recovery = HardwareFirmwareRecovery(args.recovery_image, args.verify_only, snapshot,
+                                        budget=budget_from_args(args),
+                                        profile=ScanProfile(args.profile_dump))
     
     try:
         success = recovery.run_recovery()
         recovery.save_results(args.output)
         
         if success:
-            if args.verify_only:
+            if recovery.verify_only:
                 print("\n✅ Hardware verification completed successfully!")
             else:
                 print("\n✅ Hardware firmware recovery completed!")
@@ -936,7 +1013,7 @@ def main():
             print("📊 Check results file for details:", args.output)
             return 1
             
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, ScanInterrupted):
         print("\n⚠️  Recovery interrupted by user")
         recovery.save_results(args.output)
         return 1
@@ -30,6 +30,11 @@ from cryptography import x509
 from cryptography.x509.oid import NameOID
 import tempfile
 
+# Module signature and module tree helpers live in <repo>/utils
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'utils'))
+from module_signature import is_signed
+from module_tree import ModuleTree
+
 class SecureBootAutoConfigurator:
     """Automatically configure SecureBoot with personal certificates"""
     
@@ -107,70 +112,29 @@ class SecureBootAutoConfigurator:
         return str(self.user_key_path), str(self.user_cert_path)
     
     def scan_kernel_modules(self):
-        """Scan for kernel modules that need signing"""
+        """Scan for kernel modules that need signing (loaded and out-of-tree, from modules.dep)"""
         print("🔍 SCANNING FOR KERNEL MODULES...")
         
         modules_to_sign = []
         
-        # Check loaded modules
         try:
-            with open('/proc/modules', 'r') as f:
-                loaded_modules = f.readlines()
-            
-            for line in loaded_modules:
-                module_name = line.split()[0]
-                module_path = self._find_module_path(module_name)
-                if module_path:
+            tree = ModuleTree()
+            loaded = tree.loaded()
+            for module in tree:
+                # Loaded modules, plus third-party (DKMS, extra/, updates/) ones
+                if module.name in loaded or not module.in_tree:
                     modules_to_sign.append({
-                        'name': module_name,
-                        'path': module_path,
-                        'loaded': True
+                        'name': module.name,
+                        'path': str(module.path),
+                        'loaded': module.name in loaded,
+                        'out_of_tree': not module.in_tree
                     })
         except Exception as e:
-            print(f"Error scanning loaded modules: {e}")
-        
-        # Check for third-party modules (DKMS, etc.)
-        dkms_modules = self._scan_dkms_modules()
-        modules_to_sign.extend(dkms_modules)
+            print(f"Error scanning kernel modules: {e}")
         
         print(f"Found {len(modules_to_sign)} modules to potentially sign")
         return modules_to_sign
     
-    def _find_module_path(self, module_name: str) -> str:
-        """Find the path to a kernel module"""
-        try:
-            result = subprocess.run([
-                'modinfo', '-n', module_name
-            ], capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                return result.stdout.strip()
-        except:
-            pass
-        return None
-    
-    def _scan_dkms_modules(self) -> list:
-        """Scan for DKMS-built modules"""
-        dkms_modules = []
-        dkms_path = Path('/var/lib/dkms')
-        
-        if dkms_path.exists():
-            for module_dir in dkms_path.iterdir():
-                if module_dir.is_dir():
-                    # Look for built modules
-                    for version_dir in module_dir.iterdir():
-                        if version_dir.is_dir():
-                            module_files = list(version_dir.rglob('*.ko'))
-                            for mod_file in module_files:
-                                dkms_modules.append({
-                                    'name': module_dir.name,
-                                    'path': str(mod_file),
-                                    'loaded': False,
-                                    'dkms': True
-                                })
-        
-        return dkms_modules
-    
     def auto_sign_modules(self, modules: list):
         """Automatically sign kernel modules"""
         print("AUTO-SIGNING KERNEL MODULES...")
@@ -201,14 +165,10 @@ class SecureBootAutoConfigurator:
         return signed_count > 0
     
     def _is_module_signed(self, module_path: str) -> bool:
-        """Check if a module is already signed"""
+        """Check if a module is already signed (appended signature trailer, no modinfo)"""
         try:
-            result = subprocess.run([
-                'modinfo', '-F', 'sig_id', module_path
-            ], capture_output=True, text=True)
-            
-            return result.returncode == 0 and result.stdout.strip()
-        except:
+            return is_signed(module_path)
+        except OSError:
             return False
     
     def _sign_module(self, module_path: str) -> bool:
@@ -17,7 +17,9 @@ Usage:
 """
 
 import os
+import sys
 import json
+import argparse
 import subprocess
 import requests
 from datetime import datetime
@@ -25,6 +27,12 @@ from pathlib import Path
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 
+# Shared host tooling lives in <repo>/scripts
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / 'scripts'))
+from efivars import efivar_store
+from efivar_classifier import classifier
+from hii_forms import setup_forms
+
 @dataclass
 class HardwareProfile:
     """Hardware profile data structure"""
@@ -39,8 +47,9 @@ class HardwareProfile:
     timestamp: str
 
 class UniversalHardwareScraper:
-    def __init__(self):
+    def __init__(self, bios_image: Optional[str] = None):
         self.profile = None
+        self.bios_image = bios_image  # firmware image for IFR setup forms (cached per BIOS version)
         self.database_url = "https://phoenixguard.example.com/api/hardware"  # Future API
         self.local_db_path = Path("hardware_database")
         self.local_db_path.mkdir(exist_ok=True)
@@ -195,14 +204,13 @@ class UniversalHardwareScraper:
         print("🔍 DISCOVERING UEFI VARIABLES...")
         
         variables = {}
-        efi_vars_path = Path("/sys/firmware/efi/efivars")
+        store = efivar_store()
         
-        if not efi_vars_path.exists():
+        if not store.available():
             print("❌ UEFI variables not accessible")
             return variables
         
-        var_files = list(efi_vars_path.glob("*"))
-        print(f"📊 Found {len(var_files)} UEFI variables")
+        print(f"📊 Found {len(store)} UEFI variables")
         
         # Categorize variables
         categories = {
@@ -214,21 +222,20 @@ class UniversalHardwareScraper:
             'unknown': []
         }
         
-        for var_file in var_files:
-            try:
-                var_name = var_file.name.split('-')[0]
-                var_info = {
-                    'name': var_name,
-                    'full_name': var_file.name,
-                    'size': var_file.stat().st_size,
-                    'category': self._categorize_variable(var_name)
-                }
-                
-                variables[var_name] = var_info
-                categories[var_info['category']].append(var_info)
-                
-            except Exception as e:
-                continue
+        all_vars = list(store)
+        assigned = classifier('scraper').classify_many([var.name for var in all_vars])
+        for var, category in zip(all_vars, assigned):
+            var_info = {
+                'name': var.name,
+                'full_name': var.full_name,
+                'guid': var.guid,
+                'size': var.size,
+                'attributes': var.attribute_names,
+                'category': category
+            }
+            
+            variables[var.name] = var_info
+            categories[var_info['category']].append(var_info)
         
         return {
             'total_count': len(variables),
@@ -237,21 +244,8 @@ class UniversalHardwareScraper:
         }
     
     def _categorize_variable(self, var_name: str) -> str:
-        """Categorize UEFI variable by name"""
-        name_lower = var_name.lower()
-        
-        if 'boot' in name_lower or var_name.startswith('Boot'):
-            return 'boot'
-        elif any(x in name_lower for x in ['secure', 'pk', 'kek', 'db']):
-            return 'security'  
-        elif any(x in name_lower for x in ['asus', 'dell', 'hp', 'lenovo', 'intel', 'amd']):
-            return 'vendor_specific'
-        elif any(x in name_lower for x in ['cpu', 'memory', 'perf', 'overclock']):
-            return 'performance'
-        elif any(x in name_lower for x in ['pci', 'usb', 'sata', 'nvme', 'device']):
-            return 'hardware'
-        else:
-            return 'unknown'
+        """Categorize UEFI variable by name (rules live in scripts/efivar_registry.json)"""
+        return classifier('scraper').classify(var_name)
     
     def analyze_hidden_features(self, hardware_info: Dict, uefi_vars: Dict) -> List[str]:
         """Analyze potentially hidden features"""
@@ -259,6 +253,15 @@ class UniversalHardwareScraper:
         
         hidden_features = []
         
+        # The BIOS's own setup forms say exactly which options the UI suppresses
+        forms = setup_forms(self.bios_image, hardware_info)
+        if forms:
+            hidden = forms.hidden()
+            if hidden:
+                hidden_features.append(f"Suppressed setup options ({len(hidden)} questions hidden by the BIOS UI)")
+                for q in hidden[:20]:
+                    hidden_features.append(f"Hidden option: {q['prompt']} ({q['varstore']}+0x{q['offset']:04x})")
+        
         # Check for vendor-specific variables that might indicate hidden features
         vendor_vars = uefi_vars.get('variables', {})
         vendor_count = uefi_vars.get('categories', {}).get('vendor_specific', 0)
@@ -469,7 +472,11 @@ def main():
     print("=" * 70)
     print()
     
-    scraper = UniversalHardwareScraper()
+    parser = argparse.ArgumentParser(description="PhoenixGuard Universal Hardware Scraper")
+    parser.add_argument("--bios-image", help="Firmware image of this BIOS, for its setup forms")
+    args = parser.parse_args()
+    
+    scraper = UniversalHardwareScraper(args.bios_image)
     
     print("🎯 SELECT ACTION:")
     print("1. Discover current hardware and create profile")
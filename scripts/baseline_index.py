@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard Compiled Baseline Index
+Binary, mmap-loaded companion to a firmware baseline JSON.
+
+Baselines carry every 4KB chunk digest of the firmware image, so a plain
+json.load dominates detector start-up. The index is compiled once next to
+the baseline (<baseline>.pgidx) and keyed by the baseline's SHA256:
+
+  header    magic, version, source size/mtime_ns/sha256, section table
+  META      baseline JSON minus the chunk list, plus the compiled pattern set
+  CHNK      chunk digests, 40-byte records (sha256 + u64 offset), sorted
+  REGN      region digests, 48-byte records (name[16] + sha256), sorted
+  GOOD      known-good firmware sha256s, 36-byte records (sha256 + u32 key id)
+  EVIL      known-malicious firmware sha256s, 32-byte records, sorted
+
+A size/mtime match with the header skips hashing the source; otherwise the
+source digest decides whether the index is reused or rebuilt. Lookups
+binary-search the mapped sections without materialising them.
+
+Usage:
+  python3 scripts/baseline_index.py build firmware_baseline.json
+  python3 scripts/baseline_index.py show firmware_baseline.json
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+from pathlib import Path
+
+INDEX_MAGIC = b'PGBIDX\x00\x01'
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.pgidx'
+FALLBACK_CACHE_DIR = 'out/cache/baseline_index'
+
+# magic, version, section count, source size, source mtime_ns, source sha256
+HEADER = struct.Struct('<8sII QQ 32s')
+SECTION = struct.Struct('<4sQQ')  # name, offset, length
+CHUNK_RECORD = struct.Struct('<32sQ')
+REGION_RECORD = struct.Struct('<16s32s')
+GOOD_RECORD = struct.Struct('<32sI')
+DIGEST_SIZE = 32
+
+
+class BaselineIndexError(Exception):
+    pass
+
+
+def _digest_bytes(value):
+    """Raw 32-byte digest from hex (or bytes); None if it is not a SHA256"""
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value) if len(value) == DIGEST_SIZE else None
+    try:
+        raw = bytes.fromhex(str(value).strip())
+    except ValueError:
+        return None
+    return raw if len(raw) == DIGEST_SIZE else None
+
+
+def _offset(value):
+    """Chunk offsets are ints or hex strings ('0x1000') depending on the analyzer"""
+    return int(value, 0) if isinstance(value, str) else int(value)
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.digest()
+
+
+def _compile_patterns(patterns):
+    """
+    One alternation regex for all suspicious patterns.
+
+    The regex runs as a lookahead at every position with the longest pattern
+    first, so at each position it reports the longest match; 'contains' maps
+    each pattern to the other patterns inside it, which also match there.
+    """
+    patterns = sorted({p for p in patterns if p}, key=lambda p: (-len(p), p))
+    contains = {p: [q for q in patterns if q != p and q in p] for p in patterns}
+    regex = '(?=(' + '|'.join(re.escape(p) for p in patterns) + '))' if patterns else ''
+    return {'regex': regex, 'contains': contains}
+
+
+def _firmware_hash_sets(firmware_hashes):
+    """Split a recovery 'firmware_hashes' database into good/malicious sets"""
+    keys, good, evil = [], [], set()
+    for key, data in (firmware_hashes or {}).items():
+        if key == 'known_malicious':
+            evil.update(d for d in map(_digest_bytes, data or []) if d)
+            continue
+        if isinstance(data, dict):
+            hashes = data.get('hashes', [])
+        elif isinstance(data, str):
+            hashes = [data]
+        elif isinstance(data, list):
+            hashes = data
+        else:
+            hashes = []
+        key_id = len(keys)
+        keys.append(key)
+        good.extend((d, key_id) for d in map(_digest_bytes, hashes) if d)
+    return keys, sorted(good), sorted(evil)
+
+
+def compile_index(baseline, source_size, source_mtime_ns, source_sha256):
+    """Serialise a parsed baseline into index bytes"""
+    hashes = dict(baseline.get('hashes') or {})
+    chunk_list = hashes.pop('chunk_hashes', None) or []
+
+    chunks = sorted(
+        (d, _offset(c.get('offset', 0))) for c in chunk_list
+        for d in [_digest_bytes(c.get('sha256'))] if d
+    )
+    regions = sorted(
+        (name[:-len('_sha256')].encode()[:16], d) for name, value in hashes.items()
+        if name.endswith('_sha256') for d in [_digest_bytes(value)] if d
+    )
+    keys, good, evil = _firmware_hash_sets(baseline.get('firmware_hashes'))
+
+    meta = {k: v for k, v in baseline.items() if k not in ('hashes', 'firmware_hashes')}
+    meta['hashes'] = {k: v for k, v in hashes.items() if not k.endswith('_sha256')}
+    meta['chunk_count'] = len(chunk_list)
+    meta['firmware_hash_keys'] = keys
+    meta['patterns'] = _compile_patterns(
+        (baseline.get('bootkit_indicators') or {}).get('suspicious_patterns', []))
+
+    sections = [
+        (b'META', json.dumps(meta, separators=(',', ':')).encode()),
+        (b'CHNK', b''.join(CHUNK_RECORD.pack(d, off) for d, off in chunks)),
+        (b'REGN', b''.join(REGION_RECORD.pack(n, d) for n, d in regions)),
+        (b'GOOD', b''.join(GOOD_RECORD.pack(d, k) for d, k in good)),
+        (b'EVIL', b''.join(evil)),
+    ]
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = []
+    for name, data in sections:
+        table.append(SECTION.pack(name, offset, len(data)))
+        offset += len(data)
+    header = HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(sections),
+                         source_size, source_mtime_ns, source_sha256)
+    return header + b''.join(table) + b''.join(data for _, data in sections)
+
+
+def _index_paths(baseline_path, cache_dir):
+    """Where an index may live: next to the baseline, else in the cache dir"""
+    location = hashlib.sha256(str(baseline_path.resolve()).encode()).hexdigest()[:16]
+    return [baseline_path.with_name(baseline_path.name + INDEX_SUFFIX),
+            Path(cache_dir) / f"{location}-{baseline_path.name}{INDEX_SUFFIX}"]
+
+
+def _restamp(index_path, st):
+    try:
+        with open(index_path, 'r+b') as f:
+            f.seek(16)
+            f.write(struct.pack('<QQ', st.st_size, st.st_mtime_ns))
+    except OSError:
+        pass
+
+
+class _Records:
+    """Sorted fixed-size records in a buffer, searchable by their digest prefix"""
+
+    def __init__(self, buf, record_size):
+        self.buf = buf
+        self.record_size = record_size
+        self.count = len(buf) // record_size
+
+    def __len__(self):
+        return self.count
+
+    def key(self, i):
+        start = i * self.record_size
+        return bytes(self.buf[start:start + DIGEST_SIZE])
+
+    def record(self, i):
+        start = i * self.record_size
+        return bytes(self.buf[start:start + self.record_size])
+
+    def find(self, digest):
+        """Index of the first record with this digest, or -1"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < digest:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.count and self.key(lo) == digest else -1
+
+    def find_all(self, digest):
+        i = self.find(digest)
+        while 0 <= i < self.count and self.key(i) == digest:
+            yield self.record(i)
+            i += 1
+
+
+class BaselineIndex:
+    """Read-only view over a compiled baseline index"""
+
+    def __init__(self, data, source_path=None, index_path=None):
+        self.source_path = source_path
+        self.index_path = index_path
+        self._buf = memoryview(data)
+        self._data = data
+        magic, version, count, self.source_size, self.source_mtime_ns, self.digest = \
+            HEADER.unpack_from(self._buf, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise BaselineIndexError('not a baseline index (or unsupported version)')
+        self._sections = {}
+        for i in range(count):
+            name, offset, length = SECTION.unpack_from(self._buf, HEADER.size + i * SECTION.size)
+            self._sections[name] = self._buf[offset:offset + length]
+
+        self.meta = json.loads(bytes(self._sections[b'META']))
+        self.chunks = _Records(self._sections[b'CHNK'], CHUNK_RECORD.size)
+        self._regions = _Records(self._sections[b'REGN'], REGION_RECORD.size)
+        self._good = _Records(self._sections[b'GOOD'], GOOD_RECORD.size)
+        self._evil = _Records(self._sections[b'EVIL'], DIGEST_SIZE)
+        self._pattern_regex = None
+        # True when this load had to compile the index from JSON
+        self.compiled = False
+
+    @classmethod
+    def load(cls, baseline_path, cache_dir=FALLBACK_CACHE_DIR):
+        """Open the index for a baseline, compiling it first if missing or stale"""
+        baseline_path = Path(baseline_path)
+        st = baseline_path.stat()
+        index_paths = _index_paths(baseline_path, cache_dir)
+        source_sha256 = None
+
+        for index_path in index_paths:
+            index = cls._open(index_path, baseline_path)
+            if index is None:
+                continue
+            if index.source_size == st.st_size and index.source_mtime_ns == st.st_mtime_ns:
+                return index
+            if source_sha256 is None:
+                source_sha256 = _file_sha256(baseline_path)
+            if index.digest == source_sha256:
+                # Same content, new mtime (copy, touch): refresh the fast path
+                _restamp(index_path, st)
+                return index
+            index.close()
+
+        # Stale or missing: parse the JSON once and compile it
+        with open(baseline_path, 'rb') as f:
+            raw = f.read()
+        data = compile_index(json.loads(raw), st.st_size, st.st_mtime_ns, hashlib.sha256(raw).digest())
+        for index_path in index_paths:
+            try:
+                index_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = index_path.with_name(index_path.name + '.tmp')
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, index_path)
+            except OSError as e:
+                logging.debug(f"Cannot write baseline index {index_path}: {e}")
+                continue
+            logging.debug(f"Compiled baseline index: {index_path}")
+            index = cls._open(index_path, baseline_path) or cls(data, baseline_path)
+            break
+        else:
+            index = cls(data, baseline_path)
+        index.compiled = True
+        return index
+
+    @classmethod
+    def _open(cls, index_path, source_path):
+        try:
+            with open(index_path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            return cls(mapped, source_path, index_path)
+        except (BaselineIndexError, struct.error, KeyError, ValueError):
+            mapped.close()
+            return None
+
+    def close(self):
+        if not isinstance(self._data, mmap.mmap):
+            return
+        for section in self._sections.values():
+            section.release()
+        self._buf.release()
+        try:
+            self._data.close()
+        except BufferError:
+            # A caller still holds a record view; the map goes with it
+            pass
+
+    @property
+    def baseline(self):
+        """The baseline as a dict, without the per-chunk digest list"""
+        return self.meta
+
+    @property
+    def metadata(self):
+        return self.meta.get('metadata', {})
+
+    @property
+    def suspicious_patterns(self):
+        return list(self.meta['patterns']['contains'])
+
+    def match_patterns(self, text):
+        """Suspicious patterns occurring in text, in one regex pass"""
+        patterns = self.meta['patterns']
+        if not patterns['regex']:
+            return []
+        if self._pattern_regex is None:
+            self._pattern_regex = re.compile(patterns['regex'])
+        found = set()
+        for match in self._pattern_regex.finditer(text):
+            longest = match.group(1)
+            if longest not in found:
+                found.add(longest)
+                found.update(patterns['contains'][longest])
+        return [p for p in patterns['contains'] if p in found]
+
+    def has_chunk(self, digest):
+        d = _digest_bytes(digest)
+        return d is not None and self.chunks.find(d) >= 0
+
+    def chunk_offsets(self, digest):
+        """Offsets in the baseline image where a chunk with this digest sits"""
+        d = _digest_bytes(digest)
+        if d is None:
+            return []
+        return [CHUNK_RECORD.unpack(r)[1] for r in self.chunks.find_all(d)]
+
+    def regions(self):
+        """{region name: sha256 hex} for every hashed region (incl. 'full')"""
+        out = {}
+        for i in range(len(self._regions)):
+            name, digest = REGION_RECORD.unpack(self._regions.record(i))
+            out[name.rstrip(b'\x00').decode()] = digest.hex()
+        return out
+
+    def region_digest(self, name):
+        return self.regions().get(name)
+
+    def known_good_keys(self, firmware_hash):
+        """Baseline keys listing this firmware hash as known-good"""
+        d = _digest_bytes(firmware_hash)
+        if d is None:
+            return []
+        keys = self.meta['firmware_hash_keys']
+        return [keys[GOOD_RECORD.unpack(r)[1]] for r in self._good.find_all(d)]
+
+    def is_known_malicious(self, firmware_hash):
+        d = _digest_bytes(firmware_hash)
+        return d is not None and self._evil.find(d) >= 0
+
+    @property
+    def firmware_hash_count(self):
+        return len(self._good) + len(self._evil)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PhoenixGuard Compiled Baseline Index')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Verbose logging')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='Compile (or refresh) the index for a baseline')
+    build.add_argument('baseline')
+    show = sub.add_parser('show', help='Summarise a baseline index')
+    show.add_argument('baseline')
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    try:
+        index = BaselineIndex.load(args.baseline)
+    except (OSError, ValueError, BaselineIndexError) as e:
+        logging.error(f"Cannot index baseline {args.baseline}: {e}")
+        return 1
+
+    print(f"🗂️  Index: {index.index_path or '(in memory)'}")
+    print(f"🔑 Baseline sha256: {index.digest.hex()}")
+    if args.command == 'show':
+        print(f"🧩 Chunks: {len(index.chunks)}")
+        print(f"📍 Regions: {', '.join(index.regions()) or 'none'}")
+        print(f"🔍 Patterns: {len(index.suspicious_patterns)}")
+        print(f"📚 Firmware hashes: {index.firmware_hash_count}")
+    index.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,552 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard Boot Entry Decoder
+Decodes Boot#### load options and their EFI device paths, resolves them to
+the files on the ESP that firmware would actually start, and hashes exactly
+those binaries.
+
+  - decode_device_path() / decode_load_option() parse EFI_DEVICE_PATH_PROTOCOL
+    nodes and EFI_LOAD_OPTION in-process (text form follows the UEFI spec's
+    device path to text conventions: PciRoot(0x0)/Pci(0x1d,0x0)/NVMe(...)/HD(...)/\\EFI\\...)
+  - HD nodes are matched to mounted partitions by GPT partition GUID
+    (/dev/disk/by-partuuid + /proc/self/mounts); --esp stands in when the
+    partition is not mounted here. Snapshots resolve against the captured
+    ESP digests only, never the analyzing machine's disks. An HD node without a
+    file path boots the removable-media default \\EFI\\BOOT\\BOOT<arch>.EFI.
+  - Decoded options are cached by the SHA256 of the variable, and target
+    digests by file size/mtime/ctime (or taken from an ESP scan that already
+    hashed them), so a repeat scan decodes and hashes nothing new.
+
+Usage:
+  python3 scripts/boot_entries.py [--esp /boot/efi] [--source DIR|SNAPSHOT] [--json]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import re
+import struct
+import sys
+import uuid
+from pathlib import Path
+
+from efivars import EFI_GLOBAL_VARIABLE_GUID
+from esp_scanner import hash_file
+
+DEFAULT_CACHE_PATH = 'out/cache/boot_entries.json'
+CACHE_VERSION = 1
+BOOT_OPTION_NAME = re.compile(r'^Boot[0-9A-Fa-f]{4}$')
+PARTUUID_DIR = Path('/dev/disk/by-partuuid')
+MOUNTS_PATH = '/proc/self/mounts'
+
+LOAD_OPTION_ACTIVE = 0x00000001
+LOAD_OPTION_FORCE_RECONNECT = 0x00000002
+LOAD_OPTION_HIDDEN = 0x00000008
+LOAD_OPTION_CATEGORY_MASK = 0x00001F00
+LOAD_OPTION_CATEGORY_APP = 0x00000100
+LOAD_OPTION_HEADER = struct.Struct('<IH')   # Attributes, FilePathListLength
+
+END_DEVICE_PATH = 0x7F
+END_INSTANCE = 0x01
+END_ENTIRE = 0xFF
+NODE_HEADER = struct.Struct('<BBH')
+
+# Removable-media default loader per architecture (UEFI spec 2.10, 3.5.1.1)
+REMOVABLE_LOADERS = {
+    'x86_64': 'BOOTX64.EFI', 'amd64': 'BOOTX64.EFI', 'i386': 'BOOTIA32.EFI', 'i686': 'BOOTIA32.EFI',
+    'aarch64': 'BOOTAA64.EFI', 'arm64': 'BOOTAA64.EFI', 'armv7l': 'BOOTARM.EFI', 'riscv64': 'BOOTRISCV64.EFI',
+}
+
+
+def _guid(raw):
+    return str(uuid.UUID(bytes_le=bytes(raw)))
+
+
+def _utf16(raw):
+    return bytes(raw).decode('utf-16-le', 'replace').split('\0', 1)[0]
+
+
+def _pci(body):
+    return f"Pci({body[1]:#x},{body[0]:#x})", {}
+
+
+def _acpi(body):
+    hid, uid = struct.unpack_from('<II', body)
+    if hid & 0xFFFF == 0x41D0 and hid >> 16 in (0x0A03, 0x0A08):
+        return f"PciRoot({uid:#x})", {}
+    return f"Acpi(PNP{hid >> 16:04X},{uid:#x})", {}
+
+
+def _sata(body):
+    hba, pmp, lun = struct.unpack_from('<HHH', body)
+    return f"Sata({hba:#x},{pmp:#x},{lun:#x})", {}
+
+
+def _scsi(body):
+    pun, lun = struct.unpack_from('<HH', body)
+    return f"Scsi({pun:#x},{lun:#x})", {}
+
+
+def _usb(body):
+    return f"USB({body[0]:#x},{body[1]:#x})", {}
+
+
+def _nvme(body):
+    nsid = struct.unpack_from('<I', body)[0]
+    eui = '-'.join(f"{b:02X}" for b in reversed(body[4:12]))
+    return f"NVMe({nsid:#x},{eui})", {}
+
+
+def _mac(body):
+    return f"MAC({bytes(body[:6]).hex()},{body[32]:#x})", {'network': True}
+
+
+def _ipv4(body):
+    return f"IPv4({'.'.join(map(str, body[4:8]))})", {'network': True}
+
+
+def _ipv6(body):
+    return f"IPv6({bytes(body[16:32]).hex()})", {'network': True}
+
+
+def _uri(body):
+    uri = bytes(body).decode('ascii', 'replace')
+    return f"Uri({uri})", {'network': True, 'uri': uri}
+
+
+def _vendor(prefix):
+    def decode(body):
+        return f"{prefix}({_guid(body[:16])})", {}
+    return decode
+
+
+def _hard_drive(body):
+    part, start, size = struct.unpack_from('<IQQ', body)
+    signature, mbr_type, sig_type = body[20:36], body[36], body[37]
+    fields = {'partition_number': part, 'partition_start': start, 'partition_size': size}
+    if sig_type == 2:
+        fields['partition_guid'] = _guid(signature)
+        return f"HD({part},GPT,{fields['partition_guid']},{start:#x},{size:#x})", fields
+    if sig_type == 1:
+        fields['mbr_signature'] = f"{struct.unpack_from('<I', signature)[0]:#010x}"
+        return f"HD({part},MBR,{fields['mbr_signature']},{start:#x},{size:#x})", fields
+    return f"HD({part},{mbr_type:#x},0,{start:#x},{size:#x})", fields
+
+
+def _cdrom(body):
+    entry, start, size = struct.unpack_from('<IQQ', body)
+    return f"CDROM({entry:#x},{start:#x},{size:#x})", {}
+
+
+def _file_path(body):
+    path = _utf16(body)
+    return path, {'file_path': path}
+
+
+def _fv_file(body):
+    guid = _guid(body[:16])
+    return f"FvFile({guid})", {'firmware_file': guid}
+
+
+def _fv(body):
+    return f"Fv({_guid(body[:16])})", {}
+
+
+def _bbs(body):
+    device_type = struct.unpack_from('<H', body)[0]
+    description = bytes(body[4:]).split(b'\0', 1)[0].decode('ascii', 'replace')
+    return f"BBS({device_type:#x},{description})", {'legacy': True}
+
+
+# (type, subtype) -> decoder(body) -> (text, fields)
+NODE_DECODERS = {
+    (0x01, 0x01): _pci,
+    (0x01, 0x04): _vendor('VenHw'),
+    (0x02, 0x01): _acpi,
+    (0x03, 0x02): _scsi,
+    (0x03, 0x05): _usb,
+    (0x03, 0x0A): _vendor('VenMsg'),
+    (0x03, 0x0B): _mac,
+    (0x03, 0x0C): _ipv4,
+    (0x03, 0x0D): _ipv6,
+    (0x03, 0x12): _sata,
+    (0x03, 0x17): _nvme,
+    (0x03, 0x18): _uri,
+    (0x04, 0x01): _hard_drive,
+    (0x04, 0x02): _cdrom,
+    (0x04, 0x03): _vendor('VenMedia'),
+    (0x04, 0x04): _file_path,
+    (0x04, 0x06): _fv_file,
+    (0x04, 0x07): _fv,
+    (0x05, 0x01): _bbs,
+}
+
+
+def decode_device_path(data, start=0, end=None):
+    """
+    Device path instances in data[start:end] as lists of node dicts
+    ({'type', 'subtype', 'text', ...decoded fields}).
+    """
+    end = len(data) if end is None else end
+    instances, nodes = [], []
+    pos = start
+    while pos + NODE_HEADER.size <= end:
+        node_type, sub_type, length = NODE_HEADER.unpack_from(data, pos)
+        if length < NODE_HEADER.size or pos + length > end:
+            raise ValueError(f"bad device path node length {length} at {pos}")
+        body = memoryview(data)[pos + NODE_HEADER.size:pos + length]
+        pos += length
+        if node_type == END_DEVICE_PATH:
+            instances.append(nodes)
+            nodes = []
+            if sub_type == END_ENTIRE:
+                break
+            continue
+        decoder = NODE_DECODERS.get((node_type, sub_type))
+        try:
+            text, fields = decoder(body) if decoder else (None, {})
+        except (struct.error, IndexError):
+            text, fields = None, {}
+        if text is None:
+            text = f"Path({node_type},{sub_type},{bytes(body).hex()})"
+        nodes.append(dict(fields, type=node_type, subtype=sub_type, text=text))
+    if nodes:
+        instances.append(nodes)
+    return instances
+
+
+def device_path_text(nodes):
+    """UEFI-style text for one device path instance"""
+    parts = []
+    for node in nodes:
+        if 'file_path' in node and parts and 'file_path' in parts[-1][1]:
+            # Consecutive file path nodes concatenate
+            parts[-1] = (parts[-1][0].rstrip('\\') + '\\' + node['text'].lstrip('\\'), node)
+        else:
+            parts.append((node['text'], node))
+    return '/'.join(text for text, _ in parts)
+
+
+def decode_load_option(data):
+    """EFI_LOAD_OPTION fields; raises ValueError if data is not one"""
+    if len(data) < LOAD_OPTION_HEADER.size + 2:
+        raise ValueError('load option too short')
+    attributes, path_len = LOAD_OPTION_HEADER.unpack_from(data)
+    pos = LOAD_OPTION_HEADER.size
+    while pos + 1 < len(data) and data[pos:pos + 2] != b'\0\0':
+        pos += 2
+    description = bytes(data[LOAD_OPTION_HEADER.size:pos]).decode('utf-16-le', 'replace')
+    path_start = pos + 2
+    if path_start + path_len > len(data):
+        raise ValueError('file path list runs past the variable')
+    instances = decode_device_path(data, path_start, path_start + path_len)
+    nodes = instances[0] if instances else []
+    option = {
+        'attributes': attributes,
+        'active': bool(attributes & LOAD_OPTION_ACTIVE),
+        'hidden': bool(attributes & LOAD_OPTION_HIDDEN),
+        'category': 'app' if attributes & LOAD_OPTION_CATEGORY_MASK == LOAD_OPTION_CATEGORY_APP else 'boot',
+        'description': description,
+        'device_path': device_path_text(nodes),
+        'extra_paths': [device_path_text(n) for n in instances[1:]],
+        'optional_data_size': len(data) - path_start - path_len,
+    }
+    files = [n['file_path'] for n in nodes if 'file_path' in n]
+    if files:
+        option['file_path'] = '\\' + '\\'.join(f.strip('\\') for f in files)
+    for node in nodes:
+        for key in ('partition_guid', 'partition_number', 'mbr_signature', 'firmware_file', 'uri'):
+            if key in node:
+                option[key] = node[key]
+        if node.get('network'):
+            option['network'] = True
+        if node.get('legacy'):
+            option['legacy'] = True
+    return option
+
+
+def removable_loader(machine=None):
+    """ESP-relative default loader path for removable media"""
+    loader = REMOVABLE_LOADERS.get((machine or platform.machine()).lower(), 'BOOTX64.EFI')
+    return f"EFI/BOOT/{loader}"
+
+
+def partuuid_mounts(partuuid_dir=PARTUUID_DIR, mounts_path=MOUNTS_PATH):
+    """GPT partition GUID -> mount point for mounted partitions"""
+    devices = {}
+    try:
+        with os.scandir(partuuid_dir) as it:
+            for entry in it:
+                devices[os.path.realpath(entry.path)] = entry.name.lower()
+    except OSError:
+        return {}
+    mounts = {}
+    try:
+        with open(mounts_path, 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0].startswith('/dev/'):
+                    partuuid = devices.get(os.path.realpath(fields[0]))
+                    if partuuid and partuuid not in mounts:
+                        mounts[partuuid] = fields[1].replace('\\040', ' ')
+    except OSError:
+        pass
+    return mounts
+
+
+class BootEntries:
+    """Boot#### options of a variable store, resolved to ESP files and hashed"""
+
+    def __init__(self, store, esp_path=None, esp_digests=None, cache_path=DEFAULT_CACHE_PATH,
+                 mounts=None, budget=None, offline=False):
+        self.store = store
+        # Snapshot of another host: resolve against esp_digests only, never this
+        # machine's partitions, mounts or files
+        self.offline = offline
+        # ESP used when a partition GUID is not mounted here (--esp, snapshot ESP)
+        self.esp_path = str(esp_path) if esp_path else None
+        # {relpath: sha256} from an ESP scan or snapshot, keyed case-insensitively
+        self.esp_digests = {k.lower(): v for k, v in (esp_digests or {}).items()}
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.mounts = {} if offline else mounts
+        self.budget = budget
+        self._listings = {}
+        self.cache = {'options': {}, 'targets': {}}
+        self.new_cache = {'options': {}, 'targets': {}}
+        self.stats = {'options': 0, 'decoded': 0, 'option_cache_hits': 0,
+                      'targets_hashed': 0, 'target_cache_hits': 0, 'bytes_hashed': 0}
+
+    def load_cache(self):
+        if not self.cache_path or not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                self.cache = {'options': data.get('options', {}), 'targets': data.get('targets', {})}
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable boot entry cache {self.cache_path}: {e}")
+
+    def save_cache(self):
+        """Keep what this run used, so the cache tracks the host's current entries"""
+        if not self.cache_path:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(dict(self.new_cache, version=CACHE_VERSION), f)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logging.warning(f"Failed to save boot entry cache: {e}")
+
+    def _u16_list(self, name):
+        data = self.store.read(name, EFI_GLOBAL_VARIABLE_GUID)
+        if not data:
+            return []
+        return list(struct.unpack_from(f'<{len(data) // 2}H', data))
+
+    def _option(self, var):
+        """Decoded load option for a Boot#### variable, via the digest cache"""
+        raw = var.raw
+        if raw is None:
+            return None
+        digest = hashlib.sha256(raw).hexdigest()
+        option = self.cache['options'].get(digest)
+        if option is not None:
+            self.stats['option_cache_hits'] += 1
+        else:
+            try:
+                option = decode_load_option(raw[4:])
+            except ValueError as e:
+                option = {'error': str(e)}
+            self.stats['decoded'] += 1
+        self.new_cache['options'][digest] = option
+        return dict(option, variable_sha256=digest)
+
+    def _mount_for(self, option):
+        guid = option.get('partition_guid')
+        if guid:
+            if self.mounts is None:
+                self.mounts = partuuid_mounts()
+            mount = self.mounts.get(guid.lower())
+            if mount:
+                return mount
+        return self.esp_path
+
+    def _find_ci(self, root, relpath):
+        """Actual path of relpath under root matched case-insensitively (FAT), else None"""
+        current = root
+        for part in relpath.split('/'):
+            listing = self._listings.get(current)
+            if listing is None:
+                try:
+                    listing = {name.lower(): name for name in os.listdir(current)}
+                except OSError:
+                    listing = {}
+                self._listings[current] = listing
+            name = listing.get(part.lower())
+            if name is None:
+                return None
+            current = os.path.join(current, name)
+        return current
+
+    def resolve(self, entry):
+        """Fill in where an entry's binary lives: target_status, esp, relpath, target"""
+        if 'error' in entry:
+            entry['target_status'] = 'undecodable'
+        elif entry.get('firmware_file'):
+            entry['target_status'] = 'firmware'
+        elif entry.get('network'):
+            entry['target_status'] = 'network'
+        elif entry.get('legacy'):
+            entry['target_status'] = 'legacy'
+        elif not (entry.get('partition_guid') or entry.get('partition_number') or entry.get('file_path')):
+            entry['target_status'] = 'unresolved'
+        else:
+            relpath = (entry.get('file_path') or '').replace('\\', '/').strip('/') or removable_loader()
+            entry['relpath'] = relpath
+            entry['implicit_loader'] = not entry.get('file_path')
+            mount = self._mount_for(entry)
+            entry['esp'] = mount
+            if mount is not None and not self.offline and os.path.isdir(mount):
+                entry['target'] = self._find_ci(mount, relpath)
+                entry['target_status'] = 'ok' if entry['target'] else 'missing'
+            elif mount is not None and mount == self.esp_path and relpath.lower() in self.esp_digests:
+                entry['target_status'] = 'ok'       # captured ESP of a snapshot
+            elif self.offline and mount is not None and self.esp_digests:
+                entry['target_status'] = 'missing'  # not in the captured ESP listing
+            else:
+                entry['target_status'] = 'unresolved'
+        return entry
+
+    def hash_target(self, entry):
+        """SHA256 of the resolved binary: ESP scan digest, stat-keyed cache, or a fresh hash"""
+        if entry.get('target_status') != 'ok':
+            return None
+        relpath = entry['relpath'].lower()
+        target = entry.get('target')
+        if target is None or (entry['esp'] == self.esp_path and relpath in self.esp_digests):
+            # Already hashed by the ESP scan (or captured in the snapshot)
+            digest = self.esp_digests.get(relpath)
+            entry['target_sha256'] = digest
+            return digest
+        try:
+            st = os.stat(target)
+        except OSError as e:
+            entry['target_status'] = 'missing'
+            entry['error'] = str(e)
+            return None
+        key = [st.st_size, st.st_mtime_ns, st.st_ctime_ns]
+        cached = self.cache['targets'].get(target) or self.new_cache['targets'].get(target)
+        if cached and cached.get('key') == key:
+            digest = cached['sha256']
+            self.stats['target_cache_hits'] += 1
+        else:
+            digest = hash_file(target, self.budget)
+            self.stats['targets_hashed'] += 1
+            self.stats['bytes_hashed'] += st.st_size
+        self.new_cache['targets'][target] = {'key': key, 'sha256': digest}
+        entry['target_sha256'] = digest
+        return digest
+
+    def analyze(self, hash_targets=True):
+        """Decoded, resolved (and hashed) entries plus BootOrder/BootCurrent/BootNext"""
+        self.load_cache()
+        order = self._u16_list('BootOrder')
+        current = self._u16_list('BootCurrent')
+        next_boot = self._u16_list('BootNext')
+        current = current[0] if current else None
+        next_boot = next_boot[0] if next_boot else None
+
+        entries = []
+        for var in self.store.find(guid=EFI_GLOBAL_VARIABLE_GUID):
+            if not BOOT_OPTION_NAME.match(var.name):
+                continue
+            self.stats['options'] += 1
+            entry = self._option(var)
+            if entry is None:
+                continue
+            number = int(var.name[4:], 16)
+            entry.update(variable=var.name, number=number,
+                         boot_order_index=order.index(number) if number in order else None,
+                         current=number == current, next=number == next_boot)
+            self.resolve(entry)
+            if hash_targets:
+                self.hash_target(entry)
+            entries.append(entry)
+        entries.sort(key=lambda e: (e['boot_order_index'] is None, e['boot_order_index'] or 0, e['number']))
+        self.save_cache()
+        return {
+            'boot_order': [f"Boot{n:04X}" for n in order],
+            'boot_current': f"Boot{current:04X}" if current is not None else None,
+            'boot_next': f"Boot{next_boot:04X}" if next_boot is not None else None,
+            'entries': entries,
+            'stats': dict(self.stats),
+        }
+
+
+def bootable(entry):
+    """True if firmware may start this entry: BootNext, BootCurrent, or active in BootOrder"""
+    if entry['next'] or entry['current']:
+        return True
+    return bool(entry.get('active')) and entry['boot_order_index'] is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PhoenixGuard Boot Entry Decoder')
+    parser.add_argument('--source', help='efivarfs-style directory, host snapshot or flash image (default: live efivarfs)')
+    parser.add_argument('--esp', help='ESP mount to use when a boot partition is not mounted here')
+    parser.add_argument('-c', '--cache', default=DEFAULT_CACHE_PATH, help='Decode/digest cache file')
+    parser.add_argument('--no-hash', action='store_true', help='Resolve targets without hashing them')
+    parser.add_argument('--json', action='store_true', help='Print the analysis as JSON')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Verbose logging')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    from efivars import open_store
+    store = open_store(args.source)
+    if not store.available():
+        print(f"❌ EFI variables not accessible: {store.source_label}")
+        return 1
+    esp_path, esp_digests = args.esp, None
+    snapshot = getattr(store, 'snapshot', None)
+    if snapshot is not None and not esp_path:
+        captured = snapshot.esp_digests()
+        if captured:
+            esp_path, esp_digests = captured['esp_path'], captured['digests']
+
+    # A snapshot describes another host: no local mounts, files or cache
+    offline = snapshot is not None
+    result = BootEntries(store, esp_path, esp_digests, None if offline else args.cache,
+                         offline=offline).analyze(hash_targets=not args.no_hash)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+
+    print(f"🥾 BootOrder: {','.join(result['boot_order']) or '-'}  "
+          f"BootCurrent: {result['boot_current'] or '-'}  BootNext: {result['boot_next'] or '-'}")
+    for entry in result['entries']:
+        flags = ('*' if entry.get('active') else ' ') + ('>' if entry['current'] else ' ')
+        print(f"{flags} {entry['variable']} {entry.get('description', '?'):<28} "
+              f"{entry.get('device_path', entry.get('error', ''))}")
+        if entry.get('target_status') == 'ok':
+            where = entry.get('target') or f"{entry['esp']}/{entry['relpath']}"
+            print(f"      ↳ {where}  {entry.get('target_sha256') or ''}")
+        else:
+            print(f"      ↳ [{entry.get('target_status')}]")
+    stats = result['stats']
+    print(f"📊 {stats['options']} option(s): {stats['decoded']} decoded, {stats['option_cache_hits']} cached; "
+          f"{stats['targets_hashed']} target(s) hashed, {stats['target_cache_hits']} cached")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -18,12 +18,52 @@ from pathlib import Path
 import argparse
 import logging
 
+from baseline_index import BaselineIndex
+from boot_entries import BootEntries, bootable, DEFAULT_CACHE_PATH as BOOT_DEFAULT_CACHE_PATH
+from efivars import efivar_store
+from esp_scanner import ESPScanner, parse_manifest_lines, DEFAULT_CACHE_PATH as ESP_DEFAULT_CACHE_PATH
+from scan_profile import ScanProfile
+from scan_budget import ScanInterrupted, add_budget_arguments, budget_from_args
+from host_snapshot import HostSnapshot, is_snapshot, host_identity, host_id_of
+from ingest_server import IngestClient
+from fpdt import (read_boot_record, boot_phases, detect_regressions, BootTimeHistory,
+                  DEFAULT_HISTORY_DIR as FPDT_DEFAULT_HISTORY_DIR)
+from tpm_eventlog import (TPMEventLog, EventLogError, diff_event_logs, verify_replay,
+                          read_live_pcrs, TPM_EVENT_LOG_PATH)
+
+# PCRs that measure executable code rather than configuration
+CODE_PCRS = (0, 2, 4)
+
 class BootkitHunter:
-    def __init__(self, baseline_path):
+    def __init__(self, baseline_path, esp_path=None, esp_manifest=None,
+                 esp_cache=ESP_DEFAULT_CACHE_PATH, snapshot=None, decode_smbios=True,
+                 good_eventlog=None, fpdt_history=FPDT_DEFAULT_HISTORY_DIR,
+                 budget=None, checkpoint_path=None, profile=None, boot_cache=BOOT_DEFAULT_CACHE_PATH):
         self.baseline_path = Path(baseline_path)
         self.baseline = None
+        self.baseline_index = None
+        self.esp_path = esp_path
+        self.esp_manifest = esp_manifest
+        self.esp_cache = esp_cache
+        # ESP digests from the ESP scan, reused for boot targets; decoded Boot#### cache
+        self.esp_digests = None
+        self.boot_cache = boot_cache
+        # Optional HostSnapshot: analyze a captured host instead of the live one
+        self.snapshot = snapshot
+        # Decoding snapshot SMBIOS spawns dmidecode; fleet scans turn it off
+        self.decode_smbios = decode_smbios
+        # Known-good TPM event log; falls back to baseline['measured_boot']
+        self.good_eventlog = good_eventlog
+        # Per-host FPDT boot-time series; None disables recording
+        self.fpdt_history = fpdt_history
+        # Optional ScanBudget pacing reads/CPU; checkpoint lets the ESP scan resume
+        self.budget = budget
+        self.checkpoint_path = checkpoint_path
+        # Phase timings and counters, emitted as detection_results['timing']
+        self.profile = profile or ScanProfile()
         self.detection_results = {
             'scan_timestamp': None,
+            'source': f"snapshot:{snapshot.path}" if snapshot else 'live',
             'threats_detected': [],
             'modifications_found': [],
             'risk_level': 'UNKNOWN',
@@ -33,8 +73,12 @@ class BootkitHunter:
     def load_baseline(self):
         """Load the firmware baseline for comparison"""
         try:
-            with open(self.baseline_path, 'r') as f:
-                self.baseline = json.load(f)
+            # Compiled index: mmap'd chunk/region tables instead of the full JSON
+            with self.profile.phase('load_baseline'):
+                self.baseline_index = BaselineIndex.load(self.baseline_path)
+            if not self.baseline_index.compiled:
+                self.profile.count('cache_hits')
+            self.baseline = self.baseline_index.baseline
             logging.info(f"Loaded baseline: {self.baseline['metadata']['firmware_file']}")
             return True
         except Exception as e:
@@ -53,22 +97,29 @@ class BootkitHunter:
             
             # For now, we'll simulate by reading system info
             # In production, this would use specialized tools like flashrom
-            current_info = {
-                'dmi_bios_vendor': self._read_dmi_field('bios_vendor'),
-                'dmi_bios_version': self._read_dmi_field('bios_version'),
-                'dmi_bios_date': self._read_dmi_field('bios_date'),
-                'efi_vars': self._scan_efi_variables(),
-                'system_firmware': self._get_firmware_info()
-            }
+            with self.profile.phase('dmi'):
+                current_info = {
+                    'dmi_bios_vendor': self._read_dmi_field('bios_vendor'),
+                    'dmi_bios_version': self._read_dmi_field('bios_version'),
+                    'dmi_bios_date': self._read_dmi_field('bios_date'),
+                }
+            with self.profile.phase('efivars'):
+                current_info['efi_vars'] = self._scan_efi_variables()
+            with self.profile.phase('firmware_info'):
+                current_info['system_firmware'] = self._get_firmware_info()
             
             return current_info
             
+        except ScanInterrupted:
+            raise
         except Exception as e:
             logging.error(f"Failed to read current firmware: {e}")
             return None
     
     def _read_dmi_field(self, field):
         """Read DMI/SMBIOS field"""
+        if self.snapshot:
+            return self.snapshot.dmi_field(field)
         try:
             with open(f'/sys/devices/virtual/dmi/id/{field}', 'r') as f:
                 return f.read().strip()
@@ -78,24 +129,28 @@ class BootkitHunter:
     def _scan_efi_variables(self):
         """Scan EFI variables for suspicious modifications"""
         efi_vars = {}
-        efi_path = Path('/sys/firmware/efi/efivars')
-        
-        if not efi_path.exists():
+        store = efivar_store(self.snapshot)
+        if not store.available():
             return efi_vars
-            
+        
         try:
-            for var_file in efi_path.glob('*'):
-                if var_file.is_file():
-                    try:
-                        # Read first 1KB of each EFI variable
-                        with open(var_file, 'rb') as f:
-                            data = f.read(1024)
-                        efi_vars[var_file.name] = {
-                            'size': len(data),
-                            'sha256': hashlib.sha256(data).hexdigest()
-                        }
-                    except:
-                        continue
+            for var in store:
+                # Digest covers the first 1KB (attributes + data) of each variable
+                fresh = not var.loaded
+                raw = var.raw
+                if raw is None:
+                    continue
+                data = raw[:1024]
+                if fresh and not self.snapshot:
+                    self.profile.count('bytes_read', len(raw))
+                    if self.budget is not None:
+                        self.budget.charge(len(raw))
+                efi_vars[var.full_name] = {
+                    'size': len(data),
+                    'sha256': hashlib.sha256(data).hexdigest()
+                }
+        except ScanInterrupted:
+            raise
         except Exception as e:
             logging.warning(f"EFI variables scan failed: {e}")
             
@@ -105,6 +160,15 @@ class BootkitHunter:
         """Get firmware info using system tools"""
         firmware_info = {}
         
+        if self.snapshot:
+            dmidecode_bios = self.snapshot.dmidecode('bios') if self.decode_smbios else None
+            if dmidecode_bios:
+                firmware_info['dmidecode_bios'] = dmidecode_bios
+            fwupd_devices = self.snapshot.fwupd_devices()
+            if fwupd_devices:
+                firmware_info['fwupd_devices'] = fwupd_devices
+            return firmware_info
+        
         try:
             # Use dmidecode to get detailed firmware info
             result = subprocess.run(['dmidecode', '-t', 'bios'], 
@@ -131,7 +195,7 @@ class BootkitHunter:
         
         # Check BIOS version consistency
         baseline_version = self.baseline['metadata']['bios_version']
-        current_version = current_info.get('dmi_bios_version', '')
+        current_version = current_info.get('dmi_bios_version') or ''
         
         if baseline_version not in current_version:
             modifications.append({
@@ -173,27 +237,26 @@ class BootkitHunter:
         # Check for bootkit indicators in firmware info
         firmware_text = str(current_info).lower()
         
-        for pattern in self.baseline['bootkit_indicators']['suspicious_patterns']:
-            if pattern in firmware_text:
-                threats.append({
-                    'type': 'PATTERN_MATCH',
-                    'severity': 'CRITICAL',
-                    'pattern': pattern,
-                    'details': f"Bootkit pattern '{pattern}' detected in firmware",
-                    'risk_indicators': ['known_bootkit_signature']
-                })
+        if self.baseline_index is not None:
+            matched = self.baseline_index.match_patterns(firmware_text)
+        else:
+            matched = [p for p in self.baseline['bootkit_indicators']['suspicious_patterns']
+                       if p in firmware_text]
+        for pattern in matched:
+            threats.append({
+                'type': 'PATTERN_MATCH',
+                'severity': 'CRITICAL',
+                'pattern': pattern,
+                'details': f"Bootkit pattern '{pattern}' detected in firmware",
+                'risk_indicators': ['known_bootkit_signature']
+            })
+        
+        with self.profile.phase('measured_boot'):
+            threats.extend(self.check_measured_boot())
         
         # Check for timing anomalies (bootkits often slow boot)
-        try:
-            with open('/proc/uptime', 'r') as f:
-                uptime = float(f.read().split()[0])
-            
-            # If system has been up for a very short time, check boot duration
-            if uptime < 300:  # Less than 5 minutes
-                # This would need more sophisticated boot time analysis
-                pass
-        except:
-            pass
+        with self.profile.phase('boot_timing'):
+            threats.extend(self.check_boot_timing())
         
         # Check for unusual firmware update activity
         firmware_info = current_info.get('system_firmware', {})
@@ -209,6 +272,223 @@ class BootkitHunter:
         
         return threats
     
+    def check_measured_boot(self):
+        """Replay the TPM event log and diff it against the known-good log"""
+        threats = []
+        try:
+            if self.snapshot:
+                raw = self.snapshot.tpm_event_log()
+                if raw is None:
+                    return threats
+                log = TPMEventLog(raw)
+            else:
+                if not TPM_EVENT_LOG_PATH.exists():
+                    return threats
+                log = TPMEventLog.from_file(TPM_EVENT_LOG_PATH)
+        except (OSError, EventLogError) as e:
+            threats.append({
+                'type': 'EVENTLOG_UNREADABLE',
+                'severity': 'MEDIUM',
+                'details': f"TPM event log could not be parsed: {e}",
+                'risk_indicators': ['eventlog_tampering']
+            })
+            return threats
+        
+        if not log.banks:
+            threats.append({
+                'type': 'EVENTLOG_UNREADABLE',
+                'severity': 'MEDIUM',
+                'details': "TPM event log declares no digest algorithms",
+                'risk_indicators': ['eventlog_tampering']
+            })
+            return threats
+        bank = 'sha256' if 'sha256' in log.banks else log.banks[0]
+        summary = {
+            'events': len(log.events),
+            'banks': log.banks,
+            'bank': bank,
+            'pcrs': {pcr: value.hex() for pcr, value in log.replay(bank).items()}
+        }
+        self.detection_results['measured_boot'] = summary
+        
+        # A firmware PCR replay that disagrees with the TPM means the log is not the boot that happened
+        if not self.snapshot:
+            mismatches = verify_replay(log, bank, read_live_pcrs(bank))
+            summary['replay_mismatches'] = mismatches
+            if mismatches:
+                threats.append({
+                    'type': 'PCR_REPLAY_MISMATCH',
+                    'severity': 'CRITICAL',
+                    'pcrs': [m['pcr'] for m in mismatches],
+                    'details': f"Event log replay disagrees with TPM for PCR(s) {', '.join(str(m['pcr']) for m in mismatches)}",
+                    'risk_indicators': ['eventlog_tampering', 'unmeasured_code']
+                })
+        
+        good_path = self.good_eventlog or (self.baseline or {}).get('measured_boot', {}).get('good_event_log')
+        if not good_path:
+            return threats
+        try:
+            diff = diff_event_logs(TPMEventLog.from_file(good_path), log)
+        except (OSError, EventLogError) as e:
+            logging.warning(f"Known-good event log unusable ({good_path}): {e}")
+            return threats
+        
+        summary['good_event_log'] = str(good_path)
+        summary['diff'] = diff
+        if not diff['identical']:
+            components = (
+                [dict(c, change='changed') for c in diff['changed']] +
+                [dict(pcr=a['pcr'], type=a['type'], description=a['description'], change='added') for a in diff['added']] +
+                [dict(pcr=r['pcr'], type=r['type'], description=r['description'], change='removed') for r in diff['removed']]
+            )
+            code_changed = any(c['pcr'] in CODE_PCRS and c['change'] != 'removed' for c in components)
+            threats.append({
+                'type': 'MEASURED_BOOT_CHANGED',
+                'severity': 'CRITICAL' if code_changed else 'HIGH',
+                'components': components,
+                'details': f"{len(components)} boot measurement(s) differ from known-good log",
+                'risk_indicators': ['boot_chain_modification']
+            })
+        return threats
+    
+    def check_boot_timing(self):
+        """Compare this boot's FPDT firmware phases with the host's own history"""
+        if self.snapshot:
+            record = self.snapshot.fpdt_boot_record()
+            host_id = self.snapshot.host_id
+            recorded_utc = self.snapshot.index.get('captured_utc')
+        else:
+            record = read_boot_record()
+            host_id = host_id_of(host_identity())
+            recorded_utc = None
+        if record is None:
+            return []
+        
+        phases = boot_phases(record)
+        self.detection_results['boot_timing'] = {
+            'source': record.get('source'),
+            'phases_ms': {p: round(v / 1e6, 2) if v is not None else None for p, v in phases.items()}
+        }
+        if not self.fpdt_history or not host_id:
+            return []
+        
+        try:
+            history = BootTimeHistory(self.fpdt_history, host_id)
+            regressions = detect_regressions(phases, history.record(record, recorded_utc))
+        except OSError as e:
+            logging.warning(f"Boot-time history unavailable: {e}")
+            return []
+        self.detection_results['boot_timing']['regressions'] = regressions
+        if not regressions:
+            return []
+        return [{
+            'type': 'BOOT_TIME_REGRESSION',
+            'severity': 'MEDIUM',
+            'phases': regressions,
+            'details': "Firmware boot slower than host history: " + ', '.join(
+                f"{r['phase']} {r['current_ms']}ms (median {r['median_ms']}ms)" for r in regressions),
+            'risk_indicators': ['boot_delay', 'firmware_implant']
+        }]
+    
+    def scan_esp_integrity(self):
+        """Verify ESP bootloaders against Allowed.manifest.sha256"""
+        if not self.esp_path and self.snapshot:
+            return self._scan_snapshot_esp()
+        if not self.esp_path:
+            return []
+        if not Path(self.esp_path).is_dir():
+            logging.warning(f"ESP path not found, skipping ESP scan: {self.esp_path}")
+            return []
+        
+        scanner = ESPScanner(self.esp_path, self.esp_manifest, self.esp_cache,
+                             budget=self.budget, checkpoint_path=self.checkpoint_path)
+        esp_results = scanner.scan()
+        self.esp_digests = esp_results['digests']
+        self.profile.count('bytes_read', esp_results['bytes_hashed'])
+        self.profile.count('files_hashed', esp_results['files_hashed'])
+        self.profile.count('cache_hits', esp_results['cache_hits'])
+        self.detection_results['esp_scan'] = {
+            key: esp_results[key] for key in
+            ('esp_path', 'manifest_path', 'files_scanned', 'files_hashed', 'cache_hits',
+             'resumed', 'interrupted', 'unknown', 'missing', 'changed', 'errors')
+        }
+        return scanner.findings()
+    
+    def _scan_snapshot_esp(self):
+        """Compare ESP digests captured in the snapshot with its manifest"""
+        captured = self.snapshot.esp_digests()
+        if not captured:
+            return []
+        manifest_text = self.snapshot.esp_manifest()
+        self.esp_digests = captured['digests']
+        scanner = ESPScanner(captured['esp_path'], cache_path=None, use_cache=False)
+        scanner.results['digests'] = captured['digests']
+        scanner.results['files_scanned'] = len(captured['digests'])
+        scanner.results['errors'] = list(captured.get('errors', []))
+        if manifest_text is None:
+            scanner.results['errors'].append('manifest not captured')
+        scanner.compare(parse_manifest_lines(manifest_text.splitlines()) if manifest_text else {})
+        self.detection_results['esp_scan'] = {
+            key: scanner.results[key] for key in
+            ('esp_path', 'files_scanned', 'unknown', 'missing', 'changed', 'errors')
+        }
+        return scanner.findings()
+    
+    def scan_boot_entries(self):
+        """Decode Boot#### options and check the binaries firmware would actually boot"""
+        store = efivar_store(self.snapshot)
+        if not store.available():
+            return []
+        esp_path = self.esp_path
+        if self.snapshot and not esp_path:
+            captured = self.snapshot.esp_digests()
+            esp_path = captured['esp_path'] if captured else None
+        
+        # A snapshot's boot targets come only from its captured ESP digests
+        analyzer = BootEntries(store, esp_path, self.esp_digests,
+                               cache_path=None if self.snapshot else self.boot_cache, budget=self.budget,
+                               offline=bool(self.snapshot))
+        try:
+            result = analyzer.analyze()
+        except ScanInterrupted:
+            logging.warning("Boot entry scan interrupted before targets were hashed")
+            return []
+        stats = result['stats']
+        self.profile.count('bytes_read', stats['bytes_hashed'])
+        self.profile.count('files_hashed', stats['targets_hashed'])
+        self.profile.count('cache_hits', stats['option_cache_hits'] + stats['target_cache_hits'])
+        self.detection_results['boot_entries'] = result
+        
+        # Targets on the scanned ESP that its allowed manifest does not list
+        esp_scan = self.detection_results.get('esp_scan') or {}
+        manifest_checked = esp_scan and not any(e.startswith('manifest not') for e in esp_scan.get('errors', []))
+        unlisted = {u['path'].lower() for u in esp_scan.get('unknown', [])} if manifest_checked else set()
+        
+        findings = []
+        candidates = [e for e in result['entries'] if bootable(e)]
+        untrusted = [e for e in candidates if e.get('target_status') == 'ok' and e.get('esp') == esp_path
+                     and e['relpath'].lower() in unlisted]
+        dangling = [e for e in candidates if e.get('target_status') == 'missing' and e['next']]
+        if untrusted:
+            findings.append({
+                'type': 'UNVERIFIED_BOOT_TARGET',
+                'severity': 'HIGH',
+                'details': "Firmware boot entries start binaries missing from the allowed manifest: " + ', '.join(
+                    f"{e['variable']} ({e.get('description')}) -> {e['relpath']}" for e in untrusted),
+                'entries': [{k: e.get(k) for k in ('variable', 'description', 'device_path', 'relpath', 'target_sha256')}
+                            for e in untrusted],
+                'risk_indicators': ['unauthorized_bootloader', 'boot_entry_persistence']
+            })
+        if dangling:
+            findings.append({
+                'type': 'BOOT_NEXT_DANGLING',
+                'severity': 'MEDIUM',
+                'details': "BootNext points at a missing file: " + ', '.join(
+                    f"{e['variable']} -> {e['relpath']}" for e in dangling),
+                'risk_indicators': ['boot_configuration_change']
+            })
+        return findings
+    
     def calculate_risk_level(self, threats, modifications):
         """Calculate overall risk level based on findings"""
         critical_count = sum(1 for t in threats + modifications if t['severity'] == 'CRITICAL')
@@ -241,28 +521,62 @@ class BootkitHunter:
     
     def scan_for_bootkits(self):
         """Main bootkit detection scan"""
+        try:
+            return self._scan_for_bootkits()
+        finally:
+            # Ends the profile's subprocess accounting (and writes any dumps)
+            self.profile.stop()
+            if 'timing' in self.detection_results:
+                self.detection_results['timing'] = self.profile.report()
+
+    def _scan_for_bootkits(self):
         logging.info("🔍 Starting bootkit detection scan...")
         self.detection_results['scan_timestamp'] = datetime.utcnow().isoformat()
+        if self.budget is not None:
+            self.budget.apply()
         
         # Read current firmware state
-        current_info = self.read_current_firmware()
+        try:
+            with self.profile.phase('read_firmware'):
+                current_info = self.read_current_firmware()
+        except ScanInterrupted:
+            logging.warning("Scan stopped before firmware state was read")
+            return False
         if not current_info:
             logging.error("Failed to read current firmware")
             return False
         
         # Analyze for modifications
-        modifications = self.analyze_modifications(current_info)
+        with self.profile.phase('analyze_modifications'):
+            modifications = self.analyze_modifications(current_info)
+        with self.profile.phase('esp_scan'):
+            modifications.extend(self.scan_esp_integrity())
+        with self.profile.phase('boot_entries'):
+            modifications.extend(self.scan_boot_entries())
         self.detection_results['modifications_found'] = modifications
+        if self.budget is not None:
+            self.detection_results['budget'] = self.budget.summary()
+            # A stopped ESP scan reports nothing yet; the verdict is partial
+            self.detection_results['interrupted'] = self.budget.stopped
         
         # Detect bootkit patterns
-        threats = self.detect_bootkit_patterns(current_info)
+        with self.profile.phase('detect_patterns'):
+            threats = self.detect_bootkit_patterns(current_info)
         self.detection_results['threats_detected'] = threats
         
         # Calculate risk and recommendation
         risk_level = self.calculate_risk_level(threats, modifications)
+        action = self.recommend_action(risk_level, threats, modifications)
+        if self.detection_results.get('interrupted'):
+            # Never record a partial scan as CLEAN; keep what it did find alongside
+            self.detection_results['partial_risk_level'] = risk_level
+            # Only findings that already warrant recovery outrank finishing the scan
+            if risk_level not in ('CRITICAL', 'HIGH'):
+                action = 'RESUME_SCAN'
+            risk_level = 'INCOMPLETE'
         self.detection_results['risk_level'] = risk_level
-        self.detection_results['recommended_action'] = self.recommend_action(
-            risk_level, threats, modifications)
+        self.detection_results['recommended_action'] = action
+        self.detection_results['timing'] = self.profile.report()
         
         logging.info(f"Scan complete - Risk Level: {risk_level}")
         return True
@@ -274,7 +588,17 @@ class BootkitHunter:
         print(f"\n🎯 PhoenixGuard Bootkit Detection Results")
         print(f"{'='*50}")
         print(f"⏰ Scan Time: {results['scan_timestamp']}")
-        print(f"⚠️  Risk Level: {results['risk_level']}")
+        if self.snapshot:
+            print(f"📦 Snapshot: {self.snapshot.path} (host {self.snapshot.host_id})")
+        print(f"⚠️  Risk Level: {results['risk_level']}"
+              + (f" (partial scan: {results['partial_risk_level']})" if 'partial_risk_level' in results else ""))
+        timing = results.get('timing')
+        if timing and timing['phases']:
+            slowest = max(timing['phases'].items(), key=lambda item: item[1]['seconds'])
+            print(f"⏱️  Scan Duration: {timing['total_seconds']:.3f}s "
+                  f"(slowest phase: {slowest[0]} {slowest[1]['seconds']:.3f}s)")
+        if results.get('interrupted'):
+            print("⏸️  Scan interrupted: results are partial, rerun with the same --checkpoint to resume")
         print(f"🎯 Action: {results['recommended_action']}")
         print()
         
@@ -308,8 +632,13 @@ class BootkitHunter:
             print("🔍 Medium risk: Further investigation needed")
         elif action == 'MONITOR':
             print("👁️  Low risk: Continue monitoring")
+        elif action == 'RESUME_SCAN':
+            print(f"⏸️  Scan incomplete (partial verdict: {results.get('partial_risk_level')}): "
+                  "rerun with the same --checkpoint")
         else:
             print("✅ System appears clean")
+        if results.get('interrupted') and action != 'RESUME_SCAN':
+            print("⏸️  Scan incomplete: rerun with the same --checkpoint once recovery is handled")
     
     def save_results(self, output_path):
         """Save detection results to file"""
@@ -321,16 +650,48 @@ class BootkitHunter:
         except Exception as e:
             logging.error(f"Failed to save results: {e}")
             return False
+    
+    def send_results(self, ingest_url):
+        """Stream detection results, tagged with the host identity, to an ingest server"""
+        if self.snapshot:
+            host = self.snapshot.host
+            host_id, source = self.snapshot.host_id, str(self.snapshot.path)
+        else:
+            host = host_identity()
+            host_id, source = host_id_of(host), 'live'
+        record = dict(self.detection_results, host_id=host_id,
+                      hostname=host.get('hostname'), source=source)
+        client = IngestClient(ingest_url)
+        client.send(record)
+        if client.close():
+            logging.info(f"Results sent to: {client.url}")
+            return True
+        return False
 
 def main():
     parser = argparse.ArgumentParser(description='PhoenixGuard Bootkit Detection Engine')
     parser.add_argument('-b', '--baseline', help='Firmware baseline JSON file',
                        default='firmware_baseline.json')
-    parser.add_argument('-o', '--output', help='Output detection results JSON',
-                       default='bootkit_detection.json')
+    parser.add_argument('-o', '--output',
+                       help='Output detection results JSON (fleet mode: NDJSON report, default out/logs/fleet_scan.ndjson)')
+    parser.add_argument('--esp', help='Mounted ESP to verify against Allowed.manifest.sha256')
+    parser.add_argument('--esp-manifest', help='Allowed manifest (default: <esp>/EFI/PhoenixGuard/Allowed.manifest.sha256)')
+    parser.add_argument('--esp-cache', default=ESP_DEFAULT_CACHE_PATH, help='ESP digest cache file')
+    parser.add_argument('--boot-cache', default=BOOT_DEFAULT_CACHE_PATH, help='Decoded Boot#### / boot target digest cache file')
+    parser.add_argument('--good-eventlog', help='Known-good TPM event log to diff measured boot against')
+    parser.add_argument('--fpdt-history', default=FPDT_DEFAULT_HISTORY_DIR,
+                       help='Directory of per-host FPDT boot-time series')
+    parser.add_argument('--snapshot', help='Analyze a host snapshot archive (scripts/host_snapshot.py) instead of the live system')
+    parser.add_argument('--fleet', help='Fleet mode: scan every snapshot archive in this directory')
+    parser.add_argument('--baseline-library', help='Fleet mode: directory of baseline JSON files (default: --baseline)')
+    parser.add_argument('-j', '--jobs', type=int, help='Fleet mode: worker processes (default: CPU count)')
+    parser.add_argument('--ingest-url', help='Stream results to an ingest server (scripts/ingest_server.py)')
     parser.add_argument('-v', '--verbose', action='store_true', help='Verbose logging')
     parser.add_argument('--auto-recovery', action='store_true',
                        help='Automatically trigger recovery on critical threats')
+    add_budget_arguments(parser)
+    parser.add_argument('--profile-dump', metavar='PATH',
+                       help='Write cProfile (PATH.pstats) and tracemalloc (PATH.tracemalloc.txt) dumps')
     
     args = parser.parse_args()
     
@@ -341,8 +702,25 @@ def main():
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
     
+    if args.fleet:
+        from fleet_scan import run_fleet_scan, print_fleet_summary
+        summary = run_fleet_scan(args.fleet, args.baseline_library or args.baseline,
+                                 args.output or 'out/logs/fleet_scan.ndjson', args.jobs,
+                                 ingest_url=args.ingest_url)
+        if summary is None:
+            return 1
+        print_fleet_summary(summary)
+        return 0
+    
+    snapshot = None
+    if args.snapshot:
+        if not is_snapshot(args.snapshot):
+            logging.error(f"Snapshot not found or not an archive: {args.snapshot}")
+            return 1
+        snapshot = HostSnapshot(args.snapshot)
+    
     # Check if running as root (needed for firmware access)
-    if os.geteuid() != 0:
+    if os.geteuid() != 0 and not snapshot:
         print("⚠️  Warning: Not running as root. Some firmware checks may be limited.")
         print("   For full detection capabilities, run: sudo python3 detect_bootkit.py")
     
@@ -353,7 +731,11 @@ def main():
         return 1
     
     # Create bootkit hunter and run scan
-    hunter = BootkitHunter(args.baseline)
+    hunter = BootkitHunter(args.baseline, esp_path=args.esp, esp_manifest=args.esp_manifest,
+                           esp_cache=args.esp_cache, snapshot=snapshot,
+                           good_eventlog=args.good_eventlog, fpdt_history=args.fpdt_history,
+                           budget=budget_from_args(args), checkpoint_path=args.checkpoint,
+                           profile=ScanProfile(args.profile_dump), boot_cache=args.boot_cache)
     
     if not hunter.load_baseline():
         return 1
@@ -363,10 +745,15 @@ def main():
     
     # Display and save results
     hunter.print_detection_results()
-    hunter.save_results(args.output)
+    hunter.save_results(args.output or 'bootkit_detection.json')
+    if args.ingest_url:
+        hunter.send_results(args.ingest_url)
     
-    # Auto-recovery if requested and critical threat detected
-    if args.auto_recovery and hunter.detection_results['risk_level'] == 'CRITICAL':
+    # Auto-recovery if requested and critical threat detected (live host only)
+    if args.auto_recovery and snapshot:
+        print("ℹ️  Auto-recovery skipped: results come from a snapshot, not this host")
+    elif args.auto_recovery and hunter.detection_results.get(
+            'partial_risk_level', hunter.detection_results['risk_level']) == 'CRITICAL':
         print("\n🚨 AUTO-RECOVERY TRIGGERED!")
         print("Launching PhoenixGuard recovery in 10 seconds...")
         time.sleep(10)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard EFI Variable Classifier
+Table-driven variable categories and a vendor GUID registry.
+
+Categories come from ordered (category, regex) rule sets in
+efivar_registry.json. Each rule set compiles into one alternation with a
+named group per category, matched against the lower-cased variable name;
+the first rule that matches wins, as in the if/elif chains it replaces.
+Names no rule claims fall back to the GUID registry (a rule set may send
+non-standard vendor GUIDs to their own category) and then to a default.
+
+classify_many() runs the pattern once over all names joined by newlines, so
+a full variable set is categorized in a single regex pass.
+
+Usage:
+  python3 scripts/efivar_classifier.py [--rule-set scraper] [--source DIR|SNAPSHOT|IMAGE]
+"""
+
+import argparse
+import json
+import re
+import sys
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+REGISTRY_PATH = Path(__file__).resolve().parent / 'efivar_registry.json'
+
+
+class GuidRegistry:
+    """Vendor GUID -> {vendor, namespace, standard}"""
+
+    def __init__(self, guids):
+        self.guids = {guid.lower(): info for guid, info in guids.items()}
+        self.standard = frozenset(guid for guid, info in self.guids.items() if info.get('standard'))
+
+    def lookup(self, guid):
+        return self.guids.get(guid.lower()) if guid else None
+
+    def vendor(self, guid):
+        info = self.lookup(guid)
+        return info['vendor'] if info else None
+
+    def is_standard(self, guid):
+        return bool(guid) and guid.lower() in self.standard
+
+
+class VariableClassifier:
+    """Ordered name rules compiled into a single named-group alternation"""
+
+    def __init__(self, rules, default='unknown', nonstandard_guid=None, registry=None):
+        self.categories = [category for category, _ in rules]
+        alternation = '|'.join(f"(?P<{category}>{pattern})" for category, pattern in rules)
+        self.pattern = re.compile(f"^(?:{alternation})", re.MULTILINE)
+        self.default = default
+        self.nonstandard_guid = nonstandard_guid
+        self.registry = registry
+
+    def _fallback(self, guid):
+        if self.nonstandard_guid and guid is not None and self.registry and not self.registry.is_standard(guid):
+            return self.nonstandard_guid
+        return self.default
+
+    def classify(self, name, guid=None):
+        m = self.pattern.match(name.lower())
+        return m.lastgroup if m else self._fallback(guid)
+
+    def classify_many(self, names, guids=None):
+        """Categories for many names (parallel guids optional) in one regex pass"""
+        names = [name.lower() for name in names]
+        if not names:
+            return []
+        text = '\n'.join(names)
+        line_at = {}
+        offset = 0
+        for i, name in enumerate(names):
+            line_at[offset] = i
+            offset += len(name) + 1
+        categories = [None] * len(names)
+        for m in self.pattern.finditer(text):
+            i = line_at.get(m.start())
+            if i is not None and categories[i] is None:
+                categories[i] = m.lastgroup
+        guids = guids if guids is not None else [None] * len(names)
+        return [category or self._fallback(guid) for category, guid in zip(categories, guids)]
+
+
+@lru_cache(maxsize=None)
+def _load(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def guid_registry(path=REGISTRY_PATH):
+    """Shared GUID registry from the registry file"""
+    return GuidRegistry(_load(str(path))['guids'])
+
+
+@lru_cache(maxsize=None)
+def classifier(rule_set='discovery', path=REGISTRY_PATH):
+    """Shared classifier for a named rule set from the registry file"""
+    spec = _load(str(path))['rule_sets'][rule_set]
+    return VariableClassifier(spec['rules'], spec.get('default', 'unknown'),
+                              spec.get('nonstandard_guid'), guid_registry(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Categorize EFI variables with the shared rule tables')
+    parser.add_argument('--rule-set', default='discovery', help='Rule set in efivar_registry.json')
+    parser.add_argument('--source', help='efivarfs-style directory, host snapshot or flash image (default: live efivarfs)')
+    parser.add_argument('-l', '--list', action='store_true', help='Print every variable with its category')
+    args = parser.parse_args()
+
+    from efivars import open_store
+    store = open_store(args.source)
+    variables = list(store)
+    categories = classifier(args.rule_set).classify_many([v.name for v in variables],
+                                                         [v.guid for v in variables])
+    registry = guid_registry()
+    if args.list:
+        for var, category in sorted(zip(variables, categories), key=lambda p: (p[1], p[0].name)):
+            print(f"{category:<16} {var.name:<40} {registry.vendor(var.guid) or var.guid}")
+    print(f"📊 {len(variables)} variable(s) from {store.source_label}:")
+    for category, count in Counter(categories).most_common():
+        print(f"   {category:<16} {count}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
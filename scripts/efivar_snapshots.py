@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard EFI Variable Snapshot Store
+Append-only history of a host's EFI variables with boot-to-boot diffs.
+
+Each snapshot is a set of (name, guid, attributes, digest, size) rows in
+SQLite; variable contents live once per SHA-256 digest in a blob table, so a
+boot where nothing changed costs a few hundred small rows and no data. A
+whole-set digest per snapshot makes "did anything change" a single compare,
+and diff() joins two snapshots on the (guid, name) key in SQL.
+
+compact() applies retention: runs of identical consecutive snapshots
+collapse to their first member, anything beyond the newest N per host is
+dropped (the newest snapshot is always kept), and blobs no snapshot
+references any more are removed.
+
+Usage:
+  sudo python3 scripts/efivar_snapshots.py record
+  python3 scripts/efivar_snapshots.py list
+  python3 scripts/efivar_snapshots.py diff 12 15
+  python3 scripts/efivar_snapshots.py compact --keep 60
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from efivars import efivar_store
+
+DEFAULT_DB_PATH = 'out/cache/efivar_snapshots.db'
+BOOT_ID_PATH = Path('/proc/sys/kernel/random/boot_id')
+DEFAULT_KEEP = 90
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    taken_utc TEXT NOT NULL,
+    host_id TEXT,
+    boot_id TEXT,
+    source TEXT,
+    variable_count INTEGER NOT NULL,
+    content_digest TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_host ON snapshots(host_id, id);
+CREATE TABLE IF NOT EXISTS blobs (
+    digest BLOB PRIMARY KEY,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snapshot_vars (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    guid TEXT NOT NULL,
+    name TEXT NOT NULL,
+    attributes INTEGER,
+    size INTEGER NOT NULL,
+    digest BLOB,
+    PRIMARY KEY (snapshot_id, guid, name)
+) WITHOUT ROWID;
+"""
+
+# Rows of snapshot a (second parameter) with no identical row in snapshot b
+# (first parameter); b columns are NULL when the variable is missing there
+DIFF_SQL = """
+SELECT a.guid, a.name, a.attributes, b.attributes, a.size, b.size, a.digest, b.digest
+FROM snapshot_vars a LEFT JOIN snapshot_vars b
+  ON b.snapshot_id = ? AND b.guid = a.guid AND b.name = a.name
+WHERE a.snapshot_id = ?
+  AND (b.name IS NULL OR a.digest IS NOT b.digest OR a.attributes IS NOT b.attributes)
+"""
+
+
+def read_boot_id():
+    try:
+        return BOOT_ID_PATH.read_text().strip()
+    except OSError:
+        return None
+
+
+def _hex(digest):
+    return digest.hex() if digest is not None else None
+
+
+class VariableSnapshotStore:
+    """SQLite-backed, deduplicated EFI variable snapshots"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def record(self, store, host_id=None, boot_id=None, taken_utc=None):
+        """
+        Add a snapshot of every variable in an EfiVariableStore.
+
+        A snapshot for the same (host_id, boot_id) is only added once; its id
+        is returned instead.
+        """
+        if boot_id:
+            row = self.conn.execute('SELECT id FROM snapshots WHERE host_id IS ? AND boot_id = ?',
+                                    (host_id, boot_id)).fetchone()
+            if row:
+                return row[0]
+
+        rows, blobs = [], {}
+        for var in store:
+            raw = var.raw
+            digest = None
+            if raw is not None:
+                data = raw[4:]
+                digest = hashlib.sha256(data).digest()
+                blobs.setdefault(digest, data)
+            rows.append((var.guid, var.name, var.attributes, var.size, digest))
+        rows.sort()
+        content = hashlib.sha256()
+        for guid, name, attributes, size, digest in rows:
+            content.update(f"{guid}\0{name}\0{attributes}\0{size}\0".encode())
+            content.update(digest or b'-')
+
+        with self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO snapshots (taken_utc, host_id, boot_id, source, variable_count, content_digest) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (taken_utc or datetime.utcnow().isoformat(), host_id, boot_id,
+                 store.source_label, len(rows), content.hexdigest()))
+            snapshot_id = cursor.lastrowid
+            self.conn.executemany('INSERT OR IGNORE INTO blobs (digest, data) VALUES (?, ?)', blobs.items())
+            self.conn.executemany(
+                'INSERT INTO snapshot_vars (snapshot_id, guid, name, attributes, size, digest) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(snapshot_id,) + row for row in rows])
+        return snapshot_id
+
+    def snapshots(self, host_id=None):
+        sql = 'SELECT id, taken_utc, host_id, boot_id, source, variable_count, content_digest FROM snapshots'
+        args = ()
+        if host_id:
+            sql += ' WHERE host_id = ?'
+            args = (host_id,)
+        cursor = self.conn.execute(sql + ' ORDER BY id', args)
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def latest(self, host_id=None, before=None):
+        """Id of the newest snapshot for a host (optionally older than `before`)"""
+        sql = 'SELECT id FROM snapshots WHERE host_id IS ?'
+        args = [host_id]
+        if before is not None:
+            sql += ' AND id < ?'
+            args.append(before)
+        row = self.conn.execute(sql + ' ORDER BY id DESC LIMIT 1', args).fetchone()
+        return row[0] if row else None
+
+    def blob(self, digest):
+        """Variable data for a digest (bytes or hex string)"""
+        if isinstance(digest, str):
+            digest = bytes.fromhex(digest)
+        row = self.conn.execute('SELECT data FROM blobs WHERE digest = ?', (digest,)).fetchone()
+        return row[0] if row else None
+
+    def diff(self, old_id, new_id):
+        """Variables added, removed and changed from snapshot old_id to new_id"""
+        digests = dict(self.conn.execute('SELECT id, content_digest FROM snapshots WHERE id IN (?, ?)',
+                                         (old_id, new_id)))
+        for snapshot_id in (old_id, new_id):
+            if snapshot_id not in digests:
+                raise KeyError(f"no such snapshot: {snapshot_id}")
+        result = {'old': old_id, 'new': new_id, 'added': [], 'removed': [], 'changed': []}
+        if digests[old_id] == digests[new_id]:
+            return result
+
+        # Removed and changed: rows of old without an identical row in new
+        for guid, name, old_attrs, new_attrs, old_size, new_size, old_digest, new_digest in \
+                self.conn.execute(DIFF_SQL, (new_id, old_id)):
+            entry = {'name': name, 'guid': guid}
+            if new_size is None:
+                result['removed'].append(dict(entry, attributes=old_attrs, size=old_size,
+                                              digest=_hex(old_digest)))
+            else:
+                result['changed'].append(dict(entry, old_attributes=old_attrs, new_attributes=new_attrs,
+                                              old_size=old_size, new_size=new_size,
+                                              old_digest=_hex(old_digest), new_digest=_hex(new_digest)))
+        # Added: rows of new with no row at all in old
+        for guid, name, attrs, _old_attrs, size, old_size, digest, _old_digest in \
+                self.conn.execute(DIFF_SQL, (old_id, new_id)):
+            if old_size is None:
+                result['added'].append({'name': name, 'guid': guid, 'attributes': attrs,
+                                        'size': size, 'digest': _hex(digest)})
+        return result
+
+    def compact(self, keep=DEFAULT_KEEP, collapse_unchanged=True):
+        """Apply retention per host and drop unreferenced blobs; returns counts"""
+        doomed = []
+        for (host_id,) in self.conn.execute('SELECT DISTINCT host_id FROM snapshots').fetchall():
+            history = self.conn.execute('SELECT id, content_digest FROM snapshots WHERE host_id IS ? '
+                                        'ORDER BY id', (host_id,)).fetchall()
+            newest = history[-1][0]
+            survivors = []
+            previous = None
+            for snapshot_id, content_digest in history:
+                if collapse_unchanged and content_digest == previous and snapshot_id != newest:
+                    doomed.append(snapshot_id)
+                else:
+                    survivors.append(snapshot_id)
+                previous = content_digest
+            if keep and len(survivors) > keep:
+                doomed.extend(survivors[:-keep])
+
+        with self.conn:
+            self.conn.executemany('DELETE FROM snapshot_vars WHERE snapshot_id = ?', [(i,) for i in doomed])
+            self.conn.executemany('DELETE FROM snapshots WHERE id = ?', [(i,) for i in doomed])
+            blobs = self.conn.execute(
+                'DELETE FROM blobs WHERE digest NOT IN '
+                '(SELECT DISTINCT digest FROM snapshot_vars WHERE digest IS NOT NULL)').rowcount
+        if doomed or blobs:
+            self.conn.execute('VACUUM')
+        return {'snapshots_removed': len(doomed), 'blobs_removed': blobs}
+
+
+def record_snapshot(db_path, snapshot=None):
+    """Record the live host (or a HostSnapshot) and diff it against the previous snapshot"""
+    from host_snapshot import host_identity, host_id_of
+    store = efivar_store(snapshot)
+    if snapshot:
+        host_id, boot_id = snapshot.host_id, None
+        taken_utc = snapshot.index.get('captured_utc')
+    else:
+        host_id, boot_id, taken_utc = host_id_of(host_identity()), read_boot_id(), None
+    with VariableSnapshotStore(db_path) as history:
+        snapshot_id = history.record(store, host_id, boot_id, taken_utc)
+        previous = history.latest(host_id, before=snapshot_id)
+        changes = history.diff(previous, snapshot_id) if previous else None
+    return snapshot_id, changes
+
+
+def _print_diff(diff):
+    print(f"🔀 Snapshot {diff['old']} -> {diff['new']}: {len(diff['added'])} added, "
+          f"{len(diff['removed'])} removed, {len(diff['changed'])} changed")
+    for var in diff['added']:
+        print(f"   + {var['name']}-{var['guid']} ({var['size']} bytes)")
+    for var in diff['removed']:
+        print(f"   - {var['name']}-{var['guid']}")
+    for var in diff['changed']:
+        what = []
+        if var['old_digest'] != var['new_digest']:
+            what.append(f"data {var['old_size']}->{var['new_size']} bytes")
+        if var['old_attributes'] != var['new_attributes']:
+            what.append(f"attributes 0x{var['old_attributes'] or 0:x}->0x{var['new_attributes'] or 0:x}")
+        print(f"   ~ {var['name']}-{var['guid']} ({', '.join(what)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PhoenixGuard EFI Variable Snapshot Store')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='Snapshot database')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Verbose logging')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rec = sub.add_parser('record', help="Record this boot's variables (or a host snapshot's)")
+    rec.add_argument('--snapshot', help='Host snapshot archive instead of the live efivarfs')
+
+    lst = sub.add_parser('list', help='List stored snapshots')
+    lst.add_argument('--host-id')
+
+    dif = sub.add_parser('diff', help='Diff two snapshots')
+    dif.add_argument('old', type=int)
+    dif.add_argument('new', type=int)
+    dif.add_argument('--json', action='store_true', help='Print the diff as JSON')
+
+    cmp_ = sub.add_parser('compact', help='Apply retention and drop unreferenced data')
+    cmp_.add_argument('--keep', type=int, default=DEFAULT_KEEP, help='Snapshots kept per host')
+    cmp_.add_argument('--keep-unchanged', action='store_true',
+                      help='Keep consecutive snapshots whose variables did not change')
+
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    if args.command == 'record':
+        snapshot = None
+        if args.snapshot:
+            from host_snapshot import HostSnapshot
+            snapshot = HostSnapshot(args.snapshot)
+        snapshot_id, changes = record_snapshot(args.db, snapshot)
+        print(f"📸 Snapshot {snapshot_id} recorded in {args.db}")
+        if changes:
+            _print_diff(changes)
+        return 0
+
+    with VariableSnapshotStore(args.db) as history:
+        if args.command == 'list':
+            for snap in history.snapshots(args.host_id):
+                print(f"{snap['id']:>6}  {snap['taken_utc']}  {snap['host_id']}  "
+                      f"{snap['variable_count']} vars  {snap['content_digest'][:12]}")
+        elif args.command == 'diff':
+            try:
+                diff = history.diff(args.old, args.new)
+            except KeyError as e:
+                logging.error(str(e))
+                return 1
+            if args.json:
+                print(json.dumps(diff, indent=2))
+            else:
+                _print_diff(diff)
+        elif args.command == 'compact':
+            counts = history.compact(args.keep, not args.keep_unchanged)
+            print(f"🧹 Removed {counts['snapshots_removed']} snapshot(s), {counts['blobs_removed']} blob(s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard EFI Variable Access
+One efivarfs reader shared by discovery, analysis and detection.
+
+An EfiVariableStore lists its source once with a single os.scandir pass and
+keeps compact EfiVariable records. A variable's contents are read on first
+access and memoized, so a process touches each variable file at most once no
+matter how many tools look at it. The same interface covers:
+
+  - the live efivarfs (/sys/firmware/efi/efivars)
+  - any directory laid out like it (copied dumps, HostSnapshot.efivars_dir())
+  - a HostSnapshot archive, read straight from the zip
+  - a flash image's NVRAM stores (nvram_store.FirmwareImageStore)
+
+  store = efivar_store()                     # live, shared per process
+  store = efivar_store(snapshot)             # the snapshot's own store
+  var = store.get('SecureBoot', EFI_GLOBAL_VARIABLE_GUID)
+  var.attributes, var.attribute_names, var.data
+
+Usage:
+  python3 scripts/efivars.py [--source DIR|SNAPSHOT|IMAGE] [--guid GUID]
+"""
+
+import argparse
+import os
+import struct
+import sys
+from pathlib import Path
+
+EFIVARS_PATH = Path('/sys/firmware/efi/efivars')
+EFI_GLOBAL_VARIABLE_GUID = '8be4df61-93ca-11d2-aa0d-00e098032b8c'
+EFI_IMAGE_SECURITY_DATABASE_GUID = 'd719b2cb-3d3a-4596-a3bc-dad00e67656f'
+
+GUID_LENGTH = 36
+ATTRIBUTES_SIZE = 4
+
+# UEFI spec 2.10, 8.2 Variable Services
+EFI_VARIABLE_ATTRIBUTES = (
+    (0x00000001, 'NV'),
+    (0x00000002, 'BS'),
+    (0x00000004, 'RT'),
+    (0x00000008, 'HW_ERROR_RECORD'),
+    (0x00000010, 'AUTHENTICATED_WRITE_ACCESS'),
+    (0x00000020, 'TIME_BASED_AUTHENTICATED_WRITE_ACCESS'),
+    (0x00000040, 'APPEND_WRITE'),
+    (0x00000080, 'ENHANCED_AUTHENTICATED_ACCESS'),
+)
+
+
+def decode_attributes(attributes):
+    """Flag names for an attribute word (unknown bits as hex)"""
+    if attributes is None:
+        return []
+    names = [name for bit, name in EFI_VARIABLE_ATTRIBUTES if attributes & bit]
+    unknown = attributes & ~sum(bit for bit, _ in EFI_VARIABLE_ATTRIBUTES)
+    if unknown:
+        names.append(f"0x{unknown:x}")
+    return names
+
+
+def split_name(full_name):
+    """Split an efivarfs file name into (name, guid); None if it is not one"""
+    if len(full_name) <= GUID_LENGTH + 1 or full_name[-GUID_LENGTH - 1] != '-':
+        return None
+    guid = full_name[-GUID_LENGTH:]
+    if guid.count('-') != 4:
+        return None
+    return full_name[:-GUID_LENGTH - 1], guid.lower()
+
+
+class EfiVariable:
+    """One variable; contents are loaded on first access and kept"""
+
+    __slots__ = ('name', 'guid', 'full_name', 'path', '_store', '_raw', '_size', '_attributes')
+
+    def __init__(self, store, name, guid, full_name, path=None, size=None, attributes=None):
+        self._store = store
+        self.name = name
+        self.guid = guid
+        self.full_name = full_name
+        self.path = path
+        self._raw = None
+        self._size = size
+        self._attributes = attributes
+
+    def __repr__(self):
+        return f"EfiVariable({self.full_name!r})"
+
+    @property
+    def loaded(self):
+        """True once the contents have been read (successfully or not)"""
+        return self._raw is not None
+
+    @property
+    def raw(self):
+        """efivarfs contents (attribute word + data), or None if unreadable"""
+        if self._raw is None:
+            self._raw = self._store._load(self)
+        return self._raw or None
+
+    @property
+    def readable(self):
+        return self.raw is not None
+
+    @property
+    def data(self):
+        raw = self.raw
+        return raw[ATTRIBUTES_SIZE:] if raw is not None else None
+
+    @property
+    def attributes(self):
+        if self._attributes is None:
+            raw = self.raw
+            if raw is not None and len(raw) >= ATTRIBUTES_SIZE:
+                self._attributes = struct.unpack_from('<I', raw)[0]
+        return self._attributes
+
+    @property
+    def attribute_names(self):
+        return decode_attributes(self.attributes)
+
+    @property
+    def size(self):
+        """Data size in bytes, excluding the attribute word"""
+        if self._raw:
+            return max(len(self._raw) - ATTRIBUTES_SIZE, 0)
+        if self._size is None:
+            self._size = self._store._stat_size(self)
+        return self._size
+
+    def to_dict(self, include_data=False):
+        info = {
+            'name': self.name,
+            'guid': self.guid,
+            'size': self.size,
+            'attributes': self.attributes,
+            'attribute_names': self.attribute_names,
+        }
+        if include_data:
+            data = self.data
+            info['data'] = data.hex() if data is not None else None
+        return info
+
+
+class EfiVariableStore:
+    """Variables from efivarfs, an efivarfs-shaped directory or a HostSnapshot"""
+
+    def __init__(self, source=None):
+        self.snapshot = None
+        self.path = None
+        if source is None:
+            self.path = EFIVARS_PATH
+        elif hasattr(source, 'read_efivar'):
+            self.snapshot = source
+        else:
+            self.path = Path(source)
+        self._variables = None
+        self.bytes_read = 0
+
+    def __repr__(self):
+        return f"EfiVariableStore({self.source_label!r})"
+
+    @property
+    def source_label(self):
+        return str(self.snapshot.path) if self.snapshot else str(self.path)
+
+    def available(self):
+        if self.snapshot:
+            return True
+        return self.path.is_dir()
+
+    def _list(self):
+        variables = {}
+        if self.snapshot:
+            index = self.snapshot.index.get('efivars', {})
+            for full_name in self.snapshot.efivar_names():
+                parts = split_name(full_name)
+                if parts is None:
+                    continue
+                meta = index.get(full_name) or {}
+                variables[full_name] = EfiVariable(self, parts[0], parts[1], full_name,
+                                                   size=meta.get('size'),
+                                                   attributes=meta.get('attributes'))
+            return variables
+        try:
+            with os.scandir(self.path) as it:
+                for entry in it:
+                    parts = split_name(entry.name)
+                    if parts is None or not entry.is_file(follow_symlinks=False):
+                        continue
+                    variables[entry.name] = EfiVariable(self, parts[0], parts[1], entry.name,
+                                                        path=entry.path)
+        except OSError:
+            pass
+        return variables
+
+    def _load(self, var):
+        # b'' marks "tried and failed" so the read is not retried
+        if self.snapshot:
+            raw = self.snapshot.read_efivar(var.full_name)
+        else:
+            try:
+                with open(var.path, 'rb') as f:
+                    raw = f.read()
+            except OSError:
+                raw = None
+        if raw is None:
+            return b''
+        self.bytes_read += len(raw)
+        return raw
+
+    def _stat_size(self, var):
+        if var.path is None:
+            return 0
+        try:
+            return max(os.stat(var.path).st_size - ATTRIBUTES_SIZE, 0)
+        except OSError:
+            return 0
+
+    @property
+    def variables(self):
+        """Full name -> EfiVariable, listed once"""
+        if self._variables is None:
+            self._variables = self._list()
+        return self._variables
+
+    def __iter__(self):
+        return iter(self.variables.values())
+
+    def __len__(self):
+        return len(self.variables)
+
+    def __contains__(self, full_name):
+        return full_name in self.variables
+
+    def get(self, name, guid=None):
+        """Variable by full efivarfs name, or by name and GUID"""
+        full_name = f"{name}-{guid.lower()}" if guid else name
+        return self.variables.get(full_name)
+
+    def find(self, name=None, guid=None):
+        """Variables matching a name and/or GUID (case-insensitive)"""
+        name = name.lower() if name else None
+        guid = guid.lower() if guid else None
+        return [var for var in self
+                if (name is None or var.name.lower() == name) and (guid is None or var.guid == guid)]
+
+    def read(self, name, guid=None):
+        """Variable data without the attribute word, or None"""
+        var = self.get(name, guid)
+        return var.data if var is not None else None
+
+
+# Live and directory stores shared within the process, keyed by path
+_STORES = {}
+
+
+def efivar_store(source=None):
+    """
+    The shared store for a source (None = live efivarfs).
+
+    Snapshots keep their own store (HostSnapshot.efivar_store()) so it goes
+    away with the snapshot instead of pinning the archive here.
+    """
+    if source is not None and hasattr(source, 'efivar_store'):
+        return source.efivar_store()
+    key = str(Path(source).resolve()) if source is not None else str(EFIVARS_PATH)
+    store = _STORES.get(key)
+    if store is None:
+        store = _STORES[key] = EfiVariableStore(source)
+    return store
+
+
+def open_store(source=None):
+    """A fresh store for a CLI --source: directory, host snapshot or flash image"""
+    if source and not Path(source).is_dir():
+        from host_snapshot import HostSnapshot, is_snapshot
+        if is_snapshot(source):
+            return EfiVariableStore(HostSnapshot(source))
+        from nvram_store import FirmwareImageStore
+        return FirmwareImageStore(source)
+    return EfiVariableStore(source)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List EFI variables with decoded attributes')
+    parser.add_argument('--source', help='efivarfs-style directory, host snapshot or flash image (default: live efivarfs)')
+    parser.add_argument('--guid', help='Only variables with this vendor GUID')
+    parser.add_argument('--name', help='Only variables with this name')
+    args = parser.parse_args()
+
+    store = open_store(args.source)
+    if not store.available():
+        print(f"❌ EFI variables not accessible: {store.source_label}")
+        return 1
+
+    matches = store.find(args.name, args.guid) if args.name or args.guid else list(store)
+    for var in sorted(matches, key=lambda v: (v.guid, v.name)):
+        flags = ','.join(var.attribute_names) or '?'
+        print(f"{var.guid}  {var.name:<40} {var.size:>8}  {flags}")
+    print(f"📊 {len(matches)} variable(s) from {store.source_label}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
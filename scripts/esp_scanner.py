@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard ESP Integrity Scanner
+Checks a mounted EFI System Partition against Allowed.manifest.sha256.
+
+scripts/esp-add-allowed-hashes.sh records the known-good ESP contents; this
+tool walks the ESP at runtime, hashes every .efi binary, bootloader config,
+kernel and initramfs on a thread pool and reports files that are unknown,
+missing or changed. A digest cache keyed by file size/mtime/ctime lets repeat
+scans skip unchanged files, so ESPs carrying hundreds of MB of kernels stay
+cheap to verify. An optional ScanBudget (scripts/scan_budget.py) paces reads
+and CPU, and a checkpoint lets an interrupted scan resume.
+
+Usage:
+  python3 scripts/esp_scanner.py /boot/efi
+  python3 scripts/esp_scanner.py /boot/efi -m out/esp/Allowed.manifest.sha256 -o out/logs/esp_scan.json
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from scan_budget import ScanCheckpoint, ScanInterrupted, add_budget_arguments, budget_from_args
+
+DEFAULT_MANIFEST_RELPATH = 'EFI/PhoenixGuard/Allowed.manifest.sha256'
+DEFAULT_CACHE_PATH = 'out/cache/esp_digests.json'
+CACHE_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Files worth hashing on an ESP: boot binaries, loader configs and the
+# kernel/initramfs images that loaders hand control to.
+BOOT_BINARY_SUFFIXES = ('.efi',)
+BOOT_CONFIG_SUFFIXES = ('.cfg', '.conf', '.csv')
+BOOT_IMAGE_PREFIXES = ('vmlinuz', 'vmlinux', 'initrd', 'initramfs', 'bzimage')
+BOOT_IMAGE_SUFFIXES = ('.iso', '.img')
+
+
+def is_boot_component(relpath):
+    """Return True if an ESP-relative path is a file we integrity check"""
+    name = relpath.rsplit('/', 1)[-1].lower()
+    if name.endswith(BOOT_BINARY_SUFFIXES + BOOT_CONFIG_SUFFIXES + BOOT_IMAGE_SUFFIXES):
+        return True
+    return name.startswith(BOOT_IMAGE_PREFIXES)
+
+
+def parse_manifest_lines(lines):
+    """Parse sha256sum-style manifest lines into {relpath: sha256}"""
+    entries = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        parts = line.split(None, 1)
+        if len(parts) != 2:
+            logging.warning(f"Ignoring malformed manifest line: {line}")
+            continue
+        digest, relpath = parts
+        # sha256sum marks binary mode with a leading '*'
+        relpath = relpath.lstrip('*').lstrip('/')
+        entries[relpath] = digest.lower()
+    return entries
+
+
+def parse_manifest(manifest_path):
+    """Parse a sha256sum-style manifest file into {relpath: sha256}"""
+    with open(manifest_path, 'r') as f:
+        return parse_manifest_lines(f)
+
+
+def hash_file(path, budget=None):
+    """SHA256 a file in large chunks (hashlib releases the GIL while hashing)"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            h.update(chunk)
+            if budget is not None:
+                budget.charge(len(chunk))
+    return h.hexdigest()
+
+
+class ESPScanner:
+    def __init__(self, esp_path, manifest_path=None, cache_path=DEFAULT_CACHE_PATH,
+                 max_workers=None, use_cache=True, budget=None, checkpoint_path=None):
+        self.esp_path = Path(esp_path)
+        self.manifest_path = Path(manifest_path) if manifest_path else self.esp_path / DEFAULT_MANIFEST_RELPATH
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 2)
+        self.use_cache = use_cache
+        self.budget = budget
+        self.checkpoint_path = checkpoint_path
+        self.cache = {}
+        self.results = {
+            'scan_timestamp': None,
+            'esp_path': str(self.esp_path),
+            'manifest_path': str(self.manifest_path),
+            'files_scanned': 0,
+            'files_hashed': 0,
+            'cache_hits': 0,
+            'resumed': 0,
+            'bytes_hashed': 0,
+            'interrupted': False,
+            'unknown': [],
+            'missing': [],
+            'changed': [],
+            'digests': {},
+            'errors': []
+        }
+
+    def load_cache(self):
+        """Load cached digests for this ESP (ignored if stale or unreadable)"""
+        if not self.use_cache or not self.cache_path or not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                self.cache = data.get('esps', {}).get(str(self.esp_path.resolve()), {})
+                logging.debug(f"Loaded {len(self.cache)} cached ESP digests from {self.cache_path}")
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable ESP digest cache {self.cache_path}: {e}")
+
+    def save_cache(self, entries):
+        """Persist digests so the next scan can skip unchanged files"""
+        if not self.cache_path:
+            return
+        try:
+            data = {'version': CACHE_VERSION, 'esps': {}}
+            if self.cache_path.exists():
+                try:
+                    with open(self.cache_path, 'r') as f:
+                        existing = json.load(f)
+                    if existing.get('version') == CACHE_VERSION:
+                        data['esps'] = existing.get('esps', {})
+                except Exception:
+                    pass
+            data['esps'][str(self.esp_path.resolve())] = entries
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logging.warning(f"Failed to save ESP digest cache: {e}")
+
+    def walk_esp(self, extra_relpaths=()):
+        """Enumerate boot components on the ESP as {relpath: os.stat_result}"""
+        wanted = {p.lower() for p in extra_relpaths}
+        found = {}
+        stack = ['']
+        while stack:
+            rel_dir = stack.pop()
+            abs_dir = self.esp_path / rel_dir if rel_dir else self.esp_path
+            try:
+                with os.scandir(abs_dir) as it:
+                    for entry in it:
+                        relpath = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(relpath)
+                            elif entry.is_file(follow_symlinks=False):
+                                if is_boot_component(relpath) or relpath.lower() in wanted:
+                                    found[relpath] = entry.stat(follow_symlinks=False)
+                        except OSError as e:
+                            self.results['errors'].append(f"{relpath}: {e}")
+            except OSError as e:
+                self.results['errors'].append(f"{rel_dir or '/'}: {e}")
+        return found
+
+    def _hash_entry(self, relpath):
+        try:
+            if self.budget is not None:
+                self.budget.check()
+            return relpath, hash_file(self.esp_path / relpath, self.budget), None
+        except ScanInterrupted:
+            return relpath, None, None
+        except OSError as e:
+            return relpath, None, str(e)
+
+    def scan(self, manifest=None):
+        """Hash the ESP and compare it with the manifest and digest cache"""
+        self.results['scan_timestamp'] = datetime.utcnow().isoformat()
+
+        if manifest is None:
+            manifest = {}
+            if self.manifest_path.exists():
+                manifest = parse_manifest(self.manifest_path)
+            else:
+                logging.warning(f"ESP manifest not found: {self.manifest_path}")
+                self.results['errors'].append(f"manifest not found: {self.manifest_path}")
+        manifest_keys = {relpath.lower() for relpath in manifest}
+
+        self.load_cache()
+        checkpoint = None
+        done = {}
+        if self.checkpoint_path:
+            checkpoint = ScanCheckpoint(self.checkpoint_path, f"esp:{self.esp_path.resolve()}")
+            done = checkpoint.load()
+        files = self.walk_esp(extra_relpaths=manifest.keys())
+        self.results['files_scanned'] = len(files)
+
+        new_cache = {}
+        to_hash = []
+        for relpath, st in files.items():
+            key = [st.st_size, st.st_mtime_ns, st.st_ctime_ns]
+            cached = self.cache.get(relpath)
+            resumed = done.get(relpath)
+            if resumed and resumed.get('key') == key:
+                # Hashed by an earlier, interrupted run of this scan
+                self.results['digests'][relpath] = resumed['sha256']
+                new_cache[relpath] = {'key': key, 'sha256': resumed['sha256']}
+                if resumed.get('drift'):
+                    self.results['changed'].append(resumed['drift'])
+                self.results['resumed'] += 1
+            elif cached and cached.get('key') == key:
+                self.results['digests'][relpath] = cached['sha256']
+                new_cache[relpath] = cached
+                self.results['cache_hits'] += 1
+            else:
+                to_hash.append(relpath)
+
+        if to_hash:
+            if self.budget is not None:
+                self.budget.apply()
+            logging.info(f"Hashing {len(to_hash)} ESP file(s) on {self.max_workers} thread(s)")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for relpath, digest, error in pool.map(self._hash_entry, to_hash):
+                    if error:
+                        self.results['errors'].append(f"{relpath}: {error}")
+                        continue
+                    if digest is None:
+                        continue  # interrupted before this file finished
+                    st = files[relpath]
+                    self.results['digests'][relpath] = digest
+                    self.results['files_hashed'] += 1
+                    self.results['bytes_hashed'] += st.st_size
+                    previous = self.cache.get(relpath)
+                    drift = None
+                    if previous and previous.get('sha256') != digest and relpath.lower() not in manifest_keys:
+                        drift = {
+                            'path': relpath,
+                            'reason': 'changed_since_last_scan',
+                            'expected_sha256': previous.get('sha256'),
+                            'actual_sha256': digest
+                        }
+                        self.results['changed'].append(drift)
+                    new_cache[relpath] = {
+                        'key': [st.st_size, st.st_mtime_ns, st.st_ctime_ns],
+                        'sha256': digest
+                    }
+                    if checkpoint is not None:
+                        checkpoint.put(relpath, dict(new_cache[relpath], drift=drift))
+
+        if self.budget is not None and self.budget.stopped:
+            # Keep the old cache intact: unhashed files still need their previous digests
+            self.results['interrupted'] = True
+            if checkpoint is not None:
+                checkpoint.flush()
+            logging.warning(f"ESP scan interrupted after {self.results['files_hashed']} file(s); "
+                            f"rerun with the same checkpoint to resume")
+            return self.results
+
+        self.compare(manifest)
+
+        if self.use_cache:
+            self.save_cache(new_cache)
+        if checkpoint is not None:
+            checkpoint.clear()
+
+        logging.info(f"ESP scan complete: {self.results['files_scanned']} files, "
+                     f"{self.results['files_hashed']} hashed, {self.results['cache_hits']} cached")
+        return self.results
+
+    def compare(self, manifest):
+        """Compare self.results['digests'] with a {relpath: sha256} manifest"""
+        # FAT is case-insensitive, so match manifest entries case-insensitively
+        manifest_by_key = {relpath.lower(): (relpath, digest) for relpath, digest in manifest.items()}
+        digests_by_key = {relpath.lower(): relpath for relpath in self.results['digests']}
+
+        for key, (manifest_relpath, expected) in manifest_by_key.items():
+            relpath = digests_by_key.get(key)
+            if relpath is None:
+                self.results['missing'].append({'path': manifest_relpath, 'expected_sha256': expected})
+                continue
+            actual = self.results['digests'][relpath]
+            if actual != expected:
+                self.results['changed'].append({
+                    'path': relpath,
+                    'reason': 'manifest_mismatch',
+                    'expected_sha256': expected,
+                    'actual_sha256': actual
+                })
+
+        for key, relpath in sorted(digests_by_key.items()):
+            if key not in manifest_by_key:
+                self.results['unknown'].append({
+                    'path': relpath,
+                    'sha256': self.results['digests'][relpath]
+                })
+        return self.results
+
+    def findings(self):
+        """Convert scan results into BootkitHunter-style modification records"""
+        findings = []
+        manifest_changes = [c for c in self.results['changed'] if c['reason'] == 'manifest_mismatch']
+        drift = [c for c in self.results['changed'] if c['reason'] != 'manifest_mismatch']
+        unknown_binaries = [u for u in self.results['unknown'] if u['path'].lower().endswith('.efi')]
+
+        if manifest_changes:
+            findings.append({
+                'type': 'ESP_BINARY_MODIFIED',
+                'severity': 'CRITICAL',
+                'details': f"{len(manifest_changes)} ESP file(s) differ from Allowed.manifest.sha256",
+                'files': manifest_changes,
+                'risk_indicators': ['bootloader_tampering', 'esp_persistence']
+            })
+        if unknown_binaries:
+            findings.append({
+                'type': 'ESP_UNKNOWN_BINARY',
+                'severity': 'HIGH',
+                'details': f"{len(unknown_binaries)} EFI binaries on the ESP are not in the allowed manifest",
+                'files': unknown_binaries,
+                'risk_indicators': ['unauthorized_bootloader', 'esp_persistence']
+            })
+        if drift:
+            findings.append({
+                'type': 'ESP_FILE_CHANGED',
+                'severity': 'MEDIUM',
+                'details': f"{len(drift)} ESP boot file(s) changed since the last scan",
+                'files': drift,
+                'risk_indicators': ['boot_configuration_change']
+            })
+        if self.results['missing']:
+            findings.append({
+                'type': 'ESP_FILE_MISSING',
+                'severity': 'MEDIUM',
+                'details': f"{len(self.results['missing'])} manifest file(s) missing from the ESP",
+                'files': self.results['missing'],
+                'risk_indicators': ['boot_configuration_change']
+            })
+        return findings
+
+    def print_results(self):
+        """Print a short human readable summary"""
+        r = self.results
+        print(f"\n🗂️  ESP Integrity Scan: {r['esp_path']}")
+        print(f"{'='*50}")
+        print(f"📁 Files scanned: {r['files_scanned']} ({r['files_hashed']} hashed, {r['cache_hits']} cached)")
+        for label, key in (('❌ Changed', 'changed'), ('❓ Unknown', 'unknown'), ('🚫 Missing', 'missing')):
+            if r[key]:
+                print(f"{label} ({len(r[key])}):")
+                for item in r[key]:
+                    reason = f" [{item['reason']}]" if 'reason' in item else ''
+                    print(f"   • {item['path']}{reason}")
+        if not (r['changed'] or r['unknown'] or r['missing']):
+            print("✅ ESP matches the allowed manifest")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PhoenixGuard ESP Integrity Scanner')
+    parser.add_argument('esp', help='Mounted ESP root (e.g. /boot/efi)')
+    parser.add_argument('-m', '--manifest',
+                        help=f'Allowed manifest (default: <esp>/{DEFAULT_MANIFEST_RELPATH})')
+    parser.add_argument('-c', '--cache', default=DEFAULT_CACHE_PATH, help='Digest cache file')
+    parser.add_argument('--no-cache', action='store_true', help='Rehash every file and do not update the cache')
+    parser.add_argument('-j', '--jobs', type=int, help='Hashing threads')
+    parser.add_argument('-o', '--output', help='Write scan results JSON')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Verbose logging')
+    add_budget_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    if not os.path.isdir(args.esp):
+        logging.error(f"ESP path not found: {args.esp}")
+        return 1
+
+    scanner = ESPScanner(args.esp, args.manifest, args.cache, args.jobs, use_cache=not args.no_cache,
+                         budget=budget_from_args(args), checkpoint_path=args.checkpoint)
+    results = scanner.scan()
+    scanner.print_results()
+    if results['interrupted']:
+        print("⏸️  Scan interrupted: rerun with the same --checkpoint to resume")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        logging.info(f"Results saved to: {args.output}")
+
+    if results['interrupted']:
+        return 2
+    return 1 if results['changed'] or results['missing'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
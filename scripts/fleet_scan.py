@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard Fleet Bootkit Scan
+Runs BootkitHunter over a directory of host snapshots with a process pool.
+
+The baseline library (a directory of firmware baseline JSON files) is opened
+once in the parent through the compiled baseline indexes before the pool
+forks, so every worker shares the mapped indexes instead of re-parsing JSON
+per host. Each host becomes one line
+of an NDJSON report carrying its risk level; a summary of risk counts is
+printed at the end.
+
+Usage:
+  python3 scripts/fleet_scan.py out/snapshots/ -L out/baselines/ -o out/logs/fleet_scan.ndjson
+  python3 scripts/detect_bootkit.py --fleet out/snapshots/ --baseline-library out/baselines/
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from baseline_index import BaselineIndex
+from detect_bootkit import BootkitHunter
+from host_snapshot import HostSnapshot, SNAPSHOT_SUFFIX
+from ingest_server import IngestClient
+
+RISK_ORDER = ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW', 'INCOMPLETE', 'CLEAN', 'ERROR']
+
+# Set in each worker by _init_worker (inherited copy-on-write under fork)
+_LIBRARY = None
+_FULL_RESULTS = False
+
+
+class BaselineLibrary:
+    """Compiled firmware baselines indexed by BIOS version"""
+
+    def __init__(self, library_path):
+        self.library_path = Path(library_path)
+        self.baselines = {}
+        self.by_version = {}
+        self.default = None
+
+    def load(self):
+        """Load every *.json baseline in the library directory"""
+        paths = [self.library_path] if self.library_path.is_file() else sorted(self.library_path.glob('*.json'))
+        for path in paths:
+            try:
+                index = BaselineIndex.load(path)
+                version = index.metadata['bios_version']
+            except Exception as e:
+                logging.warning(f"Skipping baseline {path}: {e}")
+                continue
+            self.baselines[str(path)] = index
+            self.by_version.setdefault(version, str(path))
+            if self.default is None or path.stem == 'default':
+                self.default = str(path)
+        logging.info(f"Loaded {len(self.baselines)} baseline(s) from {self.library_path}")
+        return bool(self.baselines)
+
+    def select(self, bios_version):
+        """Pick the baseline for a host's BIOS version (default if none match)"""
+        if bios_version:
+            path = self.by_version.get(bios_version)
+            if path is None:
+                # Same containment rule BootkitHunter uses for version checks
+                path = next((p for v, p in self.by_version.items() if v and v in bios_version), None)
+            if path is not None:
+                return path, self.baselines[path]
+        return self.default, self.baselines.get(self.default)
+
+
+def find_snapshots(fleet_path):
+    """All snapshot archives under a directory, sorted for stable output"""
+    found = []
+    for root, _dirs, files in os.walk(fleet_path):
+        for fn in files:
+            if fn.endswith(SNAPSHOT_SUFFIX):
+                found.append(os.path.join(root, fn))
+    return sorted(found)
+
+
+def _init_worker(log_level, library, full_results):
+    """Install the baseline library in a worker; spawned workers get its path and load it themselves"""
+    global _LIBRARY, _FULL_RESULTS
+    logging.getLogger().setLevel(log_level)
+    if not isinstance(library, BaselineLibrary):
+        library = BaselineLibrary(library)
+        library.load()
+    _LIBRARY = library
+    _FULL_RESULTS = full_results
+
+
+def scan_host(snapshot_path):
+    """Scan one snapshot against the shared baseline library"""
+    start = time.monotonic()
+    record = {
+        'snapshot': snapshot_path,
+        'host_id': None,
+        'hostname': None,
+        'bios_version': None,
+        'baseline': None,
+        'risk_level': 'ERROR',
+        'recommended_action': 'NONE',
+        'findings': [],
+        'error': None
+    }
+    try:
+        with HostSnapshot(snapshot_path) as snapshot:
+            record['host_id'] = snapshot.host_id
+            record['hostname'] = snapshot.host.get('hostname')
+            record['bios_version'] = snapshot.dmi_field('bios_version')
+            baseline_path, index = _LIBRARY.select(record['bios_version'])
+            if index is None:
+                raise RuntimeError('no baseline available')
+            record['baseline'] = baseline_path
+
+            hunter = BootkitHunter(baseline_path, snapshot=snapshot, decode_smbios=False)
+            hunter.baseline_index = index
+            hunter.baseline = index.baseline
+            if not hunter.scan_for_bootkits():
+                raise RuntimeError('scan failed')
+
+            results = hunter.detection_results
+            record['risk_level'] = results['risk_level']
+            record['recommended_action'] = results['recommended_action']
+            record['findings'] = [
+                {'type': f['type'], 'severity': f['severity']}
+                for f in results['threats_detected'] + results['modifications_found']
+            ]
+            if _FULL_RESULTS:
+                record['detection_results'] = results
+    except Exception as e:
+        record['error'] = str(e)
+    record['scan_ms'] = round((time.monotonic() - start) * 1000, 2)
+    return record
+
+
+def run_fleet_scan(fleet_path, library_path, output_path, jobs=None, full_results=False,
+                   chunksize=16, ingest_url=None):
+    """Scan every snapshot under fleet_path and write an NDJSON report (and stream it to ingest_url)"""
+    library = BaselineLibrary(library_path)
+    if not library.load():
+        logging.error(f"No usable baselines in: {library_path}")
+        return None
+
+    snapshots = find_snapshots(fleet_path)
+    if not snapshots:
+        logging.error(f"No *{SNAPSHOT_SUFFIX} snapshots under: {fleet_path}")
+        return None
+
+    jobs = jobs or os.cpu_count() or 1
+    logging.info(f"Scanning {len(snapshots)} host(s) with {jobs} worker(s)")
+    start = time.monotonic()
+    risk_counts = Counter()
+
+    # Workers log only warnings; per-host INFO lines would swamp the report
+    worker_level = max(logging.getLogger().level, logging.WARNING)
+    # Forked workers share the parent's mapped indexes; spawned ones cannot
+    # receive them (mmaps do not pickle) and reload the library from disk
+    fork = 'fork' in multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context('fork' if fork else None)
+    initargs = (worker_level, library if fork else str(library_path), full_results)
+
+    client = IngestClient(ingest_url) if ingest_url else None
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as out, \
+            ctx.Pool(jobs, initializer=_init_worker, initargs=initargs) as pool:
+        for record in pool.imap_unordered(scan_host, snapshots, chunksize=chunksize):
+            risk_counts[record['risk_level']] += 1
+            out.write(json.dumps(record, separators=(',', ':')) + '\n')
+            if client:
+                client.send(record)
+    if client:
+        client.close()
+
+    elapsed = time.monotonic() - start
+    summary = {
+        'scan_timestamp': datetime.utcnow().isoformat(),
+        'hosts_scanned': len(snapshots),
+        'elapsed_seconds': round(elapsed, 3),
+        'hosts_per_minute': round(len(snapshots) / elapsed * 60) if elapsed else None,
+        'risk_levels': {level: risk_counts[level] for level in RISK_ORDER if risk_counts[level]},
+        'report': str(output_path)
+    }
+    if client:
+        summary['ingest'] = {'url': ingest_url, 'sent': client.sent, 'failed': client.failed}
+    return summary
+
+
+def print_fleet_summary(summary):
+    print(f"\n🛰️  PhoenixGuard Fleet Scan Results")
+    print(f"{'='*50}")
+    print(f"🖥️  Hosts scanned: {summary['hosts_scanned']}")
+    print(f"⏱️  Elapsed: {summary['elapsed_seconds']}s ({summary['hosts_per_minute']} hosts/min)")
+    for level, count in summary['risk_levels'].items():
+        print(f"   {level:<9} {count}")
+    print(f"📄 Report: {summary['report']}")
+    if 'ingest' in summary:
+        ingest = summary['ingest']
+        print(f"📤 Ingest: {ingest['sent']} sent, {ingest['failed']} failed ({ingest['url']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PhoenixGuard Fleet Bootkit Scan')
+    parser.add_argument('fleet', help='Directory of host snapshot archives')
+    parser.add_argument('-L', '--baseline-library', required=True,
+                        help='Directory of firmware baseline JSON files')
+    parser.add_argument('-o', '--output', default='out/logs/fleet_scan.ndjson', help='NDJSON report path')
+    parser.add_argument('-j', '--jobs', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--full', action='store_true', help='Embed full detection results per host')
+    parser.add_argument('--ingest-url', help='Also stream records to an ingest server (scripts/ingest_server.py)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Verbose logging')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    summary = run_fleet_scan(args.fleet, args.baseline_library, args.output, args.jobs, args.full,
+                             ingest_url=args.ingest_url)
+    if summary is None:
+        return 1
+    print_fleet_summary(summary)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
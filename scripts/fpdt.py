@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard Firmware Boot Timing (ACPI FPDT)
+Per-phase firmware boot timings and regression detection against host history.
+
+The Firmware Performance Data Table points at the Firmware Basic Boot
+Performance Table (FBPT), whose boot record timestamps the end of reset, the
+OS loader load/start and ExitBootServices. Linux 5.12+ exposes that record
+under /sys/firmware/acpi/fpdt/boot; older kernels fall back to reading the
+FBPT through /dev/mem at the address the FPDT gives.
+
+Every distinct boot is appended to a per-host NDJSON time series, and each
+phase is compared with the host's own history using the median and median
+absolute deviation, so a firmware implant that adds work to the boot path
+shows up as an outlier without any fleet-wide threshold.
+
+Usage:
+  sudo python3 scripts/fpdt.py show
+  sudo python3 scripts/fpdt.py check --history-dir out/cache/fpdt
+  python3 scripts/fpdt.py history out/cache/fpdt/<host-id>.ndjson
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import struct
+import sys
+from datetime import datetime
+from pathlib import Path
+
+FPDT_TABLE_PATH = Path('/sys/firmware/acpi/tables/FPDT')
+FPDT_SYSFS_BOOT = Path('/sys/firmware/acpi/fpdt/boot')
+DEV_MEM = '/dev/mem'
+DEFAULT_HISTORY_DIR = 'out/cache/fpdt'
+
+ACPI_HEADER_SIZE = 36
+FPDT_FBPT_POINTER = 0x0000
+FPDT_S3PT_POINTER = 0x0001
+FBPT_BOOT_RECORD = 0x0002
+
+# Boot record fields, named as the kernel exposes them (<name>_ns)
+BOOT_FIELDS = ('reset_end', 'load_image_start', 'start_image_start',
+               'exitbootservice_start', 'exitbootservice_end')
+
+# Phase -> (start field, end field); None start means "since timer start"
+PHASES = {
+    'reset': (None, 'reset_end'),
+    'firmware': ('reset_end', 'load_image_start'),
+    'loader_load': ('load_image_start', 'start_image_start'),
+    'loader': ('start_image_start', 'exitbootservice_start'),
+    'exit_boot_services': ('exitbootservice_start', 'exitbootservice_end'),
+    'total': (None, 'exitbootservice_end'),
+}
+
+# Regression detection: robust z-score over the host's recent history
+MIN_HISTORY = 5
+HISTORY_WINDOW = 30
+Z_THRESHOLD = 3.5
+MIN_REGRESSION_NS = 50_000_000  # ignore sub-50ms wobble regardless of z
+
+
+class FPDTError(Exception):
+    pass
+
+
+def parse_fpdt(raw):
+    """Return the FBPT/S3PT physical addresses from a raw FPDT table"""
+    if len(raw) < ACPI_HEADER_SIZE or raw[:4] != b'FPDT':
+        raise FPDTError('not an FPDT table')
+    length = min(struct.unpack_from('<I', raw, 4)[0], len(raw))
+    pointers = {'fbpt_address': None, 's3pt_address': None}
+    off = ACPI_HEADER_SIZE
+    while off + 4 <= length:
+        rec_type, rec_len, _rev = struct.unpack_from('<HBB', raw, off)
+        if rec_len < 4:
+            break
+        if rec_type in (FPDT_FBPT_POINTER, FPDT_S3PT_POINTER) and rec_len >= 16:
+            key = 'fbpt_address' if rec_type == FPDT_FBPT_POINTER else 's3pt_address'
+            pointers[key] = struct.unpack_from('<Q', raw, off + 8)[0]
+        off += rec_len
+    return pointers
+
+
+def parse_fbpt(raw):
+    """Return the firmware basic boot record from a raw FBPT"""
+    if len(raw) < 8 or raw[:4] != b'FBPT':
+        raise FPDTError('not an FBPT table')
+    length = min(struct.unpack_from('<I', raw, 4)[0], len(raw))
+    off = 8
+    while off + 4 <= length:
+        rec_type, rec_len, _rev = struct.unpack_from('<HBB', raw, off)
+        if rec_len < 4:
+            break
+        if rec_type == FBPT_BOOT_RECORD and rec_len >= 48:
+            return dict(zip(BOOT_FIELDS, struct.unpack_from('<5Q', raw, off + 8)))
+        off += rec_len
+    raise FPDTError('FBPT has no firmware basic boot record')
+
+
+def _read_sysfs_boot_record(sysfs_dir):
+    record = {}
+    for field in BOOT_FIELDS:
+        try:
+            record[field] = int((sysfs_dir / f"{field}_ns").read_text().strip())
+        except (OSError, ValueError):
+            return None
+    return record
+
+
+def _read_devmem_boot_record(fpdt_path):
+    with open(fpdt_path, 'rb') as f:
+        address = parse_fpdt(f.read())['fbpt_address']
+    if not address:
+        raise FPDTError('FPDT has no FBPT pointer')
+    with open(DEV_MEM, 'rb', buffering=0) as mem:
+        mem.seek(address)
+        header = mem.read(8)
+        if len(header) < 8 or header[:4] != b'FBPT':
+            raise FPDTError(f"no FBPT signature at 0x{address:x}")
+        length = struct.unpack_from('<I', header, 4)[0]
+        return parse_fbpt(header + mem.read(max(0, min(length, 4096) - 8)))
+
+
+def read_boot_record(fpdt_path=FPDT_TABLE_PATH, sysfs_dir=FPDT_SYSFS_BOOT):
+    """
+    Read this boot's FBPT boot record (timestamps in ns).
+
+    Returns a dict of BOOT_FIELDS plus 'source', or None when the platform
+    publishes no FPDT.
+    """
+    record = _read_sysfs_boot_record(Path(sysfs_dir))
+    if record is not None:
+        record['source'] = 'sysfs'
+        return record
+    if not Path(fpdt_path).exists():
+        return None
+    try:
+        record = _read_devmem_boot_record(fpdt_path)
+    except (OSError, FPDTError) as e:
+        logging.debug(f"FBPT not readable via {DEV_MEM}: {e}")
+        return None
+    record['source'] = 'devmem'
+    return record
+
+
+def boot_phases(record):
+    """Per-phase durations in ns; phases with unrecorded timestamps are None"""
+    phases = {}
+    for phase, (start, end) in PHASES.items():
+        end_ns = record.get(end) or 0
+        start_ns = (record.get(start) or 0) if start else 0
+        if not end_ns or (start and not start_ns) or end_ns < start_ns:
+            phases[phase] = None
+        else:
+            phases[phase] = end_ns - start_ns
+    return phases
+
+
+class BootTimeHistory:
+    """Per-host NDJSON time series of FPDT boot records"""
+
+    def __init__(self, history_dir, host_id):
+        safe_id = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in str(host_id))
+        self.path = Path(history_dir) / f"{safe_id}.ndjson"
+        self.host_id = host_id
+
+    def load(self):
+        samples = []
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        samples.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return samples
+
+    def append(self, sample):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(sample, separators=(',', ':')) + '\n')
+
+    def record(self, boot_record, recorded_utc=None):
+        """
+        Add this boot to the history and return the samples preceding it.
+
+        The FBPT only changes on reboot, so a record identical to one already
+        stored is the same boot seen again and is not duplicated.
+        """
+        timestamps = {field: boot_record.get(field) for field in BOOT_FIELDS}
+        samples = self.load()
+        for i, sample in enumerate(samples):
+            if sample.get('record') == timestamps:
+                return samples[:i]
+        self.append({
+            'recorded_utc': recorded_utc or datetime.utcnow().isoformat(),
+            'record': timestamps,
+            'phases': boot_phases(timestamps)
+        })
+        return samples
+
+
+def detect_regressions(phases, history, window=HISTORY_WINDOW, min_history=MIN_HISTORY,
+                       z_threshold=Z_THRESHOLD, min_delta_ns=MIN_REGRESSION_NS):
+    """Phases that are significantly slower than the host's recent history"""
+    regressions = []
+    recent = history[-window:]
+    for phase, value in phases.items():
+        if value is None:
+            continue
+        past = [s['phases'][phase] for s in recent if s.get('phases', {}).get(phase) is not None]
+        if len(past) < min_history:
+            continue
+        median = statistics.median(past)
+        mad = statistics.median(abs(v - median) for v in past)
+        # A perfectly stable history would make every change infinitely
+        # significant; floor the spread at 1% of the median
+        spread = max(mad, median * 0.01, 1)
+        z = 0.6745 * (value - median) / spread
+        if z > z_threshold and value - median > min_delta_ns:
+            regressions.append({
+                'phase': phase,
+                'current_ms': round(value / 1e6, 2),
+                'median_ms': round(median / 1e6, 2),
+                'mad_ms': round(mad / 1e6, 2),
+                'robust_z': round(z, 2),
+                'samples': len(past)
+            })
+    return regressions
+
+
+def _print_phases(phases):
+    for phase, value in phases.items():
+        shown = f"{value / 1e6:10.2f} ms" if value is not None else '       n/a'
+        print(f"   {phase:<20} {shown}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PhoenixGuard Firmware Boot Timing (ACPI FPDT)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Verbose logging')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('show', help="Print this boot's firmware phase timings")
+
+    chk = sub.add_parser('check', help='Record this boot and check it against host history')
+    chk.add_argument('--history-dir', default=DEFAULT_HISTORY_DIR, help='Per-host history directory')
+    chk.add_argument('--host-id', help='History key (default: machine-id)')
+
+    hist = sub.add_parser('history', help='Print a stored host history')
+    hist.add_argument('path')
+
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    if args.command == 'history':
+        history = BootTimeHistory(Path(args.path).parent, Path(args.path).stem).load()
+        print(f"📈 {len(history)} boot(s) in {args.path}")
+        for sample in history:
+            total = sample['phases'].get('total')
+            firmware = sample['phases'].get('firmware')
+            print(f"   {sample['recorded_utc']}  firmware "
+                  f"{firmware / 1e6 if firmware else 0:9.2f} ms  total {total / 1e6 if total else 0:9.2f} ms")
+        return 0
+
+    record = read_boot_record()
+    if record is None:
+        print("⚠️  No FPDT boot record available (no table, or /dev/mem not readable)")
+        return 1
+    phases = boot_phases(record)
+    print(f"⏱️  Firmware boot phases (source: {record['source']}):")
+    _print_phases(phases)
+
+    if args.command == 'check':
+        from host_snapshot import host_identity, host_id_of
+        history = BootTimeHistory(args.history_dir, args.host_id or host_id_of(host_identity()))
+        regressions = detect_regressions(phases, history.record(record))
+        for r in regressions:
+            print(f"🐢 {r['phase']}: {r['current_ms']} ms vs median {r['median_ms']} ms "
+                  f"(z={r['robust_z']}, {r['samples']} boots)")
+        if not regressions:
+            print(f"✅ No boot-time regression ({history.path})")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,593 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard HII Setup Form Extractor
+Recovers every setup question from the IFR (Internal Forms Representation)
+packages in a firmware image, so a Setup-style variable can be decoded by
+table lookup instead of guessing from names and lengths.
+
+An image is scanned for HII form packages (package type 0x02 opening with an
+EFI_IFR_FORM_SET opcode) and English string packages, including those inside
+LZMA-compressed GUID-defined sections. Each question records its variable
+store (name + GUID), byte offset, width, options, defaults and whether it sits
+under a suppressif (hidden from the setup UI). Tiano-compressed sections are
+not expanded.
+
+Extraction results are cached as JSON under out/cache/hii, keyed by the
+image's SHA256, with an alias table from BIOS vendor/version/date to that
+digest. A later run for the same BIOS version, with or without the image,
+loads the table instead of parsing again.
+
+Usage:
+  python3 scripts/hii_forms.py extract bios_extractions/G615LP.bin
+  python3 scripts/hii_forms.py show --varstore Setup [--image IMAGE]
+  python3 scripts/hii_forms.py decode Setup-ec87d643-eba4-4bb5-a1e5-3f3e36b20da9 [--image IMAGE]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import lzma
+import struct
+import sys
+import uuid
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = 'out/cache/hii'
+ALIAS_FILE = 'bios_versions.json'
+CACHE_FORMAT = 2          # 2: efivarstore questions (misparsed by format 1)
+
+EFI_HII_PACKAGE_FORMS = 0x02
+EFI_HII_PACKAGE_STRINGS = 0x04
+LZMA_SECTION_GUID = uuid.UUID('ee4e5898-3914-4259-9d6e-dc7bd79403cf').bytes_le
+EFI_SECTION_GUID_DEFINED = 0x02
+MAX_SECTION_DEPTH = 3
+
+# IFR opcodes (UEFI spec 2.10, 33.3.8)
+IFR_FORM = 0x01
+IFR_ONE_OF = 0x05
+IFR_CHECKBOX = 0x06
+IFR_NUMERIC = 0x07
+IFR_ONE_OF_OPTION = 0x09
+IFR_SUPPRESS_IF = 0x0A
+IFR_ORDERED_LIST = 0x23
+IFR_FORM_SET = 0x0E
+IFR_GRAY_OUT_IF = 0x19
+IFR_STRING = 0x1C
+IFR_VARSTORE = 0x24
+IFR_VARSTORE_NAME_VALUE = 0x25
+IFR_VARSTORE_EFI = 0x26
+IFR_END = 0x29
+IFR_DEFAULT = 0x5B
+FORM_SET_FIXED = 0x17      # header, Guid, FormSetTitle, Help, Flags; ClassGuid[] follows
+
+QUESTION_TYPES = {
+    IFR_ONE_OF: 'one_of',
+    IFR_CHECKBOX: 'checkbox',
+    IFR_NUMERIC: 'numeric',
+    IFR_STRING: 'string',
+    IFR_ORDERED_LIST: 'ordered_list',
+}
+# Prompt, Help, QuestionId, VarStoreId, VarStoreInfo (offset), Flags
+QUESTION_HEADER = struct.Struct('<HHHHHB')
+# EFI_IFR_TYPE_* value widths for options and defaults
+VALUE_WIDTHS = {0: 1, 1: 2, 2: 4, 3: 8, 4: 1}
+NUMERIC_WIDTHS = (1, 2, 4, 8)
+OPTION_DEFAULT = 0x10
+OPTION_DEFAULT_MFG = 0x20
+
+# String block types (UEFI spec 2.10, 34.3.6.2)
+SIBT_END = 0x00
+SIBT_STRING_SCSU = 0x10
+SIBT_STRING_SCSU_FONT = 0x11
+SIBT_STRINGS_SCSU = 0x12
+SIBT_STRINGS_SCSU_FONT = 0x13
+SIBT_STRING_UCS2 = 0x14
+SIBT_STRING_UCS2_FONT = 0x15
+SIBT_STRINGS_UCS2 = 0x16
+SIBT_STRINGS_UCS2_FONT = 0x17
+SIBT_DUPLICATE = 0x20
+SIBT_SKIP2 = 0x21
+SIBT_SKIP1 = 0x22
+SIBT_EXT1 = 0x30
+SIBT_EXT2 = 0x31
+SIBT_EXT4 = 0x32
+STRING_PACKAGE_FIXED = 46  # header + HdrSize + StringInfoOffset + LanguageWindow + LanguageName
+
+
+def _guid(raw):
+    return str(uuid.UUID(bytes_le=bytes(raw)))
+
+
+def _ucs2(buf, pos):
+    """NUL-terminated UCS-2 string at pos; returns (text, position after NUL)"""
+    end = pos
+    while end + 1 < len(buf) and buf[end:end + 2] != b'\0\0':
+        end += 2
+    return bytes(buf[pos:end]).decode('utf-16-le', 'replace'), end + 2
+
+
+def parse_string_package(buf, start, length):
+    """String id -> text for one string package"""
+    strings = {}
+    hdr_size, info_offset = struct.unpack_from('<II', buf, start + 4)
+    pos = start + info_offset
+    end = start + length
+    string_id = 1
+    while pos < end:
+        block = buf[pos]
+        pos += 1
+        if block == SIBT_END:
+            break
+        if block in (SIBT_STRING_UCS2, SIBT_STRING_UCS2_FONT):
+            if block == SIBT_STRING_UCS2_FONT:
+                pos += 1
+            strings[string_id], pos = _ucs2(buf, pos)
+            string_id += 1
+        elif block in (SIBT_STRINGS_UCS2, SIBT_STRINGS_UCS2_FONT):
+            if block == SIBT_STRINGS_UCS2_FONT:
+                pos += 1
+            count = struct.unpack_from('<H', buf, pos)[0]
+            pos += 2
+            for _ in range(count):
+                strings[string_id], pos = _ucs2(buf, pos)
+                string_id += 1
+        elif block in (SIBT_STRING_SCSU, SIBT_STRING_SCSU_FONT):
+            if block == SIBT_STRING_SCSU_FONT:
+                pos += 1
+            nul = buf.find(b'\0', pos, end)
+            nul = end if nul == -1 else nul
+            strings[string_id] = bytes(buf[pos:nul]).decode('latin-1')
+            pos = nul + 1
+            string_id += 1
+        elif block in (SIBT_STRINGS_SCSU, SIBT_STRINGS_SCSU_FONT):
+            if block == SIBT_STRINGS_SCSU_FONT:
+                pos += 1
+            count = struct.unpack_from('<H', buf, pos)[0]
+            pos += 2
+            for _ in range(count):
+                nul = buf.find(b'\0', pos, end)
+                nul = end if nul == -1 else nul
+                strings[string_id] = bytes(buf[pos:nul]).decode('latin-1')
+                pos = nul + 1
+                string_id += 1
+        elif block == SIBT_DUPLICATE:
+            source = struct.unpack_from('<H', buf, pos)[0]
+            strings[string_id] = strings.get(source, '')
+            pos += 2
+            string_id += 1
+        elif block == SIBT_SKIP1:
+            string_id += buf[pos]
+            pos += 1
+        elif block == SIBT_SKIP2:
+            string_id += struct.unpack_from('<H', buf, pos)[0]
+            pos += 2
+        elif block == SIBT_EXT1:
+            pos += buf[pos + 1] - 1
+        elif block == SIBT_EXT2:
+            pos += struct.unpack_from('<H', buf, pos + 1)[0] - 1
+        elif block == SIBT_EXT4:
+            pos += struct.unpack_from('<I', buf, pos + 1)[0] - 1
+        else:
+            break  # fonts and unknown blocks: stop rather than misnumber
+    return strings
+
+
+def find_string_packages(buf, language=b'en-US'):
+    """(offset, {id: text}) for each string package in the given language"""
+    packages = []
+    marker = language + b'\0'
+    hdr_size = STRING_PACKAGE_FIXED + len(marker)
+    pos = buf.find(marker)
+    while pos != -1:
+        start = pos - STRING_PACKAGE_FIXED
+        if start >= 0 and buf[start + 3] == EFI_HII_PACKAGE_STRINGS:
+            length = int.from_bytes(buf[start:start + 3], 'little')
+            size, info_offset = struct.unpack_from('<II', buf, start + 4)
+            if size == hdr_size and info_offset == hdr_size and start + length <= len(buf):
+                try:
+                    packages.append((start, parse_string_package(buf, start, length)))
+                except (struct.error, IndexError):
+                    pass
+        pos = buf.find(marker, pos + 1)
+    return packages
+
+
+def _value(buf, pos, value_type):
+    width = VALUE_WIDTHS.get(value_type)
+    return (int.from_bytes(buf[pos:pos + width], 'little'), width) if width else (None, None)
+
+
+def parse_form_package(buf, start, length):
+    """Question dicts (string ids unresolved) from one IFR form package"""
+    end = start + length
+    pos = start + 4
+    varstores = {}
+    questions = []
+    scopes = []          # (opcode, question dict or None)
+    formset = form = None
+    while pos + 2 <= end:
+        opcode = buf[pos]
+        op_len = buf[pos + 1] & 0x7F
+        has_scope = bool(buf[pos + 1] & 0x80)
+        if op_len < 2 or pos + op_len > end:
+            break
+        body = pos + 2
+        question = None
+
+        if opcode == IFR_FORM_SET:
+            formset = {'guid': _guid(buf[body:body + 16]), 'title': struct.unpack_from('<H', buf, body + 16)[0]}
+            varstores = {}
+        elif opcode == IFR_FORM:
+            form = struct.unpack_from('<H', buf, body + 2)[0]
+        elif opcode == IFR_VARSTORE and op_len >= 24:
+            guid = _guid(buf[body:body + 16])
+            store_id, size = struct.unpack_from('<HH', buf, body + 16)
+            name_end = buf.find(b'\0', body + 20, pos + op_len)
+            name = bytes(buf[body + 20:name_end if name_end != -1 else pos + op_len]).decode('ascii', 'replace')
+            varstores[store_id] = {'name': name, 'guid': guid, 'size': size}
+        elif opcode == IFR_VARSTORE_EFI and op_len >= 28:
+            # Unlike EFI_IFR_VARSTORE, the id comes before the GUID
+            store_id, raw_guid, _attributes, size = struct.unpack_from('<H16sIH', buf, body)
+            guid = _guid(raw_guid)
+            name_end = buf.find(b'\0', body + 24, pos + op_len)
+            name = bytes(buf[body + 24:name_end if name_end != -1 else pos + op_len]).decode('ascii', 'replace')
+            varstores[store_id] = {'name': name, 'guid': guid, 'size': size}
+        elif opcode == IFR_VARSTORE_NAME_VALUE and op_len >= 20:
+            store_id = struct.unpack_from('<H', buf, body)[0]
+            varstores[store_id] = None   # named values, not byte offsets
+        elif opcode in QUESTION_TYPES and op_len >= 2 + QUESTION_HEADER.size + 1:
+            prompt, help_id, question_id, store_id, offset, _flags = QUESTION_HEADER.unpack_from(buf, body)
+            extra = body + QUESTION_HEADER.size
+            question = {
+                'type': QUESTION_TYPES[opcode], 'question_id': question_id,
+                'prompt': prompt, 'help': help_id, 'varstore_id': store_id, 'offset': offset,
+                'form': form, 'formset': formset['guid'] if formset else None,
+                'suppressed': any(op == IFR_SUPPRESS_IF for op, _ in scopes),
+                'grayed_out': any(op == IFR_GRAY_OUT_IF for op, _ in scopes),
+            }
+            if opcode in (IFR_ONE_OF, IFR_NUMERIC):
+                width = NUMERIC_WIDTHS[buf[extra] & 0x03]
+                question['width'] = width
+                if op_len >= extra - pos + 1 + 3 * width:
+                    fields = [int.from_bytes(buf[extra + 1 + i * width:extra + 1 + (i + 1) * width], 'little')
+                              for i in range(3)]
+                    question['min'], question['max'], question['step'] = fields
+                if opcode == IFR_ONE_OF:
+                    question['options'] = []
+            elif opcode == IFR_CHECKBOX:
+                question['width'] = 1
+                question['default'] = 1 if buf[extra] & 0x01 else 0
+            elif opcode == IFR_STRING:
+                question['width'] = buf[extra + 1] * 2
+            elif opcode == IFR_ORDERED_LIST:
+                question['containers'] = buf[extra]
+                question['width'] = buf[extra]
+                question['options'] = []
+            store = varstores.get(store_id)
+            if store:
+                question['varstore'] = store['name']
+                question['varstore_guid'] = store['guid']
+                questions.append(question)
+        elif opcode == IFR_ONE_OF_OPTION and op_len >= 6:
+            owner = next((q for _, q in reversed(scopes) if q is not None), None)
+            if owner is not None and 'options' in owner:
+                text_id, flags, value_type = struct.unpack_from('<HBB', buf, body)
+                value, width = _value(buf, body + 4, value_type)
+                if value is not None:
+                    owner['options'].append({'value': value, 'text': text_id,
+                                             'default': bool(flags & (OPTION_DEFAULT | OPTION_DEFAULT_MFG))})
+                    if flags & OPTION_DEFAULT and 'default' not in owner:
+                        owner['default'] = value
+                    if owner['type'] == 'ordered_list':
+                        owner['width'] = owner['containers'] * width
+        elif opcode == IFR_DEFAULT and op_len >= 6:
+            owner = next((q for _, q in reversed(scopes) if q is not None), None)
+            default_id, value_type = struct.unpack_from('<HB', buf, body)
+            value, _width = _value(buf, body + 3, value_type)
+            if owner is not None and default_id == 0 and value is not None:
+                owner['default'] = value
+        elif opcode == IFR_END:
+            if scopes:
+                scopes.pop()
+
+        if has_scope and opcode != IFR_END:
+            scopes.append((opcode, question))
+        pos += op_len
+    return questions
+
+
+def find_form_packages(buf):
+    """(offset, length) of each IFR form package (package header + FORM_SET)"""
+    packages = []
+    pos = buf.find(bytes((EFI_HII_PACKAGE_FORMS, IFR_FORM_SET)), 3)
+    while pos != -1:
+        start = pos - 3
+        op_len = buf[pos + 2] & 0x7F if pos + 2 < len(buf) else 0
+        length = int.from_bytes(buf[start:start + 3], 'little')
+        if (buf[pos + 2] & 0x80 and op_len >= FORM_SET_FIXED and (op_len - FORM_SET_FIXED) % 16 == 0
+                and op_len + 4 < length and start + length <= len(buf)):
+            packages.append((start, length))
+        pos = buf.find(bytes((EFI_HII_PACKAGE_FORMS, IFR_FORM_SET)), pos + 1)
+    return packages
+
+
+def _lzma_sections(buf):
+    """Decompressed payloads of LZMA GUID-defined sections in buf"""
+    pos = buf.find(LZMA_SECTION_GUID)
+    while pos != -1:
+        start = pos - 4
+        if start >= 0 and buf[start + 3] == EFI_SECTION_GUID_DEFINED:
+            size = int.from_bytes(buf[start:start + 3], 'little')
+            data_offset = struct.unpack_from('<H', buf, pos + 16)[0]
+            if 24 <= data_offset < size and start + size <= len(buf):
+                try:
+                    yield lzma.decompress(bytes(buf[start + data_offset:start + size]), format=lzma.FORMAT_ALONE)
+                except lzma.LZMAError:
+                    pass
+        pos = buf.find(LZMA_SECTION_GUID, pos + 1)
+
+
+def _scan(buf, questions, depth=0):
+    strings = find_string_packages(buf)
+    for start, length in find_form_packages(buf):
+        table = min(strings, key=lambda s: abs(s[0] - start))[1] if strings else {}
+        for q in parse_form_package(buf, start, length):
+            q['prompt'] = table.get(q['prompt'], f"STR_{q['prompt']:04X}")
+            q['help'] = table.get(q['help'], '')
+            for option in q.get('options', ()):
+                option['text'] = table.get(option['text'], f"STR_{option['text']:04X}")
+            questions.append(q)
+    if depth < MAX_SECTION_DEPTH:
+        for inner in _lzma_sections(buf):
+            _scan(inner, questions, depth + 1)
+
+
+class SetupForms:
+    """Setup questions grouped by variable store, ordered by offset"""
+
+    def __init__(self, questions, digest=None, source=None):
+        self.digest = digest
+        self.source = source
+        self.questions = questions
+        self.varstores = {}
+        seen = set()
+        for q in sorted(questions, key=lambda q: (q['varstore'], q['varstore_guid'], q['offset'])):
+            key = (q['varstore'], q['varstore_guid'], q['offset'], q['question_id'])
+            if key in seen:
+                continue   # the same form set compiled into several drivers
+            seen.add(key)
+            self.varstores.setdefault(f"{q['varstore']}-{q['varstore_guid']}", []).append(q)
+
+    def __len__(self):
+        return len(self.questions)
+
+    def store_questions(self, name, guid=None):
+        """Questions for a variable store by name (and GUID), or None"""
+        if guid:
+            return self.varstores.get(f"{name}-{guid.lower()}")
+        matches = [qs for key, qs in self.varstores.items() if key[:-37] == name]
+        return matches[0] if len(matches) == 1 else None
+
+    def decode(self, name, guid, data):
+        """Current setting of every question in a store's data blob, or None"""
+        questions = self.store_questions(name, guid)
+        if questions is None:
+            return None
+        settings = []
+        for q in questions:
+            width = q.get('width', 1)
+            if q['offset'] + width > len(data):
+                continue
+            raw = data[q['offset']:q['offset'] + width]
+            value = int.from_bytes(raw, 'little')
+            if q['type'] == 'string':
+                setting = raw.decode('utf-16-le', 'replace').split('\0', 1)[0]
+            elif q['type'] == 'checkbox':
+                setting = 'Enabled' if value else 'Disabled'
+            elif q['type'] == 'ordered_list':
+                setting = raw.hex()
+            else:
+                labels = {o['value']: o['text'] for o in q.get('options', ())}
+                setting = labels.get(value, str(value))
+            settings.append({
+                'prompt': q['prompt'], 'offset': q['offset'], 'width': width, 'type': q['type'],
+                'value': value, 'setting': setting, 'default': q.get('default'),
+                'changed': q.get('default') is not None and value != q['default'],
+                'suppressed': q['suppressed'],
+            })
+        return settings
+
+    def hidden(self):
+        """Questions the setup UI never shows (under suppressif)"""
+        return [q for qs in self.varstores.values() for q in qs if q['suppressed']]
+
+    def to_dict(self):
+        return {'format': CACHE_FORMAT, 'digest': self.digest, 'source': self.source, 'questions': self.questions}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['questions'], data.get('digest'), data.get('source'))
+
+
+def extract_setup_forms(buf, digest=None, source=None):
+    """Parse every IFR form package in an image buffer"""
+    questions = []
+    _scan(buf, questions)
+    return SetupForms(questions, digest, source)
+
+
+def bios_key(identity):
+    """Alias key for a BIOS version from host identity / dmidecode fields"""
+    fields = [(identity or {}).get(k) for k in ('bios_vendor', 'bios_version', 'bios_date')]
+    if not fields[1] or fields[1] == 'Unknown':
+        return None
+    return '|'.join(str(f or '').strip() for f in fields)
+
+
+class SetupFormCache:
+    """Extracted setup forms on disk, by image digest and BIOS version"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self._loaded = {}
+        self._aliases = None
+
+    def _path(self, digest):
+        return self.cache_dir / f"{digest}.json"
+
+    @property
+    def aliases(self):
+        if self._aliases is None:
+            try:
+                with open(self.cache_dir / ALIAS_FILE, 'r') as f:
+                    self._aliases = json.load(f)
+            except (OSError, ValueError):
+                self._aliases = {}
+        return self._aliases
+
+    def _save_alias(self, key, digest):
+        if self.aliases.get(key) == digest:
+            return
+        self.aliases[key] = digest
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_dir / (ALIAS_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.aliases, f, indent=1, sort_keys=True)
+        tmp.replace(self.cache_dir / ALIAS_FILE)
+
+    def load(self, digest):
+        """Cached forms for an image digest, or None"""
+        if digest in self._loaded:
+            return self._loaded[digest]
+        try:
+            with open(self._path(digest), 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('format') != CACHE_FORMAT:
+            return None
+        forms = self._loaded[digest] = SetupForms.from_dict(data)
+        return forms
+
+    def for_image(self, image_path, identity=None):
+        """Forms for an image: cached by SHA256, extracted on first sight"""
+        with open(image_path, 'rb') as f:
+            buf = f.read()
+        digest = hashlib.sha256(buf).hexdigest()
+        forms = self.load(digest)
+        if forms is None:
+            forms = extract_setup_forms(buf, digest, str(image_path))
+            logging.info(f"Extracted {len(forms)} setup question(s) from {image_path}")
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self._path(digest).with_suffix('.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(forms.to_dict(), f, separators=(',', ':'))
+            tmp.replace(self._path(digest))
+            self._loaded[digest] = forms
+        key = bios_key(identity)
+        if key:
+            self._save_alias(key, digest)
+        return forms
+
+    def for_bios(self, identity):
+        """Cached forms for a BIOS vendor/version/date, or None"""
+        key = bios_key(identity)
+        digest = self.aliases.get(key) if key else None
+        return self.load(digest) if digest else None
+
+
+_CACHES = {}
+
+
+def setup_forms(image=None, identity=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Setup forms for an image and/or BIOS identity, or None.
+
+    With an image the forms are extracted (or loaded by digest) and the
+    identity's BIOS version is pointed at them; without one, only a BIOS
+    version seen before can be answered.
+    """
+    cache = _CACHES.get(str(cache_dir))
+    if cache is None:
+        cache = _CACHES[str(cache_dir)] = SetupFormCache(cache_dir)
+    if image:
+        return cache.for_image(image, identity)
+    return cache.for_bios(identity)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PhoenixGuard HII Setup Form Extractor')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Extraction cache directory')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Verbose logging')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    ext = sub.add_parser('extract', help='Extract (or load cached) setup forms from an image')
+    ext.add_argument('image')
+    ext.add_argument('--this-host', action='store_true', help="Record the image as this host's BIOS version")
+
+    show = sub.add_parser('show', help='List setup questions')
+    show.add_argument('--image', help='Firmware image (default: cache entry for this host)')
+    show.add_argument('--varstore', help='Only questions stored in this variable')
+    show.add_argument('--hidden', action='store_true', help='Only suppressed questions')
+
+    dec = sub.add_parser('decode', help="Decode a variable's current settings")
+    dec.add_argument('variable', help='Full efivarfs name (Name-GUID)')
+    dec.add_argument('--image', help='Firmware image (default: cache entry for this host)')
+    dec.add_argument('--source', help='efivarfs-style directory, host snapshot or flash image')
+
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    from host_snapshot import host_identity
+    identity = host_identity() if args.command != 'extract' or args.this_host else None
+    image = args.image
+    forms = setup_forms(image, identity, args.cache_dir)
+    if forms is None:
+        print("❌ No setup forms cached for this BIOS version; run 'extract IMAGE --this-host' first")
+        return 1
+
+    if args.command == 'extract':
+        print(f"🧩 {len(forms)} question(s) in {len(forms.varstores)} variable store(s), "
+              f"{len(forms.hidden())} hidden")
+        for key, questions in sorted(forms.varstores.items()):
+            print(f"   {key:<60} {len(questions)}")
+        print(f"📦 Cached as {forms.digest}")
+        return 0
+
+    if args.command == 'show':
+        for key, questions in sorted(forms.varstores.items()):
+            if args.varstore and not key.startswith(args.varstore + '-'):
+                continue
+            for q in questions:
+                if args.hidden and not q['suppressed']:
+                    continue
+                flag = '🙈' if q['suppressed'] else '  '
+                print(f"{flag} {key[:-37]}+0x{q['offset']:04x}/{q.get('width', 1)} {q['type']:<12} {q['prompt']}")
+        return 0
+
+    from efivars import open_store, split_name
+    parts = split_name(args.variable)
+    if parts is None:
+        print(f"❌ Not a Name-GUID variable name: {args.variable}")
+        return 1
+    data = open_store(args.source).read(*parts)
+    if data is None:
+        print(f"❌ Cannot read {args.variable}")
+        return 1
+    settings = forms.decode(parts[0], parts[1], data)
+    if settings is None:
+        print(f"❌ No setup questions stored in {args.variable}")
+        return 1
+    for s in settings:
+        mark = '*' if s['changed'] else ' '
+        print(f"{mark} 0x{s['offset']:04x} {s['prompt']:<48} {s['setting']}")
+    print(f"📊 {len(settings)} setting(s), {sum(s['changed'] for s in settings)} changed from default")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
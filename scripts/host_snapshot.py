@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard Host Snapshot Archive
+Capture live firmware state once, analyze it anywhere.
+
+A snapshot is a single zip archive (deflate, fast level) whose central
+directory doubles as the member index, plus an index.json describing the
+host and every captured section:
+
+  index.json                    host identity, capture stats, efivar table
+  efivars/<Name>-<GUID>         raw efivarfs contents (4-byte attributes + data)
+  dmi/id/<field>                /sys/devices/virtual/dmi/id fields
+  dmi/tables/{DMI,smbios_entry_point}
+  esp/digests.json              ESP file digests (scripts/esp_scanner.py)
+  esp/Allowed.manifest.sha256   the ESP's allowed manifest, if present
+  tpm/binary_bios_measurements  TCG measured-boot event log
+  acpi/FPDT, acpi/fpdt_boot.json  firmware performance table and boot record
+  fwupd/devices.txt             fwupdmgr get-devices output
+
+Capture only reads sysfs and runs fwupdmgr in the background, so it finishes
+in about a second; BootkitHunter, the UEFI variable tools and the recovery
+tooling all accept the archive in place of the live system.
+
+Usage:
+  sudo python3 scripts/host_snapshot.py capture -o out/snapshots/host.pgsnap --esp /boot/efi
+  python3 scripts/host_snapshot.py show out/snapshots/host.pgsnap
+  python3 scripts/host_snapshot.py extract out/snapshots/host.pgsnap /tmp/host
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+SNAPSHOT_FORMAT = 'phoenixguard-host-snapshot'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = '.pgsnap'
+
+EFIVARS_PATH = Path('/sys/firmware/efi/efivars')
+DMI_ID_PATH = Path('/sys/devices/virtual/dmi/id')
+DMI_TABLES_PATH = Path('/sys/firmware/dmi/tables')
+TPM_EVENT_LOG_PATH = Path('/sys/kernel/security/tpm0/binary_bios_measurements')
+MACHINE_ID_PATH = Path('/etc/machine-id')
+
+INDEX_MEMBER = 'index.json'
+EFIVARS_PREFIX = 'efivars/'
+DMI_ID_PREFIX = 'dmi/id/'
+DMI_TABLE_MEMBER = 'dmi/tables/DMI'
+DMI_ENTRY_POINT_MEMBER = 'dmi/tables/smbios_entry_point'
+ESP_DIGESTS_MEMBER = 'esp/digests.json'
+ESP_MANIFEST_MEMBER = 'esp/Allowed.manifest.sha256'
+TPM_EVENT_LOG_MEMBER = 'tpm/binary_bios_measurements'
+FPDT_TABLE_MEMBER = 'acpi/FPDT'
+FPDT_BOOT_MEMBER = 'acpi/fpdt_boot.json'
+FWUPD_DEVICES_MEMBER = 'fwupd/devices.txt'
+
+FWUPD_TIMEOUT = 10
+
+
+def _read_bytes(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _read_text(path):
+    data = _read_bytes(path)
+    return data.decode('utf-8', 'replace').strip() if data is not None else None
+
+
+def is_snapshot(path):
+    """Return True if path looks like a host snapshot archive"""
+    return bool(path) and os.path.isfile(path) and zipfile.is_zipfile(path)
+
+
+def host_identity():
+    """Identity fields of the live host"""
+    return {
+        'hostname': socket.gethostname(),
+        'machine_id': _read_text(MACHINE_ID_PATH),
+        'product_uuid': _read_text(DMI_ID_PATH / 'product_uuid'),
+        'sys_vendor': _read_text(DMI_ID_PATH / 'sys_vendor'),
+        'product_name': _read_text(DMI_ID_PATH / 'product_name'),
+        'board_name': _read_text(DMI_ID_PATH / 'board_name'),
+        'bios_vendor': _read_text(DMI_ID_PATH / 'bios_vendor'),
+        'bios_version': _read_text(DMI_ID_PATH / 'bios_version'),
+        'bios_date': _read_text(DMI_ID_PATH / 'bios_date'),
+        'kernel_release': os.uname().release
+    }
+
+
+def host_id_of(host, fallback=None):
+    """Stable key for a host: machine-id, then product UUID, then hostname"""
+    return host.get('machine_id') or host.get('product_uuid') or host.get('hostname') or fallback
+
+
+class HostSnapshotCapture:
+    """Collects live host firmware state into a snapshot archive"""
+
+    def __init__(self, output_path, esp_path=None, esp_manifest=None,
+                 esp_cache=None, include_fwupd=True):
+        self.output_path = Path(output_path)
+        self.esp_path = esp_path
+        self.esp_manifest = esp_manifest
+        self.esp_cache = esp_cache
+        self.include_fwupd = include_fwupd
+        self.index = {
+            'format': SNAPSHOT_FORMAT,
+            'version': SNAPSHOT_VERSION,
+            'captured_utc': None,
+            'capture_seconds': None,
+            'host': {},
+            'sections': [],
+            'efivars': {},
+            'errors': []
+        }
+
+    def _start_fwupd(self):
+        if not self.include_fwupd or not shutil.which('fwupdmgr'):
+            return None
+        try:
+            return subprocess.Popen(['fwupdmgr', 'get-devices', '--no-unreported-check'],
+                                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        except OSError as e:
+            self.index['errors'].append(f"fwupd: {e}")
+            return None
+
+    def _collect_fwupd(self, proc, zf):
+        if proc is None:
+            return
+        try:
+            out, _ = proc.communicate(timeout=FWUPD_TIMEOUT)
+            if proc.returncode == 0:
+                zf.writestr(FWUPD_DEVICES_MEMBER, out)
+                self.index['sections'].append('fwupd')
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            self.index['errors'].append('fwupd: timed out')
+
+    def _capture_efivars(self, zf):
+        if not EFIVARS_PATH.is_dir():
+            return
+        try:
+            with os.scandir(EFIVARS_PATH) as it:
+                entries = [e for e in it if e.is_file(follow_symlinks=False)]
+        except OSError as e:
+            self.index['errors'].append(f"efivars: {e}")
+            return
+        for entry in entries:
+            raw = _read_bytes(entry.path)
+            if raw is None:
+                self.index['errors'].append(f"efivars: cannot read {entry.name}")
+                continue
+            zf.writestr(EFIVARS_PREFIX + entry.name, raw)
+            attributes = struct.unpack_from('<I', raw)[0] if len(raw) >= 4 else None
+            self.index['efivars'][entry.name] = {
+                'size': max(len(raw) - 4, 0),
+                'attributes': attributes
+            }
+        self.index['sections'].append('efivars')
+
+    def _capture_dmi(self, zf):
+        if DMI_ID_PATH.is_dir():
+            for entry in os.scandir(DMI_ID_PATH):
+                if not entry.is_file(follow_symlinks=False) or entry.name in ('uevent', 'modalias'):
+                    continue
+                value = _read_text(entry.path)
+                if value is not None:
+                    zf.writestr(DMI_ID_PREFIX + entry.name, value)
+            self.index['sections'].append('dmi_id')
+        table = _read_bytes(DMI_TABLES_PATH / 'DMI')
+        entry_point = _read_bytes(DMI_TABLES_PATH / 'smbios_entry_point')
+        if table is not None and entry_point is not None:
+            zf.writestr(DMI_TABLE_MEMBER, table)
+            zf.writestr(DMI_ENTRY_POINT_MEMBER, entry_point)
+            self.index['sections'].append('dmi_tables')
+
+    def _capture_esp(self, zf):
+        if not self.esp_path:
+            return
+        if not os.path.isdir(self.esp_path):
+            self.index['errors'].append(f"esp: not found: {self.esp_path}")
+            return
+        from esp_scanner import ESPScanner, DEFAULT_CACHE_PATH
+        scanner = ESPScanner(self.esp_path, self.esp_manifest, self.esp_cache or DEFAULT_CACHE_PATH)
+        results = scanner.scan()
+        zf.writestr(ESP_DIGESTS_MEMBER, json.dumps({
+            'esp_path': results['esp_path'],
+            'digests': results['digests'],
+            'errors': results['errors']
+        }))
+        manifest = _read_bytes(scanner.manifest_path)
+        if manifest is not None:
+            zf.writestr(ESP_MANIFEST_MEMBER, manifest)
+        self.index['sections'].append('esp')
+
+    def _capture_tpm(self, zf):
+        log = _read_bytes(TPM_EVENT_LOG_PATH)
+        if log:
+            zf.writestr(TPM_EVENT_LOG_MEMBER, log)
+            self.index['sections'].append('tpm_event_log')
+
+    def _capture_fpdt(self, zf):
+        from fpdt import FPDT_TABLE_PATH, read_boot_record
+        table = _read_bytes(FPDT_TABLE_PATH)
+        if table is not None:
+            zf.writestr(FPDT_TABLE_MEMBER, table)
+        # The FBPT lives in firmware memory, so the decoded record is stored too
+        record = read_boot_record()
+        if record is not None:
+            zf.writestr(FPDT_BOOT_MEMBER, json.dumps(record))
+            self.index['sections'].append('fpdt')
+
+    def capture(self):
+        """Capture the host into the snapshot archive and return its index"""
+        start = time.monotonic()
+        self.index['captured_utc'] = datetime.utcnow().isoformat() + 'Z'
+        self.index['host'] = host_identity()
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.output_path.with_name(self.output_path.name + '.tmp')
+
+        # fwupd is the only slow source; let it run while we read sysfs
+        fwupd = self._start_fwupd()
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+            self._capture_efivars(zf)
+            self._capture_dmi(zf)
+            self._capture_tpm(zf)
+            self._capture_fpdt(zf)
+            self._capture_esp(zf)
+            self._collect_fwupd(fwupd, zf)
+            self.index['capture_seconds'] = round(time.monotonic() - start, 3)
+            zf.writestr(INDEX_MEMBER, json.dumps(self.index, indent=1))
+        os.replace(tmp_path, self.output_path)
+
+        logging.info(f"Snapshot captured in {self.index['capture_seconds']}s: {self.output_path}")
+        return self.index
+
+
+class HostSnapshot:
+    """Read-only view of a captured host, mirroring the live sysfs sources"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._zip = zipfile.ZipFile(self.path, 'r')
+        self._members = set(self._zip.namelist())
+        if INDEX_MEMBER not in self._members:
+            self._zip.close()
+            raise ValueError(f"Not a PhoenixGuard host snapshot: {self.path}")
+        self.index = json.loads(self._zip.read(INDEX_MEMBER))
+        if self.index.get('format') != SNAPSHOT_FORMAT:
+            self._zip.close()
+            raise ValueError(f"Unsupported snapshot format: {self.index.get('format')}")
+        self._efivars_dir = None
+        self._efivar_store = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._zip.close()
+        if self._efivars_dir:
+            shutil.rmtree(self._efivars_dir, ignore_errors=True)
+            self._efivars_dir = None
+
+    @property
+    def host(self):
+        return self.index.get('host', {})
+
+    @property
+    def host_id(self):
+        return host_id_of(self.host, self.path.stem)
+
+    def has(self, member):
+        return member in self._members
+
+    def read(self, member):
+        """Return a member's bytes, or None if it was not captured"""
+        if member not in self._members:
+            return None
+        return self._zip.read(member)
+
+    def read_text(self, member):
+        data = self.read(member)
+        return data.decode('utf-8', 'replace') if data is not None else None
+
+    def dmi_field(self, field):
+        value = self.read_text(DMI_ID_PREFIX + field)
+        return value.strip() if value is not None else None
+
+    def efivar_names(self):
+        """Full efivarfs names (Name-GUID) in the snapshot"""
+        return list(self.index.get('efivars', {}))
+
+    def read_efivar(self, full_name):
+        """Raw efivarfs contents (attributes + data) for Name-GUID"""
+        return self.read(EFIVARS_PREFIX + full_name)
+
+    def efivar_store(self):
+        """EfiVariableStore over the captured efivars, read from the archive"""
+        if self._efivar_store is None:
+            from efivars import EfiVariableStore
+            self._efivar_store = EfiVariableStore(self)
+        return self._efivar_store
+
+    def efivars_dir(self):
+        """Materialize efivars as a directory laid out like /sys/firmware/efi/efivars"""
+        if self._efivars_dir is None:
+            self._efivars_dir = tempfile.mkdtemp(prefix='pgsnap_efivars_')
+            for name in self.efivar_names():
+                with open(os.path.join(self._efivars_dir, name), 'wb') as f:
+                    f.write(self.read_efivar(name))
+        return Path(self._efivars_dir)
+
+    def tpm_event_log(self):
+        return self.read(TPM_EVENT_LOG_MEMBER)
+
+    def fpdt_boot_record(self):
+        data = self.read(FPDT_BOOT_MEMBER)
+        return json.loads(data) if data is not None else None
+
+    def fwupd_devices(self):
+        return self.read_text(FWUPD_DEVICES_MEMBER)
+
+    def esp_digests(self):
+        data = self.read(ESP_DIGESTS_MEMBER)
+        return json.loads(data) if data is not None else None
+
+    def esp_manifest(self):
+        return self.read_text(ESP_MANIFEST_MEMBER)
+
+    def dmi_dump_bin(self):
+        """
+        Rebuild the SMBIOS tables in `dmidecode --dump-bin` layout so they can
+        be decoded offline with `dmidecode --from-dump`.
+
+        The dump holds the entry point at offset 0 with its table address
+        rewritten to 32, followed by the structure table at offset 32.
+        """
+        entry = self.read(DMI_ENTRY_POINT_MEMBER)
+        table = self.read(DMI_TABLE_MEMBER)
+        if not entry or table is None:
+            return None
+        entry = bytearray(entry)
+        if entry[:5] == b'_SM3_' and len(entry) >= 24:
+            struct.pack_into('<Q', entry, 0x10, 32)
+            length = entry[0x06]
+            entry[0x05] = 0
+            entry[0x05] = (-sum(entry[:length])) & 0xFF
+        elif entry[:4] == b'_SM_' and len(entry) >= 31:
+            struct.pack_into('<I', entry, 0x18, 32)
+            entry[0x15] = 0
+            entry[0x15] = (-sum(entry[0x10:0x1F])) & 0xFF
+            length = entry[0x05]
+            entry[0x04] = 0
+            entry[0x04] = (-sum(entry[:length])) & 0xFF
+        else:
+            return None
+        return bytes(entry).ljust(32, b'\x00') + table
+
+    def dmidecode(self, dmi_type):
+        """Decode captured SMBIOS tables with dmidecode (None if unavailable)"""
+        dump = self.dmi_dump_bin()
+        if dump is None or not shutil.which('dmidecode'):
+            return None
+        with tempfile.NamedTemporaryFile(prefix='pgsnap_dmi_') as f:
+            f.write(dump)
+            f.flush()
+            try:
+                result = subprocess.run(['dmidecode', '--from-dump', f.name, '-t', dmi_type],
+                                        capture_output=True, text=True, timeout=10)
+            except (OSError, subprocess.TimeoutExpired):
+                return None
+        return result.stdout if result.returncode == 0 else None
+
+    def extract(self, dest):
+        """Unpack the archive into a directory"""
+        self._zip.extractall(dest)
+        return Path(dest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PhoenixGuard Host Snapshot Archive')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Verbose logging')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    cap = sub.add_parser('capture', help='Capture live firmware state into an archive')
+    cap.add_argument('-o', '--output', help=f'Output archive (default: out/snapshots/<hostname>{SNAPSHOT_SUFFIX})')
+    cap.add_argument('--esp', help='Mounted ESP to digest (e.g. /boot/efi)')
+    cap.add_argument('--esp-manifest', help='Allowed manifest for the ESP')
+    cap.add_argument('--esp-cache', help='ESP digest cache file')
+    cap.add_argument('--no-fwupd', action='store_true', help='Skip fwupdmgr output')
+
+    show = sub.add_parser('show', help='Print a snapshot index')
+    show.add_argument('snapshot')
+
+    ext = sub.add_parser('extract', help='Unpack a snapshot into a directory')
+    ext.add_argument('snapshot')
+    ext.add_argument('dest')
+
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    if args.command == 'capture':
+        if os.geteuid() != 0:
+            print("⚠️  Warning: Not running as root. Some efivars and DMI fields may be missing.")
+        output = args.output or f"out/snapshots/{socket.gethostname()}{SNAPSHOT_SUFFIX}"
+        index = HostSnapshotCapture(output, args.esp, args.esp_manifest, args.esp_cache,
+                                    include_fwupd=not args.no_fwupd).capture()
+        print(f"📦 Snapshot: {output}")
+        print(f"⏱️  Capture time: {index['capture_seconds']}s")
+        print(f"🗂️  Sections: {', '.join(index['sections']) or 'none'}")
+        print(f"🔑 EFI variables: {len(index['efivars'])}")
+        for error in index['errors']:
+            print(f"⚠️  {error}")
+        return 0
+
+    if not is_snapshot(args.snapshot):
+        logging.error(f"Snapshot not found or not an archive: {args.snapshot}")
+        return 1
+
+    with HostSnapshot(args.snapshot) as snap:
+        if args.command == 'show':
+            summary = dict(snap.index)
+            summary['efivars'] = len(summary.get('efivars', {}))
+            print(json.dumps(summary, indent=2))
+        elif args.command == 'extract':
+            print(f"📂 Extracted to: {snap.extract(args.dest)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
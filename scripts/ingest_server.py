@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard Scan Result Ingest Service
+Collects streamed detection results from many hosts into one SQLite database.
+
+Clients POST NDJSON (optionally gzip-compressed) to /ingest; each line is a
+BootkitHunter detection result or a fleet scan record. Accepted batches go on
+a bounded queue and a single writer thread drains it, inserting thousands of
+rows per transaction. When the queue is full the server answers 503 with
+Retry-After, and IngestClient backs off and retries, so a burst of hosts
+slows down instead of losing results.
+
+Endpoints:
+  POST /ingest            NDJSON body -> 202 {"accepted": n}
+  GET  /healthz           queue depth and counters
+  GET  /results?host_id=&risk_level=&since=&limit=
+
+Usage:
+  python3 scripts/ingest_server.py serve --db out/ingest/results.db --port 8765
+  python3 scripts/detect_bootkit.py --ingest-url http://127.0.0.1:8765
+  python3 scripts/ingest_server.py query --db out/ingest/results.db --risk-level CRITICAL
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_DB_PATH = 'out/ingest/results.db'
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 64 * 1024 * 1024
+QUEUE_BATCHES = 256          # pending POST bodies before 503
+WRITE_BATCH_ROWS = 5000      # rows per transaction
+WRITE_FLUSH_SECONDS = 0.5
+WRITE_RETRIES = 5            # attempts for a batch hitting a transient error (locked, disk full)
+RETRY_AFTER_SECONDS = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    received_utc TEXT NOT NULL,
+    scan_timestamp TEXT,
+    host_id TEXT,
+    hostname TEXT,
+    source TEXT,
+    risk_level TEXT,
+    recommended_action TEXT,
+    finding_count INTEGER,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_host ON results(host_id, scan_timestamp);
+CREATE INDEX IF NOT EXISTS idx_results_risk ON results(risk_level, scan_timestamp);
+CREATE INDEX IF NOT EXISTS idx_results_time ON results(scan_timestamp);
+"""
+
+INSERT_SQL = ("INSERT INTO results (received_utc, scan_timestamp, host_id, hostname, source, "
+              "risk_level, recommended_action, finding_count, record) VALUES (?,?,?,?,?,?,?,?,?)")
+
+
+def open_db(db_path):
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def result_row(record, received_utc, raw_line):
+    """Map a detection result or fleet record onto the indexed columns"""
+    findings = record.get('findings')
+    if findings is None:
+        findings = record.get('threats_detected', []) + record.get('modifications_found', [])
+    return (
+        received_utc,
+        record.get('scan_timestamp') or received_utc,
+        record.get('host_id'),
+        record.get('hostname'),
+        record.get('source') or record.get('snapshot'),
+        record.get('risk_level'),
+        record.get('recommended_action'),
+        len(findings),
+        raw_line,
+    )
+
+
+class ResultWriter(threading.Thread):
+    """Single writer draining the ingest queue into SQLite in bulk"""
+
+    def __init__(self, db_path, pending):
+        super().__init__(name='ingest-writer', daemon=True)
+        self.db_path = db_path
+        self.pending = pending
+        self.rows_written = 0
+        self.batches_written = 0
+        self.rows_dropped = 0
+        self.last_error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            conn = open_db(self.db_path)
+        except sqlite3.Error as e:
+            self.last_error = str(e)
+            logging.error(f"Ingest writer cannot open {self.db_path}: {e}")
+            return
+        try:
+            while not (self._stop_event.is_set() and self.pending.empty()):
+                rows = self._collect()
+                if rows:
+                    self._write(conn, rows)
+        except Exception as e:
+            self.last_error = str(e)
+            logging.exception(f"Ingest writer stopped: {e}")
+        finally:
+            conn.close()
+
+    def _write(self, conn, rows):
+        """Insert one batch; transient errors are retried with backoff, then the batch is dropped"""
+        delay = 0.25
+        for attempt in range(1, WRITE_RETRIES + 1):
+            try:
+                with conn:
+                    conn.executemany(INSERT_SQL, rows)
+                self.rows_written += len(rows)
+                self.batches_written += 1
+                return True
+            except sqlite3.OperationalError as e:
+                # Locked database, full disk, I/O error: may clear up
+                self.last_error = str(e)
+                if attempt < WRITE_RETRIES and not self._stop_event.is_set():
+                    logging.warning(f"Ingest write failed ({e}); retry {attempt}/{WRITE_RETRIES - 1} in {delay:.2f}s")
+                    time.sleep(delay)
+                    delay = min(delay * 2, 5.0)
+            except sqlite3.Error as e:
+                # Constraint or schema mismatch: retrying the same rows cannot help
+                self.last_error = str(e)
+                break
+        self.rows_dropped += len(rows)
+        logging.error(f"Dropped {len(rows)} ingested row(s): {self.last_error}")
+        return False
+
+    def _collect(self):
+        rows = []
+        deadline = time.monotonic() + WRITE_FLUSH_SECONDS
+        while len(rows) < WRITE_BATCH_ROWS:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                rows.extend(self.pending.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return rows
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class IngestServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, db_path, queue_batches=QUEUE_BATCHES):
+        super().__init__(address, IngestHandler)
+        self.db_path = db_path
+        self.pending = queue.Queue(maxsize=queue_batches)
+        self.writer = ResultWriter(db_path, self.pending)
+        self.stats = {'accepted': 0, 'rejected_busy': 0, 'bad_lines': 0}
+        self._stats_lock = threading.Lock()
+
+    def serve_forever(self, poll_interval=0.5):
+        self.writer.start()
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self.writer.stop()
+
+    def count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    server_version = 'PhoenixGuardIngest/1.0'
+
+    def log_message(self, fmt, *args):
+        logging.debug(f"{self.address_string()} {fmt % args}")
+
+    def _reply(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/ingest':
+            return self._reply(404, {'error': 'not found'})
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0 or length > MAX_BODY_BYTES:
+            return self._reply(413 if length else 411, {'error': 'bad content length'})
+        body = self.rfile.read(length)
+        server = self.server
+
+        # Nothing will drain the queue; tell clients rather than queueing until 503
+        if not server.writer.is_alive():
+            return self._reply(503, {'error': 'writer unavailable', 'detail': server.writer.last_error})
+
+        # Cheap rejection before parsing when the writer is behind
+        if server.pending.full():
+            server.count('rejected_busy')
+            return self._reply(503, {'error': 'busy'}, {'Retry-After': str(RETRY_AFTER_SECONDS)})
+
+        try:
+            if self.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+        except (OSError, EOFError):
+            return self._reply(400, {'error': 'bad gzip body'})
+
+        received_utc = datetime.utcnow().isoformat()
+        rows = []
+        bad = 0
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                text = line.decode('utf-8')
+                record = json.loads(text)
+                rows.append(result_row(record, received_utc, text))
+            except (UnicodeDecodeError, ValueError, AttributeError, TypeError):
+                bad += 1
+        if bad:
+            server.count('bad_lines', bad)
+        if rows:
+            try:
+                server.pending.put_nowait(rows)
+            except queue.Full:
+                server.count('rejected_busy')
+                return self._reply(503, {'error': 'busy'}, {'Retry-After': str(RETRY_AFTER_SECONDS)})
+            server.count('accepted', len(rows))
+        return self._reply(202, {'accepted': len(rows), 'rejected': bad})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        server = self.server
+        if url.path == '/healthz':
+            writer = server.writer
+            return self._reply(200 if writer.is_alive() else 503,
+                               dict(server.stats,
+                                    queue_depth=server.pending.qsize(),
+                                    writer_alive=writer.is_alive(),
+                                    rows_written=writer.rows_written,
+                                    batches_written=writer.batches_written,
+                                    rows_dropped=writer.rows_dropped,
+                                    last_error=writer.last_error))
+        if url.path == '/results':
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            try:
+                limit = int(params.get('limit', 100))
+            except ValueError:
+                limit = 0
+            if limit < 1:
+                return self._reply(400, {'error': 'limit must be a positive integer'})
+            conn = sqlite3.connect(server.db_path)
+            try:
+                rows = query_results(conn, params.get('host_id'), params.get('risk_level'),
+                                     params.get('since'), limit)
+            finally:
+                conn.close()
+            return self._reply(200, {'results': rows})
+        return self._reply(404, {'error': 'not found'})
+
+
+def query_results(conn, host_id=None, risk_level=None, since=None, limit=100):
+    """Most recent results matching the filters, served from the indexes"""
+    clauses, args = [], []
+    if host_id:
+        clauses.append('host_id = ?')
+        args.append(host_id)
+    if risk_level:
+        clauses.append('risk_level = ?')
+        args.append(risk_level)
+    if since:
+        clauses.append('scan_timestamp >= ?')
+        args.append(since)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    cursor = conn.execute(
+        f"SELECT scan_timestamp, host_id, hostname, source, risk_level, recommended_action, "
+        f"finding_count FROM results {where} ORDER BY scan_timestamp DESC LIMIT ?",
+        args + [limit])
+    columns = [c[0] for c in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
+
+class IngestClient:
+    """
+    Batching NDJSON client with backoff.
+
+    Records are buffered and POSTed gzip-compressed once batch_size records
+    or flush_interval seconds accumulate. 503s and connection errors are
+    retried with exponential backoff (honouring Retry-After).
+    """
+
+    def __init__(self, url, batch_size=500, flush_interval=2.0, max_retries=6, timeout=10):
+        self.url = url.rstrip('/') + '/ingest' if not url.rstrip('/').endswith('/ingest') else url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self.sent = 0
+        self.failed = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def send(self, record):
+        self._buffer.append(json.dumps(record, separators=(',', ':'), default=str))
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """POST buffered records; returns False if they could not be delivered"""
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return True
+        lines, self._buffer = self._buffer, []
+        body = gzip.compress(('\n'.join(lines) + '\n').encode(), compresslevel=1)
+        delay = 0.25
+        for attempt in range(self.max_retries + 1):
+            request = urllib.request.Request(self.url, data=body, method='POST', headers={
+                'Content-Type': 'application/x-ndjson',
+                'Content-Encoding': 'gzip'
+            })
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+                self.sent += len(lines)
+                return True
+            except urllib.error.HTTPError as e:
+                if e.code not in (429, 503):
+                    logging.error(f"Ingest rejected batch ({e.code}): {e.read()[:200]!r}")
+                    break
+                retry_after = e.headers.get('Retry-After')
+                wait = float(retry_after) if retry_after else delay
+            except (urllib.error.URLError, OSError) as e:
+                logging.debug(f"Ingest attempt {attempt + 1} failed: {e}")
+                wait = delay
+            if attempt < self.max_retries:
+                time.sleep(wait)
+                delay = min(delay * 2, 30)
+        self.failed += len(lines)
+        logging.warning(f"Dropped {len(lines)} result(s) after {self.max_retries} retries to {self.url}")
+        return False
+
+    def close(self):
+        return self.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PhoenixGuard Scan Result Ingest Service')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Verbose logging')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    serve = sub.add_parser('serve', help='Run the ingest server')
+    serve.add_argument('--db', default=DEFAULT_DB_PATH, help='SQLite database path')
+    serve.add_argument('--host', default='127.0.0.1', help='Listen address')
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT, help='Listen port')
+    serve.add_argument('--queue', type=int, default=QUEUE_BATCHES, help='Pending batches before 503')
+
+    query = sub.add_parser('query', help='Query stored results')
+    query.add_argument('--db', default=DEFAULT_DB_PATH, help='SQLite database path')
+    query.add_argument('--host-id')
+    query.add_argument('--risk-level')
+    query.add_argument('--since', help='ISO timestamp lower bound')
+    query.add_argument('-n', '--limit', type=int, default=50)
+
+    send = sub.add_parser('send', help='Stream an NDJSON/JSON results file to a server')
+    send.add_argument('url', help='Ingest server URL (e.g. http://127.0.0.1:8765)')
+    send.add_argument('files', nargs='+', help='bootkit_detection.json or fleet NDJSON reports')
+
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    if args.command == 'serve':
+        server = IngestServer((args.host, args.port), args.db, args.queue)
+        logging.info(f"📥 Ingest server on http://{args.host}:{server.server_port} -> {args.db}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return 0
+
+    if args.command == 'query':
+        if not Path(args.db).exists():
+            logging.error(f"Database not found: {args.db}")
+            return 1
+        conn = sqlite3.connect(args.db)
+        try:
+            for row in query_results(conn, args.host_id, args.risk_level, args.since, args.limit):
+                print(json.dumps(row))
+        finally:
+            conn.close()
+        return 0
+
+    if args.command == 'send':
+        with IngestClient(args.url) as client:
+            for path in args.files:
+                with open(path, 'r') as f:
+                    if path.endswith('.json'):
+                        client.send(json.load(f))
+                        continue
+                    for line in f:
+                        if line.strip():
+                            client.send(json.loads(line))
+        print(f"📤 Sent {client.sent} result(s), {client.failed} failed")
+        return 1 if client.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard Offline NVRAM Parser
+Reads EFI variables out of SPI flash dumps without booting the machine.
+
+Two store formats are recognised:
+
+  - EDK2 variable stores: the VARIABLE_STORE_HEADER signed with
+    gEfiVariableGuid or gEfiAuthenticatedVariableGuid (and the older '$VSS'
+    signature), holding VARIABLE_HEADER / AUTHENTICATED_VARIABLE_HEADER
+    records. Only records in the ADDED state are live.
+  - AMI NVAR: chains of 'NVAR' entries. An entry's Next field points at its
+    newer version; the last one in the chain carries the current data. GUIDs
+    are either inline or an index into the GUID table at the end of the
+    enclosing firmware volume.
+
+FirmwareImageStore exposes the result as an EfiVariableStore, so discovery,
+analysis and snapshot tools work on a dump exactly as on efivarfs. scan_dumps()
+summarises a whole archive of dumps on a process pool.
+
+Usage:
+  python3 scripts/nvram_store.py list bios_extractions/G615LP.bin
+  python3 scripts/nvram_store.py batch bios_extractions/ -j 8 -o out/logs/nvram_scan.ndjson
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from efivars import EfiVariable, EfiVariableStore
+
+EFI_VARIABLE_GUID = uuid.UUID('ddcf3616-3275-4164-98b6-fe85707ffe7d').bytes_le
+EFI_AUTHENTICATED_VARIABLE_GUID = uuid.UUID('aaf32c78-947b-439a-a180-2e144ec37792').bytes_le
+VSS_SIGNATURE = b'$VSS'
+NVAR_SIGNATURE = b'NVAR'
+FV_SIGNATURE = b'_FVH'
+
+VARIABLE_STORE_FORMATTED = 0x5A
+VARIABLE_DATA = 0x55AA
+VAR_ADDED = 0x3F
+VAR_IN_DELETED_TRANSITION = 0xFE
+LIVE_STATES = (VAR_ADDED, VAR_ADDED & VAR_IN_DELETED_TRANSITION)
+
+GUID_STORE_HEADER = struct.Struct('<16sIBBHI')          # Signature, Size, Format, State, Reserved, Reserved1
+VSS_STORE_HEADER = struct.Struct('<4sIBBHI')            # '$VSS' variant
+VARIABLE_HEADER = struct.Struct('<HBBIII16s')           # StartId, State, Reserved, Attributes, NameSize, DataSize, VendorGuid
+AUTH_VARIABLE_HEADER = struct.Struct('<HBBIQ16sIII16s')  # + MonotonicCount, TimeStamp, PubKeyIndex
+
+NVAR_HEADER = struct.Struct('<4sH3sB')                  # Signature, Size, Next (24-bit), Attributes
+NVAR_RUNTIME = 0x01
+NVAR_ASCII_NAME = 0x02
+NVAR_GUID = 0x04
+NVAR_DATA_ONLY = 0x08
+NVAR_EXT_HEADER = 0x10
+NVAR_HW_ERROR = 0x20
+NVAR_AUTH_WRITE = 0x40
+NVAR_VALID = 0x80
+NVAR_NEXT_NONE = 0xFFFFFF
+
+# EFI_VARIABLE_* attribute bits used when mapping NVAR flags
+EFI_NV, EFI_BS, EFI_RT, EFI_HW_ERROR, EFI_TIME_AUTH = 0x01, 0x02, 0x04, 0x08, 0x20
+
+
+def _guid(raw):
+    return str(uuid.UUID(bytes_le=bytes(raw)))
+
+
+def _utf16_name(raw):
+    return bytes(raw).decode('utf-16-le', 'replace').split('\0', 1)[0]
+
+
+class NvramVariable:
+    """One live variable located in an image (data is a byte range)"""
+
+    __slots__ = ('name', 'guid', 'attributes', 'data_offset', 'data_size', 'store_format', 'store_offset')
+
+    def __init__(self, name, guid, attributes, data_offset, data_size, store_format, store_offset):
+        self.name = name
+        self.guid = guid
+        self.attributes = attributes
+        self.data_offset = data_offset
+        self.data_size = data_size
+        self.store_format = store_format
+        self.store_offset = store_offset
+
+    @property
+    def full_name(self):
+        return f"{self.name}-{self.guid}"
+
+
+def _parse_vss_records(buf, start, end, authenticated, store_format, store_offset):
+    header = AUTH_VARIABLE_HEADER if authenticated else VARIABLE_HEADER
+    found = {}
+    off = start
+    while off + header.size <= end:
+        fields = header.unpack_from(buf, off)
+        if fields[0] != VARIABLE_DATA:
+            break
+        state, attributes = fields[1], fields[3]
+        name_size, data_size, vendor = fields[-3], fields[-2], fields[-1]
+        name_off = off + header.size
+        data_off = name_off + name_size
+        record_end = data_off + data_size
+        if record_end > end or name_size > 0x1000:
+            break
+        if state in LIVE_STATES and name_size:
+            var = NvramVariable(_utf16_name(buf[name_off:data_off]), _guid(vendor), attributes,
+                                data_off, data_size, store_format, store_offset)
+            # Later records supersede earlier ones (in-delete-transition copies)
+            found[var.full_name] = var
+        off = (record_end + 3) & ~3
+    return list(found.values())
+
+
+def find_vss_stores(buf):
+    """Live variables from every EDK2 variable store in the image"""
+    variables = []
+    for signature, authenticated in ((EFI_VARIABLE_GUID, False), (EFI_AUTHENTICATED_VARIABLE_GUID, True)):
+        pos = buf.find(signature)
+        while pos != -1:
+            _sig, size, fmt, _state, _r, _r1 = GUID_STORE_HEADER.unpack_from(buf, pos) \
+                if pos + GUID_STORE_HEADER.size <= len(buf) else (None, 0, 0, 0, 0, 0)
+            if fmt == VARIABLE_STORE_FORMATTED and GUID_STORE_HEADER.size < size <= len(buf) - pos:
+                store_format = 'vss-auth' if authenticated else 'vss'
+                variables.extend(_parse_vss_records(buf, pos + GUID_STORE_HEADER.size, pos + size,
+                                                    authenticated, store_format, pos))
+            pos = buf.find(signature, pos + 1)
+    pos = buf.find(VSS_SIGNATURE)
+    while pos != -1:
+        if pos + VSS_STORE_HEADER.size <= len(buf):
+            _sig, size, fmt, _state, _r, _r1 = VSS_STORE_HEADER.unpack_from(buf, pos)
+            if fmt == VARIABLE_STORE_FORMATTED and VSS_STORE_HEADER.size < size <= len(buf) - pos:
+                variables.extend(_parse_vss_records(buf, pos + VSS_STORE_HEADER.size, pos + size,
+                                                    False, 'vss', pos))
+        pos = buf.find(VSS_SIGNATURE, pos + 1)
+    return variables
+
+
+def _enclosing_volume_end(buf, offset):
+    """End of the firmware volume containing offset (GUID table anchor), or None"""
+    pos = buf.rfind(FV_SIGNATURE, 0, offset)
+    while pos >= 40:
+        fv_start = pos - 40
+        fv_length = struct.unpack_from('<Q', buf, fv_start + 32)[0]
+        if fv_start + fv_length > offset and fv_start + fv_length <= len(buf):
+            return fv_start + fv_length
+        pos = buf.rfind(FV_SIGNATURE, 0, pos)
+    return None
+
+
+def _nvar_entry(buf, off, end):
+    """(size, next, attributes) of a well-formed NVAR entry at off, else None"""
+    if off + NVAR_HEADER.size > end or buf[off:off + 4] != NVAR_SIGNATURE:
+        return None
+    _sig, size, next_raw, attributes = NVAR_HEADER.unpack_from(buf, off)
+    if size < NVAR_HEADER.size or off + size > end:
+        return None
+    return size, int.from_bytes(next_raw, 'little'), attributes
+
+
+def _parse_nvar_chain(buf, start, end):
+    """Parse consecutive NVAR entries from start; returns (variables, chain end)"""
+    entries = {}
+    off = start
+    while True:
+        entry = _nvar_entry(buf, off, end)
+        if entry is None:
+            break
+        entries[off] = entry
+        off += entry[0]
+    chain_end = off
+    if len(entries) < 2 and not (chain_end >= end or buf[chain_end:chain_end + 1] == b'\xff'):
+        return [], start + 1                       # a stray 'NVAR' string, not a store
+
+    volume_end = _enclosing_volume_end(buf, start) or end
+    variables = {}
+    for entry_off, (size, next_rel, attributes) in entries.items():
+        if attributes & NVAR_DATA_ONLY or not attributes & NVAR_VALID:
+            continue
+        pos = entry_off + NVAR_HEADER.size
+        if attributes & NVAR_GUID:
+            guid = _guid(buf[pos:pos + 16])
+            pos += 16
+        else:
+            index = buf[pos]
+            guid_off = volume_end - 16 * (index + 1)
+            guid = _guid(buf[guid_off:guid_off + 16]) if guid_off >= start else f"guid-index-{index}"
+            pos += 1
+        if attributes & NVAR_ASCII_NAME:
+            name_end = buf.find(b'\0', pos, entry_off + size)
+            if name_end == -1:
+                continue
+            name = bytes(buf[pos:name_end]).decode('ascii', 'replace')
+            pos = name_end + 1
+        else:
+            name_end = pos
+            while name_end + 1 < entry_off + size and buf[name_end:name_end + 2] != b'\0\0':
+                name_end += 2
+            name = _utf16_name(buf[pos:name_end])
+            pos = name_end + 2
+
+        # Follow Next to the newest version; data-only updates carry just data
+        cur_off, cur_size, cur_next, cur_attrs, data_start = entry_off, size, next_rel, attributes, pos
+        seen = {entry_off}
+        while cur_next != NVAR_NEXT_NONE:
+            nxt = cur_off + cur_next
+            if nxt in seen or nxt not in entries:
+                break
+            seen.add(nxt)
+            cur_off = nxt
+            cur_size, cur_next, cur_attrs = entries[nxt]
+            data_start = nxt + NVAR_HEADER.size
+        if not cur_attrs & NVAR_VALID:
+            continue
+        data_end = cur_off + cur_size
+        if cur_attrs & NVAR_EXT_HEADER and cur_size >= NVAR_HEADER.size + 2:
+            ext_size = struct.unpack_from('<H', buf, data_end - 2)[0]
+            if ext_size <= data_end - data_start:
+                data_end -= ext_size
+        if data_end < data_start:
+            continue
+
+        efi_attributes = EFI_NV | EFI_BS
+        if attributes & NVAR_RUNTIME:
+            efi_attributes |= EFI_RT
+        if attributes & NVAR_HW_ERROR:
+            efi_attributes |= EFI_HW_ERROR
+        if attributes & NVAR_AUTH_WRITE:
+            efi_attributes |= EFI_TIME_AUTH
+        var = NvramVariable(name, guid, efi_attributes, data_start, data_end - data_start, 'nvar', start)
+        variables[var.full_name] = var
+    return list(variables.values()), chain_end
+
+
+def find_nvar_stores(buf):
+    """Live variables from every AMI NVAR chain in the image"""
+    variables = []
+    pos = buf.find(NVAR_SIGNATURE)
+    while pos != -1:
+        found, resume = _parse_nvar_chain(buf, pos, len(buf))
+        variables.extend(found)
+        pos = buf.find(NVAR_SIGNATURE, max(resume, pos + 1))
+    return variables
+
+
+def parse_nvram(buf):
+    """All live variables in an image; the first store holding a name wins"""
+    variables = {}
+    for var in find_vss_stores(buf) + find_nvar_stores(buf):
+        variables.setdefault(var.full_name, var)
+    return list(variables.values())
+
+
+class FirmwareImageStore(EfiVariableStore):
+    """EfiVariableStore over the NVRAM stores of a flash image"""
+
+    def __init__(self, image_path):
+        super().__init__(image_path)
+        self._file = None
+        self._map = None
+        self.stores = {}
+
+    @property
+    def source_label(self):
+        return str(self.path)
+
+    def available(self):
+        return self.path.is_file()
+
+    def _buffer(self):
+        if self._map is None:
+            self._file = open(self.path, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _list(self):
+        variables = {}
+        try:
+            found = parse_nvram(self._buffer())
+        except (OSError, ValueError) as e:
+            logging.warning(f"Cannot parse NVRAM in {self.path}: {e}")
+            return variables
+        for nv in found:
+            self.stores.setdefault((nv.store_format, nv.store_offset), 0)
+            self.stores[(nv.store_format, nv.store_offset)] += 1
+            variables[nv.full_name] = EfiVariable(self, nv.name, nv.guid, nv.full_name, path=nv,
+                                                  size=nv.data_size, attributes=nv.attributes)
+        return variables
+
+    def _load(self, var):
+        nv = var.path
+        data = self._buffer()[nv.data_offset:nv.data_offset + nv.data_size]
+        self.bytes_read += len(data)
+        # Same layout as an efivarfs file: attribute word, then data
+        return struct.pack('<I', nv.attributes) + data
+
+    def _stat_size(self, var):
+        return var.path.data_size
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = self._file = None
+
+
+def summarize_dump(path):
+    """Variables of one dump as a JSON-ready record (runs in pool workers)"""
+    start = time.monotonic()
+    record = {'image': str(path), 'variables': {}, 'stores': [], 'error': None}
+    store = FirmwareImageStore(path)
+    try:
+        for var in store:
+            data = var.data
+            record['variables'][var.full_name] = {
+                'attributes': var.attributes,
+                'size': var.size,
+                'sha256': hashlib.sha256(data).hexdigest()
+            }
+        record['stores'] = [{'format': fmt, 'offset': offset, 'variables': count}
+                            for (fmt, offset), count in sorted(store.stores.items(), key=lambda s: s[0][1])]
+    except Exception as e:
+        record['error'] = str(e)
+    finally:
+        store.close()
+    record['scan_ms'] = round((time.monotonic() - start) * 1000, 2)
+    return record
+
+
+def find_dumps(root, suffixes=('.bin', '.rom', '.fd', '.cap', '.img')):
+    root = Path(root)
+    if root.is_file():
+        return [str(root)]
+    return sorted(str(p) for p in root.rglob('*') if p.is_file() and p.suffix.lower() in suffixes)
+
+
+def scan_dumps(paths, output_path, jobs=None, chunksize=4):
+    """Summarize many dumps on a process pool into an NDJSON report"""
+    jobs = jobs or os.cpu_count() or 1
+    stats = {'images': 0, 'with_variables': 0, 'variables': 0, 'errors': 0}
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as out, multiprocessing.Pool(jobs) as pool:
+        for record in pool.imap_unordered(summarize_dump, paths, chunksize=chunksize):
+            stats['images'] += 1
+            stats['variables'] += len(record['variables'])
+            stats['with_variables'] += bool(record['variables'])
+            stats['errors'] += bool(record['error'])
+            out.write(json.dumps(record, separators=(',', ':')) + '\n')
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PhoenixGuard Offline NVRAM Parser')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Verbose logging')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    lst = sub.add_parser('list', help='List the variables in one flash image')
+    lst.add_argument('image')
+
+    batch = sub.add_parser('batch', help='Summarize every dump under a directory')
+    batch.add_argument('path', help='Directory of flash dumps (or one dump)')
+    batch.add_argument('-o', '--output', default='out/logs/nvram_scan.ndjson', help='NDJSON report path')
+    batch.add_argument('-j', '--jobs', type=int, help='Worker processes (default: CPU count)')
+
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    if args.command == 'list':
+        store = FirmwareImageStore(args.image)
+        if not store.available():
+            logging.error(f"Image not found: {args.image}")
+            return 1
+        variables = sorted(store, key=lambda v: (v.guid, v.name))
+        for var in variables:
+            print(f"{var.guid}  {var.name:<40} {var.size:>8}  {','.join(var.attribute_names)}")
+        for (fmt, offset), count in sorted(store.stores.items(), key=lambda s: s[0][1]):
+            print(f"🗄️  {fmt} store at 0x{offset:x}: {count} variable(s)")
+        print(f"📊 {len(variables)} variable(s) in {args.image}")
+        store.close()
+        return 0 if variables else 1
+
+    dumps = find_dumps(args.path)
+    if not dumps:
+        logging.error(f"No flash dumps under: {args.path}")
+        return 1
+    start = time.monotonic()
+    stats = scan_dumps(dumps, args.output, args.jobs)
+    print(f"🧬 {stats['images']} image(s), {stats['with_variables']} with NVRAM, "
+          f"{stats['variables']} variable(s), {stats['errors']} error(s) in {time.monotonic() - start:.2f}s")
+    print(f"📄 Report: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard Variable Payload Classifier
+Guesses what an EFI variable's data is (bool, integer, ASCII, UTF-16, GUID,
+device path / load option, compressed or high-entropy) for many payloads at
+once, without per-byte Python loops.
+
+Byte statistics for the whole batch come from one pass: with NumPy, the
+payloads are concatenated and every count (non-printable bytes, NULs, 0xFF,
+UTF-16 high bytes) and the byte histogram behind the entropy estimate are
+segment reductions over that single array. Without NumPy each payload costs
+a few bytes.translate / bytes.count calls, which run in C. Only the
+structural checks (GUID bits, device path node walk) look at individual
+headers.
+
+  info = classify_payload(data)
+  info['kind'], info['labels'], info.get('text')
+  describe_payload(info, data)    # the findings as readable strings
+  infos = classify_payloads([v.data for v in store])
+
+Usage:
+  python3 scripts/payload_classifier.py [--source DIR|SNAPSHOT|IMAGE] [-l]
+"""
+
+import argparse
+import math
+import struct
+import sys
+import time
+import uuid
+from collections import Counter
+
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except ImportError:
+    HAVE_NUMPY = False
+
+# Bytes deleted by translate() to count what is left over
+PRINTABLE = bytes(range(0x20, 0x7F))
+PRINTABLE_OR_NUL = b'\0' + PRINTABLE
+LATIN1_TEXT = b'\0\t\n\r' + PRINTABLE + bytes(range(0xA0, 0x100))
+
+HIGH_ENTROPY_MIN_SIZE = 32
+HIGH_ENTROPY_RATIO = 0.9        # of the maximum possible for the payload size
+INT_KINDS = {1: 'uint8', 2: 'uint16', 4: 'uint32', 8: 'uint64'}
+COMPRESSED_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+    (b'\x5d\x00\x00', 'lzma'),
+    (b'\x78\x01', 'zlib'), (b'\x78\x5e', 'zlib'), (b'\x78\x9c', 'zlib'), (b'\x78\xda', 'zlib'),
+)
+
+# Device path node types (UEFI spec 2.10, 10.3.1)
+DEVICE_PATH_TYPES = {0x01: 'hardware', 0x02: 'acpi', 0x03: 'messaging', 0x04: 'media', 0x05: 'bbs'}
+END_DEVICE_PATH = 0x7F
+END_ENTIRE = 0xFF
+LOAD_OPTION_HEADER = struct.Struct('<IH')   # Attributes, FilePathListLength
+
+if HAVE_NUMPY:
+    _NONPRINT = np.ones(256, dtype=np.int64)
+    _NONPRINT[0] = 0
+    _NONPRINT[0x20:0x7F] = 0
+    _NONTEXT_LATIN1 = np.ones(256, dtype=np.int64)
+    _NONTEXT_LATIN1[np.frombuffer(LATIN1_TEXT, dtype=np.uint8)] = 0
+
+
+def _device_path_end(data, pos, limit):
+    """End offset of a well-formed device path at pos, else None"""
+    nodes = 0
+    while pos + 4 <= limit:
+        node_type, sub_type, length = data[pos], data[pos + 1], struct.unpack_from('<H', data, pos + 2)[0]
+        if length < 4 or pos + length > limit:
+            return None
+        if node_type == END_DEVICE_PATH:
+            pos += length
+            if sub_type == END_ENTIRE:
+                return pos if nodes else None
+            continue                     # end of one instance, another follows
+        if node_type not in DEVICE_PATH_TYPES:
+            return None
+        nodes += 1
+        pos += length
+    return None
+
+
+def _load_option(data):
+    """Description of an EFI_LOAD_OPTION, else None"""
+    if len(data) < LOAD_OPTION_HEADER.size + 2 + 4:
+        return None
+    _attributes, path_len = LOAD_OPTION_HEADER.unpack_from(data)
+    pos = LOAD_OPTION_HEADER.size
+    while pos + 1 < len(data) and data[pos:pos + 2] != b'\0\0':
+        pos += 2
+    if pos + 2 + path_len > len(data) or path_len < 4:
+        return None
+    description = data[LOAD_OPTION_HEADER.size:pos]
+    if description.translate(None, PRINTABLE_OR_NUL):
+        return None                      # UTF-16 of non-ASCII text is rare in load options
+    end = _device_path_end(data, pos + 2, pos + 2 + path_len)
+    return description.decode('utf-16-le', 'replace') if end == pos + 2 + path_len else None
+
+
+def _is_guid(data):
+    return len(data) == 16 and 1 <= data[7] >> 4 <= 5 and data[8] & 0xC0 == 0x80
+
+
+def _stats_python(payloads):
+    """Per payload: (non-printable, NUL, 0xFF, UTF-16 high non-zero, UTF-16 low non-text, entropy)"""
+    stats = []
+    for data in payloads:
+        n = len(data)
+        if not n:
+            stats.append((0, 0, 0, 0, 0, 0.0))
+            continue
+        counts = Counter(data)
+        entropy = -sum(c / n * math.log2(c / n) for c in counts.values())
+        stats.append((
+            len(data.translate(None, PRINTABLE_OR_NUL)),
+            counts.get(0, 0),
+            counts.get(0xFF, 0),
+            len(data[1::2].translate(None, b'\0')),
+            len(data[0::2].translate(None, LATIN1_TEXT)),
+            entropy,
+        ))
+    return stats
+
+
+def _stats_numpy(payloads):
+    """_stats_python as segment reductions over one concatenated array"""
+    lengths = np.fromiter((len(p) for p in payloads), dtype=np.int64, count=len(payloads))
+    total = int(lengths.sum())
+    stats = [(0, 0, 0, 0, 0, 0.0)] * len(payloads)
+    if not total:
+        return stats
+    buf = np.frombuffer(b''.join(payloads), dtype=np.uint8)
+    nonempty = np.nonzero(lengths)[0]
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))[nonempty]
+    seg = np.repeat(np.arange(len(nonempty)), lengths[nonempty])
+    odd = ((np.arange(total) - starts[seg]) & 1).astype(bool)
+
+    nonprint = np.add.reduceat(_NONPRINT[buf], starts)
+    nul = np.add.reduceat((buf == 0).astype(np.int64), starts)
+    erased = np.add.reduceat((buf == 0xFF).astype(np.int64), starts)
+    high = np.add.reduceat((odd & (buf != 0)).astype(np.int64), starts)
+    low = np.add.reduceat(np.where(odd, 0, _NONTEXT_LATIN1[buf]), starts)
+
+    # H = log2(n) - sum(c * log2(c)) / n over the non-zero histogram cells only
+    hist = np.bincount(seg * 256 + buf, minlength=len(nonempty) * 256)
+    cells = np.nonzero(hist)[0]
+    counts = hist[cells].astype(np.float64)
+    seg_lengths = lengths[nonempty].astype(np.float64)
+    entropy = np.log2(seg_lengths) - np.bincount(cells >> 8, weights=counts * np.log2(counts),
+                                                 minlength=len(nonempty)) / seg_lengths
+
+    rows = zip(nonprint.tolist(), nul.tolist(), erased.tolist(), high.tolist(), low.tolist(), entropy.tolist())
+    for i, row in zip(nonempty.tolist(), rows):
+        stats[i] = row
+    return stats
+
+
+def _classify(data, stats):
+    n = len(data)
+    nonprint, nul, erased, high, low, entropy = stats
+    info = {'size': n, 'kind': 'binary', 'labels': []}
+    labels = info['labels']
+    if n == 0:
+        info['kind'] = 'empty'
+        return info
+
+    if n == 1 and data[0] in (0, 1):
+        labels.append('bool')
+    if n in INT_KINDS:
+        labels.append(INT_KINDS[n])
+        info['value'] = int.from_bytes(data, 'little')
+    if nul == n:
+        labels.append('zero')
+    elif erased == n:
+        labels.append('erased')
+
+    description = _load_option(data) if nul < n else None
+    if description is not None:
+        labels.append('load_option')
+        info['text'] = description
+    elif nul < n and _device_path_end(data, 0, n) == n:
+        labels.append('device_path')
+    if _is_guid(data):
+        labels.append('guid')
+
+    # UTF-16 text also passes the ASCII test (NUL counts as printable), so
+    # the text comes from whichever label wins 'kind' below
+    if nul < n and not nonprint:
+        labels.append('ascii')
+    if n > 2 and n % 2 == 0 and not high and not low and nul < n:
+        labels.append('utf16')
+    if 'text' not in info:
+        if 'utf16' in labels:
+            info['text'] = data.decode('utf-16-le').rstrip('\0')
+        elif 'ascii' in labels:
+            info['text'] = data.decode('ascii').rstrip('\0')
+
+    for magic, name in COMPRESSED_MAGIC:
+        if n >= 16 and data.startswith(magic):
+            labels.append('compressed')
+            info['compression'] = name
+            break
+    if n >= HIGH_ENTROPY_MIN_SIZE and entropy >= HIGH_ENTROPY_RATIO * math.log2(min(n, 256)):
+        labels.append('high_entropy')
+    info['entropy'] = round(entropy, 3)
+
+    # Most specific guess first
+    for kind in ('load_option', 'device_path', 'guid', 'bool', 'zero', 'erased', 'utf16', 'ascii',
+                 'uint8', 'uint16', 'uint32', 'uint64', 'compressed', 'high_entropy'):
+        if kind in labels:
+            info['kind'] = kind
+            break
+    return info
+
+
+def classify_payloads(payloads):
+    """Type guesses for many payloads (bytes; None entries stay None)"""
+    present = [(i, bytes(p)) for i, p in enumerate(payloads) if p is not None]
+    data = [p for _, p in present]
+    stats = _stats_numpy(data) if HAVE_NUMPY else _stats_python(data)
+    results = [None] * len(payloads)
+    for (i, payload), s in zip(present, stats):
+        results[i] = _classify(payload, s)
+    return results
+
+
+def classify_payload(data):
+    """Type guess for one payload"""
+    return classify_payloads([data])[0]
+
+
+def describe_payload(info, data):
+    """Human-readable findings for a classified payload"""
+    findings = []
+    labels = info['labels']
+    value = info.get('value')
+    if info['size'] == 1:
+        findings.append({0: "Disabled/False/Zero", 1: "Enabled/True/One"}.get(value, f"Single byte value: {value}"))
+    elif value is not None:
+        bits = info['size'] * 8
+        findings.append(f"{bits}-bit value: {value} (0x{value:0{bits // 4}x})")
+    if 'load_option' in labels:
+        findings.append(f"Load option: '{info['text']}'")
+    elif 'device_path' in labels:
+        findings.append("EFI device path")
+    if 'guid' in labels:
+        findings.append(f"GUID: {uuid.UUID(bytes_le=bytes(data))}")
+    if 'ascii' in labels:
+        findings.append(f"ASCII String: '{data.decode('ascii').rstrip(chr(0))}'")
+    if 'utf16' in labels:
+        findings.append(f"UTF-16 String: '{data.decode('utf-16-le').rstrip(chr(0))}'")
+    if 'compressed' in labels:
+        findings.append(f"Compressed data ({info['compression']})")
+    if 'high_entropy' in labels:
+        findings.append(f"High-entropy data ({info['entropy']} bits/byte): hash, key or encrypted")
+    return findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Classify EFI variable payloads')
+    parser.add_argument('--source', help='efivarfs-style directory, host snapshot or flash image (default: live efivarfs)')
+    parser.add_argument('-l', '--list', action='store_true', help='Print every variable with its guess')
+    args = parser.parse_args()
+
+    from efivars import open_store
+    store = open_store(args.source)
+    variables = [v for v in store if v.readable]
+    start = time.perf_counter()
+    results = classify_payloads([v.data for v in variables])
+    elapsed = (time.perf_counter() - start) * 1000
+    if args.list:
+        for var, info in sorted(zip(variables, results), key=lambda p: (p[1]['kind'], p[0].name)):
+            text = f"  {info['text'][:40]!r}" if info.get('text') else ''
+            print(f"{info['kind']:<13} {var.name:<40} {info['size']:>7}{text}")
+    print(f"📊 {len(results)} payload(s) from {store.source_label} in {elapsed:.1f}ms "
+          f"({'numpy' if HAVE_NUMPY else 'bytes.translate'}):")
+    for kind, count in Counter(info['kind'] for info in results).most_common():
+        print(f"   {kind:<13} {count}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -22,6 +22,7 @@ OUT_LOGS_DIR="out/logs"
 BASELINE_JSON="${BASELINE_JSON:-${OUT_BASELINE_DIR}/firmware_baseline.json}"
 CLEAN_FW="${CLEAN_FIRMWARE:-drivers/G615LPAS.325}"
 SCAN_OUT="${SCAN_OUT:-${OUT_LOGS_DIR}/bootkit_scan_results.json}"
+ESP_PATH="${ESP_PATH:-}"
 
 mkdir -p "${OUT_BASELINE_DIR}" "${OUT_LOGS_DIR}"
 
@@ -54,7 +55,11 @@ fi
 
 # Run bootkit detection
 echo "🔍 Scanning system for bootkit infections..."
-"${PY}" scripts/detect_bootkit.py -v -b "${BASELINE_JSON}" --output "${SCAN_OUT}"
+ESP_ARGS=()
+if [ -n "${ESP_PATH}" ]; then
+  ESP_ARGS=(--esp "${ESP_PATH}")
+fi
+"${PY}" scripts/detect_bootkit.py -v -b "${BASELINE_JSON}" --output "${SCAN_OUT}" "${ESP_ARGS[@]}"
 
 echo
 echo "📊 Scan complete! Check ${SCAN_OUT} for detailed results."
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard Scan Resource Budget
+Lets deep scans run on production hosts without stealing I/O or CPU.
+
+A ScanBudget combines:
+  - a read-rate token bucket (max MB/s across all hashing threads)
+  - CPU-share pacing (process CPU time kept under a fraction of wall time)
+  - idle-class I/O priority (ioprio_set) and an optional nice level
+  - pause/resume/stop control via signals (SIGUSR1 / SIGUSR2 / SIGTERM)
+
+ScanCheckpoint persists completed units of work so an interrupted scan picks
+up where it stopped instead of starting over.
+
+Scanners call budget.charge(nbytes) after each read; everything else is
+handled here.
+"""
+
+import ctypes
+import json
+import logging
+import os
+import platform
+import signal
+import threading
+import time
+from pathlib import Path
+
+# ioprio_set(2): not wrapped by the os module
+IOPRIO_SYSCALL = {
+    'x86_64': 251, 'amd64': 251, 'i386': 289, 'i686': 289,
+    'aarch64': 30, 'arm64': 30, 'riscv64': 30,
+    'armv7l': 314, 'ppc64le': 273, 'ppc64': 273, 's390x': 282,
+}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+
+CHECKPOINT_VERSION = 1
+CHECKPOINT_INTERVAL = 5.0  # seconds between checkpoint writes
+
+
+class ScanInterrupted(Exception):
+    """Raised inside a scan when the budget has been told to stop"""
+
+
+def set_idle_io_priority():
+    """Put this process in the idle I/O class; returns True on success"""
+    nr = IOPRIO_SYSCALL.get(platform.machine().lower())
+    if nr is None:
+        logging.debug(f"ioprio_set syscall number unknown for {platform.machine()}")
+        return False
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.syscall(nr, IOPRIO_WHO_PROCESS, 0, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) != 0:
+            logging.debug(f"ioprio_set failed: {os.strerror(ctypes.get_errno())}")
+            return False
+    except (OSError, AttributeError) as e:
+        logging.debug(f"ioprio_set unavailable: {e}")
+        return False
+    return True
+
+
+class ScanBudget:
+    """Shared read-rate, CPU-share and priority budget for one scan"""
+
+    def __init__(self, max_read_mbps=None, max_cpu_share=None, idle_io=False, nice=None):
+        self.max_read_bps = max_read_mbps * 1024 * 1024 if max_read_mbps else None
+        self.max_cpu_share = max_cpu_share if max_cpu_share and max_cpu_share < 1 else None
+        self.idle_io = idle_io
+        self.nice = nice
+
+        self._lock = threading.Lock()
+        self._tokens = self.max_read_bps or 0
+        self._last_refill = time.monotonic()
+        self._cpu_start = time.process_time()
+        self._wall_start = time.monotonic()
+
+        self._running = threading.Event()
+        self._running.set()
+        self.stopped = False
+        self._applied = False
+
+        self.stats = {
+            'bytes_read': 0,
+            'throttle_seconds': 0.0,
+            'cpu_pacing_seconds': 0.0,
+            'paused_seconds': 0.0
+        }
+
+    @property
+    def enabled(self):
+        return bool(self.max_read_bps or self.max_cpu_share or self.idle_io or self.nice)
+
+    def apply(self):
+        """Apply process priorities (once); call before starting worker threads"""
+        if self._applied:
+            return
+        self._applied = True
+        if self.idle_io:
+            self.stats['idle_io'] = set_idle_io_priority()
+        if self.nice:
+            try:
+                self.stats['nice'] = os.nice(self.nice)
+            except OSError as e:
+                logging.debug(f"nice({self.nice}) failed: {e}")
+
+    def install_signal_handlers(self):
+        """SIGUSR1 pauses, SIGUSR2 resumes, SIGTERM stops at the next checkpoint"""
+        signal.signal(signal.SIGUSR1, lambda *_: self.pause())
+        signal.signal(signal.SIGUSR2, lambda *_: self.resume())
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+
+    def pause(self):
+        logging.info("⏸️  Scan paused (SIGUSR2 to resume)")
+        self._running.clear()
+
+    def resume(self):
+        logging.info("▶️  Scan resumed")
+        self._running.set()
+
+    def stop(self):
+        self.stopped = True
+        self._running.set()
+
+    def check(self):
+        """Block while paused; raise ScanInterrupted once stopped"""
+        if not self._running.is_set():
+            start = time.monotonic()
+            self._running.wait()
+            with self._lock:
+                self.stats['paused_seconds'] += time.monotonic() - start
+        if self.stopped:
+            raise ScanInterrupted()
+
+    def charge(self, nbytes=0):
+        """Account for nbytes just read and sleep as long as the budget requires"""
+        self.check()
+        throttle = cpu_wait = 0.0
+        with self._lock:
+            self.stats['bytes_read'] += nbytes
+            now = time.monotonic()
+            if self.max_read_bps:
+                # Burst of at most one second's worth of reads
+                self._tokens = min(self.max_read_bps,
+                                   self._tokens + (now - self._last_refill) * self.max_read_bps)
+                self._last_refill = now
+                self._tokens -= nbytes
+                if self._tokens < 0:
+                    throttle = -self._tokens / self.max_read_bps
+                    self.stats['throttle_seconds'] += throttle
+            if self.max_cpu_share:
+                cpu_used = time.process_time() - self._cpu_start
+                wall_needed = cpu_used / self.max_cpu_share
+                cpu_wait = max(0.0, wall_needed - (now - self._wall_start) - throttle)
+                self.stats['cpu_pacing_seconds'] += cpu_wait
+        if throttle or cpu_wait:
+            time.sleep(throttle + cpu_wait)
+
+    def summary(self):
+        return {
+            'max_read_mbps': self.max_read_bps / (1024 * 1024) if self.max_read_bps else None,
+            'max_cpu_share': self.max_cpu_share,
+            'idle_io': self.idle_io,
+            'nice': self.nice,
+            'stopped': self.stopped,
+            **{k: round(v, 3) if isinstance(v, float) else v for k, v in self.stats.items()}
+        }
+
+
+class ScanCheckpoint:
+    """Completed work units for one scan scope, flushed to disk periodically"""
+
+    def __init__(self, path, scope, interval=CHECKPOINT_INTERVAL):
+        self.path = Path(path)
+        self.scope = scope
+        self.interval = interval
+        self.units = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._dirty = False
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == CHECKPOINT_VERSION and data.get('scope') == self.scope:
+                self.units = data.get('units', {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+        if self.units:
+            logging.info(f"Resuming from checkpoint: {len(self.units)} unit(s) already done")
+        return self.units
+
+    def put(self, key, value):
+        with self._lock:
+            self.units[key] = value
+            self._dirty = True
+            due = time.monotonic() - self._last_flush >= self.interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps({'version': CHECKPOINT_VERSION, 'scope': self.scope, 'units': self.units})
+            self._dirty = False
+            self._last_flush = time.monotonic()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(tmp_path, 'w') as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Failed to write checkpoint {self.path}: {e}")
+
+    def clear(self):
+        """The scan finished; the checkpoint is no longer needed"""
+        self.units = {}
+        self._dirty = False
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def add_budget_arguments(parser, checkpoint=True):
+    """Common CLI flags for throttled scans"""
+    group = parser.add_argument_group('resource budget')
+    group.add_argument('--max-read-mbps', type=float, help='Cap disk reads at this many MB/s')
+    group.add_argument('--max-cpu', type=float, help='Cap CPU use at this share of one core (e.g. 0.25)')
+    group.add_argument('--idle-io', action='store_true', help='Use the idle I/O scheduling class')
+    group.add_argument('--nice', type=int, help='Increase niceness by this amount')
+    if checkpoint:
+        group.add_argument('--checkpoint', help='Checkpoint file for pause/resume (SIGTERM stops, rerun resumes)')
+    return group
+
+
+def budget_from_args(args):
+    """ScanBudget from add_budget_arguments() flags, or None if none were given"""
+    budget = ScanBudget(args.max_read_mbps, args.max_cpu, args.idle_io, args.nice)
+    if not budget.enabled and not getattr(args, 'checkpoint', None):
+        return None
+    budget.install_signal_handlers()
+    return budget
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard Scan Profiling
+Per-phase wall-clock timing and hot-path counters for scan pipelines.
+
+  profile = ScanProfile()
+  with profile.phase('esp_scan'):
+      ...
+  profile.count('bytes_read', n)
+  results['timing'] = profile.report()
+
+Phases nest ('read_firmware/efivars') and accumulate across calls. Spawned
+subprocesses are counted through a Python audit hook, so callers need no
+changes for that counter. Passing dump_path turns on cProfile and
+tracemalloc for deep dives; stop() then writes <dump_path>.pstats and
+<dump_path>.tracemalloc.txt.
+
+Usage:
+  python3 scripts/scan_profile.py out/logs/detect_profile.pstats
+"""
+
+import argparse
+import cProfile
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+STANDARD_COUNTERS = ('bytes_read', 'files_hashed', 'subprocesses', 'cache_hits')
+TRACEMALLOC_TOP = 25
+
+# Profiles currently collecting; the audit hook feeds them subprocess counts
+_ACTIVE = []
+_HOOK_INSTALLED = False
+
+
+def _audit(event, args):
+    if _ACTIVE and (event == 'subprocess.Popen' or event == 'os.system'):
+        for profile in _ACTIVE:
+            profile.count('subprocesses')
+
+
+def _install_audit_hook():
+    global _HOOK_INSTALLED
+    if not _HOOK_INSTALLED:
+        # Audit hooks cannot be removed, so one hook serves every profile
+        sys.addaudithook(_audit)
+        _HOOK_INSTALLED = True
+
+
+class ScanProfile:
+    """Phase timer and counters for one scan"""
+
+    def __init__(self, dump_path=None):
+        self.dump_path = Path(dump_path) if dump_path else None
+        self.phases = {}
+        self.counters = Counter({name: 0 for name in STANDARD_COUNTERS})
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._start = None
+        self._elapsed = None
+        self._profiler = None
+        self.dumps = {}
+
+    def start(self):
+        """Start the clock (and deep profilers); phase() calls this lazily"""
+        if self._start is not None:
+            return self
+        self._start = time.perf_counter()
+        _install_audit_hook()
+        _ACTIVE.append(self)
+        if self.dump_path:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def stop(self):
+        """Freeze the total and write deep-dive dumps if requested"""
+        if self._start is None or self._elapsed is not None:
+            return
+        self._elapsed = time.perf_counter() - self._start
+        if self in _ACTIVE:
+            _ACTIVE.remove(self)
+        if self._profiler is not None:
+            self._profiler.disable()
+            self.dump_path.parent.mkdir(parents=True, exist_ok=True)
+            pstats_path = self.dump_path.with_name(self.dump_path.name + '.pstats')
+            self._profiler.dump_stats(pstats_path)
+            self.dumps['pstats'] = str(pstats_path)
+            self._profiler = None
+        if self.dump_path and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            mem_path = self.dump_path.with_name(self.dump_path.name + '.tracemalloc.txt')
+            with open(mem_path, 'w') as f:
+                f.write(f"current={current} peak={peak}\n")
+                for stat in snapshot.statistics('lineno')[:TRACEMALLOC_TOP]:
+                    f.write(f"{stat}\n")
+            self.dumps['tracemalloc'] = str(mem_path)
+            self.dumps['peak_memory_bytes'] = peak
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block; nested phases are recorded as 'outer/inner'"""
+        self.start()
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(name)
+        key = '/'.join(stack)
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                entry = self.phases.get(key)
+                if entry is None:
+                    entry = self.phases[key] = {'seconds': 0.0, 'calls': 0}
+                entry['seconds'] += elapsed
+                entry['calls'] += 1
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def report(self):
+        """JSON-ready timing section"""
+        if self._start is None:
+            total = 0.0
+        else:
+            total = self._elapsed if self._elapsed is not None else time.perf_counter() - self._start
+        with self._lock:
+            phases = {
+                name: {
+                    'seconds': round(entry['seconds'], 6),
+                    'calls': entry['calls'],
+                    'share': round(entry['seconds'] / total, 4) if total else None
+                }
+                for name, entry in self.phases.items()
+            }
+            counters = dict(self.counters)
+        report = {'total_seconds': round(total, 6), 'phases': phases, 'counters': counters}
+        if self.dumps:
+            report['dumps'] = dict(self.dumps)
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print the hottest functions from a scan profile dump')
+    parser.add_argument('pstats', help='*.pstats file written by --profile-dump')
+    parser.add_argument('-n', '--limit', type=int, default=30, help='Functions to show')
+    parser.add_argument('-s', '--sort', default='cumulative', help='pstats sort key')
+    args = parser.parse_args()
+    pstats.Stats(args.pstats).sort_stats(args.sort).print_stats(args.limit)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
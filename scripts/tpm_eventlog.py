@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard TPM Event Log Analyzer
+Parses the TCG binary event log and replays PCRs without a TPM.
+
+Reads /sys/kernel/security/tpm0/binary_bios_measurements (or any saved copy,
+e.g. from a host snapshot) in either the legacy SHA1 format or the
+crypto-agile TCG_PCR_EVENT2 format, replays every PCR bank in-process and
+diffs the per-event digests against a stored known-good log so a changed
+measurement can be traced to the exact boot component.
+
+Usage:
+  python3 scripts/tpm_eventlog.py show /sys/kernel/security/tpm0/binary_bios_measurements
+  python3 scripts/tpm_eventlog.py replay eventlog.bin --bank sha256 --compare-pcrs
+  python3 scripts/tpm_eventlog.py diff good_eventlog.bin eventlog.bin
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import logging
+import struct
+import sys
+from pathlib import Path
+
+TPM_EVENT_LOG_PATH = Path('/sys/kernel/security/tpm0/binary_bios_measurements')
+TPM_PCR_SYSFS = Path('/sys/class/tpm/tpm0')
+# Only firmware PCRs are final once the OS starts; PCR 8+ keep being extended
+# after ExitBootServices (systemd-stub/pcrphase on PCR 11, IMA on PCR 10, ...)
+FIRMWARE_PCRS = frozenset(range(8))
+
+# TPM2_ALG_ID -> (name, digest size)
+TPM_ALGORITHMS = {
+    0x0004: ('sha1', 20),
+    0x000B: ('sha256', 32),
+    0x000C: ('sha384', 48),
+    0x000D: ('sha512', 64),
+    0x0012: ('sm3_256', 32),
+}
+
+EV_NO_ACTION = 0x00000003
+EVENT_TYPES = {
+    0x00000000: 'EV_PREBOOT_CERT',
+    0x00000001: 'EV_POST_CODE',
+    0x00000002: 'EV_UNUSED',
+    0x00000003: 'EV_NO_ACTION',
+    0x00000004: 'EV_SEPARATOR',
+    0x00000005: 'EV_ACTION',
+    0x00000006: 'EV_EVENT_TAG',
+    0x00000007: 'EV_S_CRTM_CONTENTS',
+    0x00000008: 'EV_S_CRTM_VERSION',
+    0x00000009: 'EV_CPU_MICROCODE',
+    0x0000000A: 'EV_PLATFORM_CONFIG_FLAGS',
+    0x0000000B: 'EV_TABLE_OF_DEVICES',
+    0x0000000C: 'EV_COMPACT_HASH',
+    0x0000000D: 'EV_IPL',
+    0x0000000E: 'EV_IPL_PARTITION_DATA',
+    0x0000000F: 'EV_NONHOST_CODE',
+    0x00000010: 'EV_NONHOST_CONFIG',
+    0x00000011: 'EV_NONHOST_INFO',
+    0x00000012: 'EV_OMIT_BOOT_DEVICE_EVENTS',
+    0x80000001: 'EV_EFI_VARIABLE_DRIVER_CONFIG',
+    0x80000002: 'EV_EFI_VARIABLE_BOOT',
+    0x80000003: 'EV_EFI_BOOT_SERVICES_APPLICATION',
+    0x80000004: 'EV_EFI_BOOT_SERVICES_DRIVER',
+    0x80000005: 'EV_EFI_RUNTIME_SERVICES_DRIVER',
+    0x80000006: 'EV_EFI_GPT_EVENT',
+    0x80000007: 'EV_EFI_ACTION',
+    0x80000008: 'EV_EFI_PLATFORM_FIRMWARE_BLOB',
+    0x80000009: 'EV_EFI_HANDOFF_TABLES',
+    0x8000000A: 'EV_EFI_PLATFORM_FIRMWARE_BLOB2',
+    0x8000000B: 'EV_EFI_HANDOFF_TABLES2',
+    0x8000000C: 'EV_EFI_VARIABLE_BOOT2',
+    0x80000010: 'EV_EFI_HCRTM_EVENT',
+    0x800000E0: 'EV_EFI_VARIABLE_AUTHORITY',
+    0x800000E1: 'EV_EFI_SPDM_FIRMWARE_BLOB',
+    0x800000E2: 'EV_EFI_SPDM_FIRMWARE_CONFIG',
+}
+
+EFI_VARIABLE_EVENTS = (0x80000001, 0x80000002, 0x8000000C, 0x800000E0)
+EFI_IMAGE_EVENTS = (0x80000003, 0x80000004, 0x80000005)
+ASCII_EVENTS = (0x00000001, 0x00000005, 0x0000000D, 0x80000007)
+
+SPEC_ID_SIGNATURE = b'Spec ID Event03\x00'
+STARTUP_LOCALITY_SIGNATURE = b'StartupLocality\x00'
+
+# PCRs 17-22 reset to all ones on platforms without a dynamic launch
+DRTM_PCRS = range(17, 23)
+
+
+class EventLogError(Exception):
+    pass
+
+
+def _guid(raw):
+    d1, d2, d3 = struct.unpack_from('<IHH', raw)
+    return f"{d1:08x}-{d2:04x}-{d3:04x}-{bytes(raw[8:10]).hex()}-{bytes(raw[10:16]).hex()}"
+
+
+def _device_path_files(dp):
+    """Pull media file-path nodes (type 4, subtype 4) out of a device path"""
+    files = []
+    off = 0
+    while off + 4 <= len(dp):
+        node_type, sub_type, length = struct.unpack_from('<BBH', dp, off)
+        if length < 4 or node_type == 0x7F:
+            break
+        if node_type == 0x04 and sub_type == 0x04:
+            files.append(bytes(dp[off + 4:off + length]).decode('utf-16-le', 'replace').rstrip('\x00'))
+        off += length
+    return '/'.join(f.strip('\\').replace('\\', '/') for f in files if f)
+
+
+def describe_event(event_type, data):
+    """Short human readable description of an event's payload"""
+    try:
+        if event_type in EFI_VARIABLE_EVENTS and len(data) >= 32:
+            name_len = struct.unpack_from('<Q', data, 16)[0]
+            name = bytes(data[32:32 + name_len * 2]).decode('utf-16-le', 'replace')
+            return f"{name}-{_guid(data[0:16])}"
+        if event_type in EFI_IMAGE_EVENTS and len(data) >= 32:
+            dp_len = struct.unpack_from('<Q', data, 24)[0]
+            return _device_path_files(data[32:32 + dp_len]) or f"image ({struct.unpack_from('<Q', data, 8)[0]} bytes)"
+        if event_type in (0x80000008,) and len(data) >= 16:
+            base, length = struct.unpack_from('<QQ', data)
+            return f"firmware blob @0x{base:x} ({length} bytes)"
+        if event_type == 0x8000000A and len(data) >= 1:
+            desc_len = data[0]
+            return bytes(data[1:1 + desc_len]).decode('ascii', 'replace')
+        if event_type == 0x00000008:
+            return bytes(data).decode('utf-16-le', 'replace').rstrip('\x00')
+        if event_type in ASCII_EVENTS:
+            return bytes(data).decode('ascii', 'replace').rstrip('\x00')
+        if event_type == EV_NO_ACTION and len(data) >= 16:
+            return bytes(data[:16]).rstrip(b'\x00').decode('ascii', 'replace')
+    except (struct.error, UnicodeDecodeError):
+        pass
+    return ''
+
+
+class TPMEvent:
+    __slots__ = ('index', 'pcr', 'event_type', 'digests', 'data')
+
+    def __init__(self, index, pcr, event_type, digests, data):
+        self.index = index
+        self.pcr = pcr
+        self.event_type = event_type
+        self.digests = digests
+        self.data = data
+
+    @property
+    def type_name(self):
+        return EVENT_TYPES.get(self.event_type, f"0x{self.event_type:08x}")
+
+    @property
+    def description(self):
+        return describe_event(self.event_type, self.data)
+
+    def to_dict(self):
+        return {
+            'index': self.index,
+            'pcr': self.pcr,
+            'type': self.type_name,
+            'description': self.description,
+            'digests': {alg: d.hex() for alg, d in self.digests.items()}
+        }
+
+
+class TPMEventLog:
+    """Parsed TCG event log with in-process PCR replay"""
+
+    def __init__(self, raw):
+        self.raw = memoryview(raw)
+        self.crypto_agile = False
+        self.algorithms = {}
+        self.events = []
+        self._parse()
+
+    @classmethod
+    def from_file(cls, path=TPM_EVENT_LOG_PATH):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def _parse(self):
+        buf = self.raw
+        if len(buf) < 32:
+            raise EventLogError('event log too short')
+
+        # The first event is always in the legacy SHA1 layout
+        pcr, event_type = struct.unpack_from('<II', buf, 0)
+        size = struct.unpack_from('<I', buf, 28)[0]
+        first_data = buf[32:32 + size]
+        self.events.append(TPMEvent(0, pcr, event_type, {'sha1': bytes(buf[8:28])}, first_data))
+        off = 32 + size
+
+        if event_type == EV_NO_ACTION and bytes(first_data[:16]) == SPEC_ID_SIGNATURE:
+            self.crypto_agile = True
+            count = struct.unpack_from('<I', first_data, 24)[0]
+            for i in range(count):
+                alg_id, digest_size = struct.unpack_from('<HH', first_data, 28 + i * 4)
+                self.algorithms[alg_id] = digest_size
+        else:
+            self.algorithms = {0x0004: 20}
+
+        index = 1
+        end = len(buf)
+        try:
+            if self.crypto_agile:
+                algorithms = self.algorithms
+                while off + 12 <= end:
+                    pcr, event_type, count = struct.unpack_from('<III', buf, off)
+                    off += 12
+                    digests = {}
+                    for _ in range(count):
+                        alg_id = struct.unpack_from('<H', buf, off)[0]
+                        digest_size = algorithms.get(alg_id)
+                        if digest_size is None:
+                            raise EventLogError(f"unknown digest algorithm 0x{alg_id:04x} in event {index}")
+                        name = TPM_ALGORITHMS.get(alg_id, (f"alg_{alg_id:04x}",))[0]
+                        digests[name] = bytes(buf[off + 2:off + 2 + digest_size])
+                        off += 2 + digest_size
+                    size = struct.unpack_from('<I', buf, off)[0]
+                    off += 4
+                    self.events.append(TPMEvent(index, pcr, event_type, digests, buf[off:off + size]))
+                    off += size
+                    index += 1
+            else:
+                while off + 32 <= end:
+                    pcr, event_type = struct.unpack_from('<II', buf, off)
+                    size = struct.unpack_from('<I', buf, off + 28)[0]
+                    self.events.append(TPMEvent(index, pcr, event_type, {'sha1': bytes(buf[off + 8:off + 28])},
+                                                buf[off + 32:off + 32 + size]))
+                    off += 32 + size
+                    index += 1
+        except struct.error:
+            raise EventLogError(f"truncated event log at event {index} (offset {off})")
+
+    @property
+    def banks(self):
+        return [TPM_ALGORITHMS.get(a, (f"alg_{a:04x}",))[0] for a in self.algorithms]
+
+    def replay(self, bank='sha256'):
+        """Replay the log into {pcr: digest bytes} for one bank"""
+        if bank not in hashlib.algorithms_available and bank != 'sha1':
+            raise EventLogError(f"hash algorithm not available: {bank}")
+        digest_size = hashlib.new(bank).digest_size
+        pcrs = {}
+        for event in self.events:
+            if event.event_type == EV_NO_ACTION:
+                data = event.data
+                if bytes(data[:16]) == STARTUP_LOCALITY_SIGNATURE and len(data) >= 17:
+                    pcrs[event.pcr] = b'\x00' * (digest_size - 1) + bytes(data[16:17])
+                continue
+            digest = event.digests.get(bank)
+            if digest is None:
+                continue
+            initial = b'\xff' * digest_size if event.pcr in DRTM_PCRS else b'\x00' * digest_size
+            pcrs[event.pcr] = hashlib.new(bank, pcrs.get(event.pcr, initial) + digest).digest()
+        return dict(sorted(pcrs.items()))
+
+    def measured_events(self, bank='sha256'):
+        """Events that were extended into a PCR (EV_NO_ACTION excluded)"""
+        return [e for e in self.events if e.event_type != EV_NO_ACTION and bank in e.digests]
+
+
+def read_live_pcrs(bank='sha256', pcrs=range(24)):
+    """Read PCR values exposed by the kernel (pcr-<bank>/<n>, Linux 5.12+)"""
+    bank_dir = TPM_PCR_SYSFS / f"pcr-{bank}"
+    values = {}
+    if not bank_dir.is_dir():
+        return values
+    for pcr in pcrs:
+        try:
+            values[pcr] = bytes.fromhex((bank_dir / str(pcr)).read_text().strip())
+        except (OSError, ValueError):
+            continue
+    return values
+
+
+def verify_replay(log, bank='sha256', live_pcrs=None, pcrs=FIRMWARE_PCRS):
+    """PCRs (of pcrs; None for all) whose replayed value disagrees with the TPM"""
+    live = read_live_pcrs(bank) if live_pcrs is None else live_pcrs
+    mismatches = []
+    for pcr, value in log.replay(bank).items():
+        if (pcrs is None or pcr in pcrs) and pcr in live and live[pcr] != value:
+            mismatches.append({'pcr': pcr, 'replayed': value.hex(), 'tpm': live[pcr].hex()})
+    return mismatches
+
+
+def diff_event_logs(good, current, bank=None):
+    """
+    Event-by-event diff of two logs.
+
+    Events are aligned on (pcr, type, digest); within a replaced block,
+    events with the same PCR, type and description are reported as
+    'changed' (same component, different measurement) and the rest as
+    'added' or 'removed'.
+    """
+    if bank is None:
+        shared = [b for b in ('sha256', 'sha384', 'sha512', 'sha1') if b in good.banks and b in current.banks]
+        if not shared:
+            raise EventLogError('event logs share no digest bank')
+        bank = shared[0]
+
+    good_events = good.measured_events(bank)
+    cur_events = current.measured_events(bank)
+    good_keys = [(e.pcr, e.event_type, e.digests[bank]) for e in good_events]
+    cur_keys = [(e.pcr, e.event_type, e.digests[bank]) for e in cur_events]
+
+    diff = {'bank': bank, 'changed': [], 'added': [], 'removed': [], 'identical': True}
+    matcher = difflib.SequenceMatcher(None, good_keys, cur_keys, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        old = good_events[i1:i2]
+        new = cur_events[j1:j2]
+        unmatched_old = list(old)
+        for event in new:
+            twin = next((o for o in unmatched_old
+                         if o.pcr == event.pcr and o.event_type == event.event_type
+                         and o.description == event.description), None)
+            if twin is None:
+                twin = next((o for o in unmatched_old
+                             if o.pcr == event.pcr and o.event_type == event.event_type), None)
+            if twin is not None:
+                unmatched_old.remove(twin)
+                diff['changed'].append({
+                    'pcr': event.pcr,
+                    'type': event.type_name,
+                    'description': event.description or twin.description,
+                    'good_index': twin.index,
+                    'current_index': event.index,
+                    'good_digest': twin.digests[bank].hex(),
+                    'current_digest': event.digests[bank].hex()
+                })
+            else:
+                diff['added'].append(event.to_dict())
+        diff['removed'].extend(o.to_dict() for o in unmatched_old)
+
+    diff['identical'] = not (diff['changed'] or diff['added'] or diff['removed'])
+    return diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PhoenixGuard TPM Event Log Analyzer')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Verbose logging')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    show = sub.add_parser('show', help='List events in a log')
+    show.add_argument('log', nargs='?', default=str(TPM_EVENT_LOG_PATH))
+    show.add_argument('--json', action='store_true', help='JSON output')
+
+    rep = sub.add_parser('replay', help='Replay PCR values from a log')
+    rep.add_argument('log', nargs='?', default=str(TPM_EVENT_LOG_PATH))
+    rep.add_argument('--bank', default='sha256', help='PCR bank (default: sha256)')
+    rep.add_argument('--compare-pcrs', action='store_true', help='Compare with live PCRs from sysfs')
+    rep.add_argument('--all-pcrs', action='store_true',
+                     help='Compare every PCR in the log, not just firmware PCRs 0-7')
+
+    dif = sub.add_parser('diff', help='Diff a log against a known-good log')
+    dif.add_argument('good')
+    dif.add_argument('log', nargs='?', default=str(TPM_EVENT_LOG_PATH))
+    dif.add_argument('--bank', help='PCR bank (default: strongest shared bank)')
+
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    try:
+        if args.command == 'show':
+            log = TPMEventLog.from_file(args.log)
+            if args.json:
+                print(json.dumps({'crypto_agile': log.crypto_agile, 'banks': log.banks,
+                                  'events': [e.to_dict() for e in log.events]}, indent=2))
+            else:
+                print(f"📜 {args.log}: {len(log.events)} events, banks: {', '.join(log.banks)}")
+                for e in log.events:
+                    print(f"  {e.index:4d}  PCR{e.pcr:<2d} {e.type_name:<34s} {e.description}")
+            return 0
+
+        if args.command == 'replay':
+            log = TPMEventLog.from_file(args.log)
+            for pcr, value in log.replay(args.bank).items():
+                print(f"PCR{pcr:<2d} {args.bank}: {value.hex()}")
+            if args.compare_pcrs:
+                live = read_live_pcrs(args.bank)
+                if not live:
+                    print(f"⚠️  Live {args.bank} PCRs not readable from {TPM_PCR_SYSFS}")
+                    return 1
+                mismatches = verify_replay(log, args.bank, live, None if args.all_pcrs else FIRMWARE_PCRS)
+                for m in mismatches:
+                    print(f"❌ PCR{m['pcr']} replay {m['replayed']} != TPM {m['tpm']}")
+                if not mismatches:
+                    print("✅ Replayed PCRs match the TPM")
+                return 1 if mismatches else 0
+            return 0
+
+        if args.command == 'diff':
+            diff = diff_event_logs(TPMEventLog.from_file(args.good), TPMEventLog.from_file(args.log), args.bank)
+            if diff['identical']:
+                print(f"✅ Event log matches known-good log ({diff['bank']})")
+                return 0
+            for c in diff['changed']:
+                print(f"❌ CHANGED PCR{c['pcr']} {c['type']} {c['description']}")
+            for a in diff['added']:
+                print(f"➕ ADDED   PCR{a['pcr']} {a['type']} {a['description']}")
+            for r in diff['removed']:
+                print(f"➖ REMOVED PCR{r['pcr']} {r['type']} {r['description']}")
+            return 1
+    except (OSError, EventLogError) as e:
+        logging.error(f"Event log analysis failed: {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
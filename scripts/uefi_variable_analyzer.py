@@ -8,29 +8,38 @@ to decode their meaning for universal BIOS configuration.
 """
 
 import os
+import sys
 import json
 import struct
+import argparse
 from pathlib import Path
 from typing import Dict, List, Optional, Union
 
+from efivars import efivar_store
+from hii_forms import SetupForms, setup_forms
+from payload_classifier import classify_payload, classify_payloads, describe_payload
+from host_snapshot import HostSnapshot, host_identity, is_snapshot
+
 class UEFIVariableAnalyzer:
-    def __init__(self):
-        self.efi_vars_path = Path("/sys/firmware/efi/efivars")
+    def __init__(self, snapshot: Optional[HostSnapshot] = None, forms: Optional[SetupForms] = None):
+        # A HostSnapshot replaces the live efivarfs
+        self.snapshot = snapshot
+        self.efi_store = efivar_store(snapshot)
+        # Setup questions from this BIOS's IFR; variables they cover decode by lookup
+        self.forms = forms
         self.asus_guid = "85ba66797a3e"  # Main ASUS GUID
         self.analysis_results = {}
         
     def read_variable_raw(self, var_name: str, guid: str) -> Optional[bytes]:
-        """Read raw variable data"""
-        var_file = self.efi_vars_path / f"{var_name}-{guid}"
-        try:
-            # First 4 bytes are attributes, rest is data
-            raw_data = var_file.read_bytes()
-            if len(raw_data) < 4:
-                return None
-            return raw_data[4:]  # Skip EFI variable attributes
-        except Exception as e:
-            print(f"⚠️  Cannot read {var_name}: {e}")
+        """Read variable data (without the 4-byte attribute word)"""
+        var = self.efi_store.get(var_name, guid)
+        if var is None:
+            print(f"⚠️  Cannot read {var_name}: not present in {self.efi_store.source_label}")
             return None
+        data = var.data
+        if data is None:
+            print(f"⚠️  Cannot read {var_name}: permission denied or unreadable")
+        return data
     
     def analyze_asus_variables(self):
         """Analyze all ASUS-specific variables in detail"""
@@ -50,8 +59,15 @@ class UEFIVariableAnalyzer:
             ("ArmouryCrateStaticField", f"607005d5-3f75-4b2e-98f0-{self.asus_guid}"),
             ("CloudRecoverySupport", f"607005d5-3f75-4b2e-98f0-{self.asus_guid}"),
         ]
+        if self.forms:
+            # Setup, AmdSetup, ... : every IFR variable store present on this host
+            asus_variables += [(q[0]['varstore'], q[0]['varstore_guid']) for q in self.forms.varstores.values()
+                               if self.efi_store.get(q[0]['varstore'], q[0]['varstore_guid'])]
+        
+        # One batch classification for every payload (reads are memoized by the store)
+        payloads = classify_payloads([self.efi_store.read(name, guid) for name, guid in asus_variables])
         
-        for var_name, full_guid in asus_variables:
+        for (var_name, full_guid), payload in zip(asus_variables, payloads):
             print(f"\n🔍 Analyzing: {var_name}")
             print("-" * 40)
             
@@ -60,14 +76,15 @@ class UEFIVariableAnalyzer:
             
             data = self.read_variable_raw(var_name, full_guid)
             if data:
-                analysis = self.decode_variable_data(var_name, data)
+                analysis = self.decode_variable_data(var_name, data, full_guid, payload)
                 self.analysis_results[var_name] = analysis
                 self.print_analysis(var_name, data, analysis)
             else:
                 print(f"❌ Could not read variable data")
     
-    def decode_variable_data(self, var_name: str, data: bytes) -> Dict:
-        """Decode variable data based on variable name and data patterns"""
+    def decode_variable_data(self, var_name: str, data: bytes, guid: Optional[str] = None,
+                             payload: Optional[Dict] = None) -> Dict:
+        """Decode variable data from the BIOS setup forms, else from name and data patterns"""
         analysis = {
             "size": len(data),
             "hex_data": data.hex(),
@@ -76,6 +93,16 @@ class UEFIVariableAnalyzer:
             "structure": None
         }
         
+        settings = self.forms.decode(var_name, guid, data) if self.forms else None
+        if settings is not None:
+            analysis["interpretation"] = "setup_form"
+            analysis["structure"] = settings
+            analysis["possible_values"] = [
+                f"{s['prompt']}: {s['setting']}" + (" (changed)" if s['changed'] else "") + (" [hidden]" if s['suppressed'] else "")
+                for s in settings
+            ]
+            return analysis
+        
         # Version variables
         if "version" in var_name.lower():
             analysis["interpretation"] = "version_info"
@@ -137,54 +164,15 @@ class UEFIVariableAnalyzer:
                 analysis["possible_values"] = [f"ACPI Value: 0x{values:08x}"]
         
         # Try to detect common patterns
-        self.detect_data_patterns(data, analysis)
+        self.detect_data_patterns(data, analysis, payload)
         
         return analysis
     
-    def detect_data_patterns(self, data: bytes, analysis: Dict):
-        """Detect common data patterns"""
-        patterns = []
-        
-        if len(data) == 1:
-            if data[0] == 0:
-                patterns.append("Disabled/False/Zero")
-            elif data[0] == 1:
-                patterns.append("Enabled/True/One")
-            else:
-                patterns.append(f"Single byte value: {data[0]}")
-        
-        elif len(data) == 2:
-            value = struct.unpack('<H', data)[0]
-            patterns.append(f"16-bit value: {value} (0x{value:04x})")
-        
-        elif len(data) == 4:
-            value = struct.unpack('<L', data)[0]
-            patterns.append(f"32-bit value: {value} (0x{value:08x})")
-        
-        elif len(data) == 8:
-            value = struct.unpack('<Q', data)[0]
-            patterns.append(f"64-bit value: {value} (0x{value:016x})")
-        
-        # Check for text/strings
-        try:
-            if all(32 <= b <= 126 for b in data if b != 0):  # Printable ASCII
-                text = data.decode('ascii').rstrip('\x00')
-                if text:
-                    patterns.append(f"ASCII String: '{text}'")
-        except:
-            pass
-        
-        # Check for UTF-16 strings
-        try:
-            if len(data) % 2 == 0 and len(data) > 2:
-                text = data.decode('utf-16le').rstrip('\x00')
-                if text and all(ord(c) < 256 for c in text):
-                    patterns.append(f"UTF-16 String: '{text}'")
-        except:
-            pass
-        
-        if patterns:
-            analysis["possible_values"].extend(patterns)
+    def detect_data_patterns(self, data: bytes, analysis: Dict, payload: Optional[Dict] = None):
+        """Detect common data patterns (payload: a precomputed classify_payloads() result)"""
+        payload = payload or classify_payload(data)
+        analysis["payload_kind"] = payload["kind"]
+        analysis["possible_values"].extend(describe_payload(payload, data))
     
     def print_analysis(self, var_name: str, data: bytes, analysis: Dict):
         """Print variable analysis in a readable format"""
@@ -257,12 +245,32 @@ class UEFIVariableAnalyzer:
         return output_file
 
 def main():
+    parser = argparse.ArgumentParser(description="PhoenixGuard Advanced UEFI Variable Analyzer")
+    parser.add_argument("--snapshot", help="Read variables from a host snapshot archive instead of efivarfs")
+    parser.add_argument("-o", "--output", default="g615lp_variable_analysis.json", help="Analysis results JSON")
+    parser.add_argument("--bios-image", help="Firmware image of this BIOS; its setup forms decode Setup variables")
+    args = parser.parse_args()
+    
     print("🔥 PHOENIXGUARD ADVANCED UEFI VARIABLE ANALYZER")
     print("=" * 60)
     print("Reading and decoding ASUS variable VALUES...")
     print()
     
-    analyzer = UEFIVariableAnalyzer()
+    snapshot = None
+    if args.snapshot:
+        if not is_snapshot(args.snapshot):
+            print(f"❌ Snapshot not found or not an archive: {args.snapshot}")
+            sys.exit(1)
+        snapshot = HostSnapshot(args.snapshot)
+        print(f"📦 Using snapshot: {args.snapshot}")
+    
+    # Setup forms come from the image, or from the cache for this BIOS version
+    identity = snapshot.host if snapshot else host_identity()
+    forms = setup_forms(args.bios_image, identity)
+    if forms:
+        print(f"🧩 Setup forms: {len(forms)} question(s) in {len(forms.varstores)} variable store(s)")
+    
+    analyzer = UEFIVariableAnalyzer(snapshot, forms)
     
     # Perform deep analysis
     analyzer.analyze_asus_variables()
@@ -271,7 +279,9 @@ def main():
     analyzer.generate_config_recommendations()
     
     # Save results
-    analyzer.save_analysis_results()
+    analyzer.save_analysis_results(args.output)
+    if snapshot:
+        snapshot.close()
     
     print(f"\n🎯 ANALYSIS COMPLETE!")
     print("This data is GOLD for building universal BIOS support!")
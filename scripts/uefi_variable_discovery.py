@@ -10,17 +10,28 @@ The goal: 100% hardware support by reverse engineering every variable!
 """
 
 import os
+import sys
 import json
 import struct
-import re
+import argparse
 from pathlib import Path
 from collections import defaultdict
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 
+from efivars import efivar_store
+from efivar_classifier import classifier, guid_registry
+from efivar_snapshots import record_snapshot
+from host_snapshot import HostSnapshot, is_snapshot
+from payload_classifier import classify_payload, classify_payloads, describe_payload
+
 class UEFIVariableDiscovery:
-    def __init__(self):
-        self.efi_vars_path = Path("/sys/firmware/efi/efivars")
+    def __init__(self, snapshot: Optional[HostSnapshot] = None):
+        # A HostSnapshot replaces the live efivarfs and DMI sources
+        self.snapshot = snapshot
+        self.efi_store = efivar_store(snapshot)
+        self.classifier = classifier('discovery')
+        self.guid_registry = guid_registry()
         self.variables = {}
         self.categories = defaultdict(list)
         self.hardware_profile = {
@@ -34,6 +45,10 @@ class UEFIVariableDiscovery:
     
     def _get_hardware_id(self) -> str:
         """Get unique hardware identifier"""
+        if self.snapshot:
+            product = self.snapshot.dmi_field("product_name")
+            board = self.snapshot.dmi_field("board_name")
+            return f"{product}_{board}" if product and board else "unknown_hardware"
         try:
             with open("/sys/class/dmi/id/product_name") as f:
                 product = f.read().strip()
@@ -47,112 +62,54 @@ class UEFIVariableDiscovery:
         """Discover and categorize all EFI variables"""
         print("🔍 Discovering ALL UEFI variables...")
         
-        if not self.efi_vars_path.exists():
+        if not self.efi_store.available():
             print("❌ EFI variables not accessible - need UEFI system")
             return {}
         
-        var_files = list(self.efi_vars_path.glob("*"))
-        print(f"📊 Found {len(var_files)} EFI variables")
+        print(f"📊 Found {len(self.efi_store)} EFI variables")
         
-        for var_file in var_files:
+        parsed = []
+        for var in self.efi_store:
             try:
-                var_info = self._parse_variable(var_file)
-                if var_info:
-                    self.variables[var_info['name']] = var_info
-                    self._categorize_variable(var_info)
+                var_info = self._parse_variable(var)
+                # Keyed by Name-GUID: vendors reuse names like Setup under their own GUIDs
+                self.variables[var.full_name] = var_info
+                parsed.append(var_info)
             except Exception as e:
-                print(f"⚠️  Failed to parse {var_file.name}: {e}")
+                print(f"⚠️  Failed to parse {var.full_name}: {e}")
+        
+        categories = self.classifier.classify_many([v['name'] for v in parsed], [v['guid'] for v in parsed])
+        for var_info, category in zip(parsed, categories):
+            self.categories[category].append(var_info)
+        
+        # Payload type guesses for every readable variable in one batch
+        for var_info, payload in zip(parsed, classify_payloads([v['data'] for v in parsed])):
+            var_info['payload'] = payload
         
         return self.variables
     
-    def _parse_variable(self, var_file: Path) -> Optional[Dict]:
-        """Parse individual EFI variable"""
-        try:
-            # Parse filename: VariableName-GUID
-            filename = var_file.name
-            if '-' not in filename:
-                return None
-            
-            parts = filename.rsplit('-', 1)
-            if len(parts) != 2:
-                return None
-                
-            var_name, guid = parts
-            
-            # Try to read variable data (many require root)
-            var_data = None
-            var_size = 0
-            try:
-                var_data = var_file.read_bytes()
-                var_size = len(var_data)
-            except PermissionError:
-                # Try to get size from stat
-                try:
-                    var_size = var_file.stat().st_size
-                except:
-                    pass
-            
-            return {
-                'name': var_name,
-                'guid': guid,
-                'size': var_size,
-                'data': var_data,
-                'path': str(var_file),
-                'readable': var_data is not None
-            }
-        except Exception as e:
-            return None
+    def _parse_variable(self, var) -> Dict:
+        """Describe one EfiVariable (data excludes the attribute word)"""
+        # Many variables need root to read; size then comes from stat
+        var_data = var.data
+        return {
+            'name': var.name,
+            'guid': var.guid,
+            'size': var.size,
+            'attributes': var.attribute_names,
+            'data': var_data,
+            'path': var.path or f"{self.efi_store.source_label}:{var.full_name}",
+            'readable': var_data is not None
+        }
     
     def _categorize_variable(self, var_info: Dict):
-        """Categorize variables by function"""
-        name = var_info['name'].lower()
-        guid = var_info['guid'].lower()
-        
-        # Boot configuration
-        if re.match(r'boot\d{4}', name) or name in ['bootorder', 'bootcurrent', 'bootnext']:
-            self.categories['boot_config'].append(var_info)
-        
-        # Security variables  
-        elif name in ['pk', 'kek', 'db', 'dbx', 'secureboot', 'setupmode']:
-            self.categories['security'].append(var_info)
-        
-        # ASUS-specific
-        elif 'asus' in name.lower():
-            self.categories['asus_specific'].append(var_info)
-            
-        # Setup/Configuration
-        elif 'setup' in name or 'config' in name:
-            self.categories['setup_config'].append(var_info)
-            
-        # Memory/Performance
-        elif any(keyword in name for keyword in ['memory', 'overclock', 'perf', 'cpu']):
-            self.categories['performance'].append(var_info)
-            
-        # Thermal/Power
-        elif any(keyword in name for keyword in ['thermal', 'power', 'fan', 'temp']):
-            self.categories['thermal_power'].append(var_info)
-            
-        # Hardware-specific
-        elif any(keyword in name for keyword in ['pci', 'usb', 'sata', 'nvme']):
-            self.categories['hardware_config'].append(var_info)
-            
-        # Vendor-specific GUIDs
-        elif self._is_vendor_guid(guid):
-            self.categories['vendor_specific'].append(var_info)
-            
-        # Everything else
-        else:
-            self.categories['unknown'].append(var_info)
+        """Categorize variables by function (rules live in efivar_registry.json)"""
+        category = self.classifier.classify(var_info['name'], var_info['guid'])
+        self.categories[category].append(var_info)
     
     def _is_vendor_guid(self, guid: str) -> bool:
         """Check if GUID is vendor-specific (not standard UEFI)"""
-        # Standard UEFI GUIDs
-        standard_guids = [
-            '8be4df61-93ca-11d2-aa0d-00e098032b8c',  # Global Variable
-            'd719b2cb-3d3a-4596-a3bc-dad00e67656f',  # Security Database
-            '77fa9abd-0359-4d32-bd60-28f4e78f784b',  # Windows
-        ]
-        return guid not in standard_guids
+        return not self.guid_registry.is_standard(guid)
     
     def analyze_asus_variables(self):
         """Deep analysis of ASUS-specific variables"""
@@ -176,7 +133,7 @@ class UEFIVariableDiscovery:
                 
             # If we have data, analyze it
             if var['readable'] and var['data']:
-                analysis = self._analyze_variable_data(var['data'])
+                analysis = self._analyze_variable_data(var['data'], var.get('payload'))
                 if analysis:
                     print(f"   Data Analysis: {analysis}")
     
@@ -199,16 +156,16 @@ class UEFIVariableDiscovery:
         else:
             return f"Unknown - analysis needed"
     
-    def _analyze_variable_data(self, data: bytes) -> str:
-        """Basic analysis of variable data"""
+    def _analyze_variable_data(self, data: bytes, payload: Optional[Dict] = None) -> str:
+        """Basic analysis of variable data (payload: its classify_payloads() result)"""
+        payload = payload or classify_payload(data)
+        if payload['kind'] == 'zero':
+            return "Likely disabled/zero configuration"
+        findings = describe_payload(payload, data)
+        if findings:
+            return "; ".join(findings)
         if len(data) < 4:
             return f"Small data: {data.hex()}"
-        
-        # Check for common patterns
-        if data[:4] == b'\x00\x00\x00\x00':
-            return "Likely disabled/zero configuration"
-        elif data[:4] == b'\x01\x00\x00\x00':
-            return "Likely enabled/boolean true"
         elif len(data) > 100:
             return "Large configuration blob - complex settings"
         else:
@@ -297,21 +254,33 @@ class UEFIVariableDiscovery:
         
         return template
     
-    def save_discovery_results(self, output_path: str = "g615lp_uefi_profile.json"):
-        """Save complete discovery results"""
+    def save_discovery_results(self, output_path: str = "g615lp_uefi_profile.json",
+                               snapshot_db: Optional[str] = None):
+        """Save complete discovery results (and record a variable snapshot if snapshot_db is set)"""
         profile = self.build_hardware_profile()
         template = self.generate_universal_config_template()
         
         results = {
             'hardware_profile': profile,
             'universal_config_template': template,
-            'raw_variables': {name: {
+            'raw_variables': {full_name: {
+                'name': var['name'],
                 'guid': var['guid'],
                 'size': var['size'],
-                'readable': var['readable']
-            } for name, var in self.variables.items()}
+                'attributes': var['attributes'],
+                'readable': var['readable'],
+                'payload_kind': (var.get('payload') or {}).get('kind')
+            } for full_name, var in self.variables.items()}
         }
         
+        if snapshot_db:
+            snapshot_id, changes = record_snapshot(snapshot_db, self.snapshot)
+            results['variable_snapshot'] = {'db': snapshot_db, 'id': snapshot_id, 'changes_since_previous': changes}
+            print(f"📸 Variable snapshot {snapshot_id} recorded in {snapshot_db}")
+            if changes:
+                print(f"   Since snapshot {changes['old']}: {len(changes['added'])} added, "
+                      f"{len(changes['removed'])} removed, {len(changes['changed'])} changed")
+        
         with open(output_path, 'w') as f:
             json.dump(results, f, indent=2)
         
@@ -319,12 +288,26 @@ class UEFIVariableDiscovery:
         return output_path
 
 def main():
+    parser = argparse.ArgumentParser(description="PhoenixGuard UEFI Variable Discovery Engine")
+    parser.add_argument("--snapshot", help="Read variables from a host snapshot archive instead of efivarfs")
+    parser.add_argument("-o", "--output", default="g615lp_uefi_profile.json", help="Discovery results JSON")
+    parser.add_argument("--snapshot-db", help="Also record the variables in this snapshot store (scripts/efivar_snapshots.py)")
+    args = parser.parse_args()
+    
     print("🔥 PHOENIXGUARD UEFI VARIABLE DISCOVERY ENGINE")
     print("=" * 60)
     print("Goal: 100% hardware support by discovering EVERY variable!")
     print()
     
-    discovery = UEFIVariableDiscovery()
+    snapshot = None
+    if args.snapshot:
+        if not is_snapshot(args.snapshot):
+            print(f"❌ Snapshot not found or not an archive: {args.snapshot}")
+            sys.exit(1)
+        snapshot = HostSnapshot(args.snapshot)
+        print(f"📦 Using snapshot: {args.snapshot}")
+    
+    discovery = UEFIVariableDiscovery(snapshot)
     
     # Step 1: Discover all variables
     variables = discovery.discover_all_variables()
@@ -345,7 +328,9 @@ def main():
     print(f"🌡️ Thermal Variables: {profile['categories'].get('thermal_power', 0)}")
     
     # Step 5: Save results
-    output_file = discovery.save_discovery_results()
+    output_file = discovery.save_discovery_results(args.output, args.snapshot_db)
+    if snapshot:
+        snapshot.close()
     
     print(f"\n🚀 NEXT STEPS:")
     print("=" * 30)
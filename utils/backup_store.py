@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard Module Backup Store
+Part of the edk2-bootkit-defense project
+
+Content-addressed backups of kernel modules taken just before signing,
+replacing the <module>.unsigned copies that used to sit beside every module.
+Each distinct module content is stored once under its SHA-256, so re-signing
+a tree, or signing the same module for several kernels, adds nothing.
+
+backup() reads the module exactly once: the bytes are hashed as they are read
+and handed back to the signer, so the caller neither re-reads the module for
+its pre-sign digest nor for the signing itself. New objects are reflinked
+(FICLONE) from the module where the filesystem allows, and copied from the
+bytes already in memory otherwise. index.log records which path had which
+content when, so restore() can put the original back.
+"""
+
+from __future__ import annotations
+
+import errno
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_BACKUP_DIR = REPO_ROOT / "out" / "backups" / "modules"
+FICLONE = 0x40049409               # _IOW(0x94, 9, int)
+READ_CHUNK = 1 << 20
+
+
+class Backup(NamedTuple):
+    data: bytes
+    sha256: "hashlib._Hash"        # hash state after the whole module; .copy() it to extend
+    path: Path                     # the stored object
+    reflinked: bool
+    deduplicated: bool
+
+
+class BackupStore:
+    """Deduplicated, content-addressed module backups; safe to share between signing threads"""
+
+    def __init__(self, root=DEFAULT_BACKUP_DIR):
+        self.root = Path(root)
+        self.index_path = self.root / "index.log"
+        self._lock = threading.Lock()
+        self._reflink = True       # cleared after the first EXDEV/EOPNOTSUPP
+
+    def object_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def _store(self, src_fd: int, data: bytes, obj: Path) -> bool:
+        """Write obj by reflink or from data; True if reflinked"""
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        tmp = obj.with_name(f".{obj.name}.{os.getpid()}.{threading.get_ident()}")
+        reflinked = False
+        try:
+            with open(tmp, "wb") as out:
+                if self._reflink:
+                    try:
+                        fcntl.ioctl(out.fileno(), FICLONE, src_fd)
+                        reflinked = True
+                    except OSError as e:
+                        if e.errno in (errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL):
+                            self._reflink = False
+                            logger.debug("No reflink for %s (%s); copying backups", self.root, e)
+                if not reflinked:
+                    out.write(data)
+            os.replace(tmp, obj)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        return reflinked
+
+    def backup(self, module_path) -> Backup:
+        """Read, hash and back up a module in one pass"""
+        module_path = Path(module_path)
+        with open(module_path, "rb") as src:
+            h = hashlib.sha256()
+            chunks = []
+            for chunk in iter(lambda: src.read(READ_CHUNK), b""):
+                h.update(chunk)
+                chunks.append(chunk)
+            data = b"".join(chunks)
+            digest = h.hexdigest()
+            obj = self.object_path(digest)
+            deduplicated = obj.exists()
+            reflinked = False
+            if not deduplicated:
+                reflinked = self._store(src.fileno(), data, obj)
+                shutil.copystat(module_path, obj)
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.index_path, "a") as index:
+                index.write(f"{datetime.now().isoformat()}\t{digest}\t{module_path.resolve()}\n")
+        return Backup(data, h, obj, reflinked, deduplicated)
+
+    def versions(self, module_path) -> List[Tuple[str, str]]:
+        """(timestamp, sha256) of every backup of a path, oldest first"""
+        target = str(Path(module_path).resolve())
+        if not self.index_path.exists():
+            return []
+        result = []
+        with open(self.index_path) as index:
+            for line in index:
+                when, digest, path = line.rstrip("\n").split("\t", 2)
+                if path == target and (not result or result[-1][1] != digest):
+                    result.append((when, digest))
+        return result
+
+    def restore(self, module_path, digest: Optional[str] = None) -> Optional[Path]:
+        """Put a backup (default: the oldest, i.e. the original) back in place"""
+        if digest is None:
+            versions = self.versions(module_path)
+            if not versions:
+                return None
+            digest = versions[0][1]
+        obj = self.object_path(digest)
+        if not obj.exists():
+            return None
+        module_path = Path(module_path)
+        tmp = module_path.with_name(module_path.name + ".~restore~")
+        shutil.copy2(obj, tmp)
+        os.replace(tmp, module_path)
+        return obj
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard dbx Revocation Checker
+Part of the edk2-bootkit-defense project
+
+Checks EFI binaries (an ESP, staging/, any tree) against the forbidden
+signature database. The dbx is loaded once into a DbxIndex:
+
+  - image digests, as hash sets per algorithm (SHA256, SHA384, ...)
+  - revoked certificates, by DER (matched inside the image's signature)
+  - revoked certificate TBS digests (X509+SHA256/384/512 entries)
+
+Each binary's Authenticode digest is computed straight from an mmap of the
+file (checksum, certificate directory and certificate table excluded), for
+every algorithm the dbx actually uses, in a single pass. Files are hashed on
+a thread pool; hashlib drops the GIL on large buffers, so the check is bound
+by disk reads rather than CPU.
+
+Usage:
+  python3 utils/dbx_check.py /boot/efi staging/
+  python3 utils/dbx_check.py --dbx dbxupdate.bin --json out/logs/dbx_check.json staging/
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Iterable, Optional, Set
+
+from efi_parser import (EFIParseError, EFIVARS_PATH, EFI_IMAGE_SECURITY_DATABASE,
+                        signature_lists_from_bytes)
+
+try:
+    from cryptography.hazmat.primitives.serialization import pkcs7
+    HAVE_CRYPTOGRAPHY = True
+except ImportError:
+    HAVE_CRYPTOGRAPHY = False
+
+logger = logging.getLogger(__name__)
+
+# dbx signature type -> image digest algorithm
+IMAGE_HASH_TYPES = {"SHA1": "sha1", "SHA224": "sha224", "SHA256": "sha256",
+                    "SHA384": "sha384", "SHA512": "sha512"}
+# dbx signature type -> certificate TBS digest algorithm
+TBS_HASH_TYPES = {"X509+SHA256": "sha256", "X509+SHA384": "sha384", "X509+SHA512": "sha512"}
+
+PE_MAGIC_PE32 = 0x10B
+PE_MAGIC_PE32_PLUS = 0x20B
+IMAGE_DIRECTORY_ENTRY_SECURITY = 4
+WIN_CERT_TYPE_PKCS_SIGNED_DATA = 0x0002
+
+
+class PEFormatError(ValueError):
+    """Not a PE/COFF image, or a malformed one"""
+
+
+class DbxIndex:
+    """Revocation entries from one dbx, indexed for set lookups"""
+
+    def __init__(self) -> None:
+        self.image_hashes: Dict[str, Set[bytes]] = {}
+        self.certificates: Dict[bytes, bytes] = {}          # sha256(DER) -> DER
+        self.tbs_hashes: Dict[str, Set[bytes]] = {}
+        self.unsupported: Dict[str, int] = {}
+
+    @classmethod
+    def from_bytes(cls, data: bytes, fmt: str = "auto") -> "DbxIndex":
+        index = cls()
+        for esl in signature_lists_from_bytes(data, fmt):
+            if esl.type in IMAGE_HASH_TYPES:
+                target = index.image_hashes.setdefault(IMAGE_HASH_TYPES[esl.type], set())
+                target.update(bytes(sig.data) for sig in esl.signatures)
+            elif esl.type in TBS_HASH_TYPES:
+                # EFI_CERT_X509_SHA*: digest followed by a revocation time
+                algorithm = TBS_HASH_TYPES[esl.type]
+                size = hashlib.new(algorithm).digest_size
+                index.tbs_hashes.setdefault(algorithm, set()).update(
+                    bytes(sig.data[:size]) for sig in esl.signatures)
+            elif esl.type == "X509":
+                for sig in esl.signatures:
+                    der = bytes(sig.data)
+                    index.certificates[hashlib.sha256(der).digest()] = der
+            else:
+                index.unsupported[esl.type] = index.unsupported.get(esl.type, 0) + len(esl.signatures)
+        return index
+
+    @classmethod
+    def from_file(cls, path: os.PathLike) -> "DbxIndex":
+        path = Path(path)
+        fmt = {".esl": "esl", ".auth": "auth"}.get(path.suffix.lower(), "auto")
+        return cls.from_bytes(path.read_bytes(), fmt)
+
+    @classmethod
+    def from_efivars(cls, efivars_dir: os.PathLike = EFIVARS_PATH) -> "DbxIndex":
+        path = Path(efivars_dir) / f"dbx-{EFI_IMAGE_SECURITY_DATABASE}"
+        return cls.from_bytes(path.read_bytes(), "efivar")
+
+    @property
+    def algorithms(self) -> List[str]:
+        """Image digest algorithms worth computing for this dbx"""
+        return sorted(self.image_hashes) or ["sha256"]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "image_hashes": {alg: len(h) for alg, h in self.image_hashes.items()},
+            "certificates": len(self.certificates),
+            "tbs_hashes": {alg: len(h) for alg, h in self.tbs_hashes.items()},
+            "unsupported": dict(self.unsupported),
+        }
+
+    def check(self, digests: Dict[str, bytes], cert_table: Optional[bytes]) -> List[Dict[str, str]]:
+        """Revocation matches for one image's digests and certificate table"""
+        matches = []
+        for algorithm, digest in digests.items():
+            if digest in self.image_hashes.get(algorithm, ()):
+                matches.append({"reason": "image_hash", "algorithm": algorithm, "digest": digest.hex()})
+        if not cert_table:
+            return matches
+        # PKCS#7 SignedData embeds each certificate's DER verbatim
+        for cert_digest, der in self.certificates.items():
+            if der in cert_table:
+                matches.append({"reason": "certificate", "algorithm": "sha256", "digest": cert_digest.hex()})
+        if self.tbs_hashes:
+            for cert in _signing_certificates(cert_table):
+                tbs = cert.tbs_certificate_bytes
+                for algorithm, revoked in self.tbs_hashes.items():
+                    digest = hashlib.new(algorithm, tbs).digest()
+                    if digest in revoked:
+                        matches.append({"reason": "certificate_tbs", "algorithm": algorithm,
+                                        "digest": digest.hex()})
+        return matches
+
+
+def _signing_certificates(cert_table: bytes) -> list:
+    """Certificates in every PKCS#7 WIN_CERTIFICATE (needs cryptography)"""
+    if not HAVE_CRYPTOGRAPHY:
+        return []
+    certs = []
+    off = 0
+    while off + 8 <= len(cert_table):
+        length, _revision, cert_type = struct.unpack_from("<IHH", cert_table, off)
+        if length < 8 or off + length > len(cert_table):
+            break
+        if cert_type == WIN_CERT_TYPE_PKCS_SIGNED_DATA:
+            try:
+                certs.extend(pkcs7.load_der_pkcs7_certificates(cert_table[off + 8:off + length]))
+            except ValueError as e:
+                logger.debug(f"Unparseable PKCS#7 signature: {e}")
+        off += (length + 7) & ~7
+    return certs
+
+
+def authenticode_digests(path: os.PathLike, algorithms: Iterable[str] = ("sha256",)):
+    """
+    Authenticode digests of a PE image and its certificate table.
+
+    Returns ({algorithm: digest}, certificate table bytes or None). The image
+    is hashed as signing tools do: everything except the checksum field, the
+    certificate directory entry and the certificate table itself.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < 0x40:
+            raise PEFormatError("file too small for a PE image")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            if view[:2] != b"MZ":
+                raise PEFormatError("no MZ header")
+            pe = struct.unpack_from("<I", view, 0x3C)[0]
+            if pe + 24 > size or view[pe:pe + 4] != b"PE\0\0":
+                raise PEFormatError("no PE signature")
+            opt = pe + 24
+            if opt + 2 > size:
+                raise PEFormatError("truncated optional header")
+            magic = struct.unpack_from("<H", view, opt)[0]
+            if magic == PE_MAGIC_PE32:
+                dirs = opt + 96
+            elif magic == PE_MAGIC_PE32_PLUS:
+                dirs = opt + 112
+            else:
+                raise PEFormatError(f"unknown optional header magic 0x{magic:x}")
+            checksum = opt + 64
+            if dirs > size:
+                raise PEFormatError("truncated optional header")
+            rva_count = struct.unpack_from("<I", view, dirs - 4)[0]
+            security = dirs + 8 * IMAGE_DIRECTORY_ENTRY_SECURITY
+            if rva_count > IMAGE_DIRECTORY_ENTRY_SECURITY and security + 8 <= size:
+                cert_offset, cert_size = struct.unpack_from("<II", view, security)
+            else:
+                security, cert_offset, cert_size = None, 0, 0
+            if not cert_size or cert_offset + cert_size > size or cert_offset < security + 8:
+                cert_offset, cert_size = size, 0
+
+            if security is not None:
+                ranges = [(0, checksum), (checksum + 4, security), (security + 8, cert_offset),
+                          (cert_offset + cert_size, size)]
+            else:
+                ranges = [(0, checksum), (checksum + 4, size)]
+            hashers = {alg: hashlib.new(alg) for alg in algorithms}
+            for start, end in ranges:
+                chunk = view[start:end]
+                for h in hashers.values():
+                    h.update(chunk)
+                chunk.release()
+            cert_table = bytes(view[cert_offset:cert_offset + cert_size]) if cert_size else None
+    return {alg: h.digest() for alg, h in hashers.items()}, cert_table
+
+
+def find_efi_binaries(roots: Iterable[os.PathLike]) -> List[Path]:
+    """Every *.efi file (any case) under the given files/directories"""
+    found = []
+    for root in map(Path, roots):
+        if root.is_file():
+            found.append(root)
+            continue
+        for dirpath, _dirs, files in os.walk(root):
+            found.extend(Path(dirpath) / name for name in files if name.lower().endswith(".efi"))
+    return sorted(found)
+
+
+def check_binaries(index: DbxIndex, paths: List[Path], jobs: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Hash and check every binary on a thread pool; results keep input order"""
+    algorithms = index.algorithms
+
+    def check_one(path: Path) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"path": str(path), "revoked": False}
+        try:
+            digests, cert_table = authenticode_digests(path, algorithms)
+        except (OSError, PEFormatError) as e:
+            result["error"] = str(e)
+            return result
+        result["authenticode"] = {alg: d.hex() for alg, d in digests.items()}
+        result["signed"] = cert_table is not None
+        matches = index.check(digests, cert_table)
+        if matches:
+            result["revoked"] = True
+            result["matches"] = matches
+        return result
+
+    with ThreadPoolExecutor(max_workers=jobs or min(32, (os.cpu_count() or 1) * 2)) as pool:
+        return list(pool.map(check_one, paths))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check EFI binaries against the dbx revocation list")
+    parser.add_argument("paths", nargs="+", help="EFI binaries or directories (ESP mount, staging/)")
+    parser.add_argument("--dbx", help="dbx as .esl, .auth or efivarfs file (default: live dbx)")
+    parser.add_argument("--efivars", default=str(EFIVARS_PATH), help="efivarfs directory for the live dbx")
+    parser.add_argument("-j", "--jobs", type=int, help="Hashing threads")
+    parser.add_argument("--json", help="Write full results to this JSON file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Verbose logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+
+    try:
+        index = DbxIndex.from_file(args.dbx) if args.dbx else DbxIndex.from_efivars(args.efivars)
+    except (OSError, EFIParseError) as e:
+        logger.error(f"Cannot load dbx: {e}")
+        return 1
+    if index.tbs_hashes and not HAVE_CRYPTOGRAPHY:
+        logger.warning("dbx has certificate TBS digests; install 'cryptography' to check them")
+
+    binaries = find_efi_binaries(args.paths)
+    start = time.monotonic()
+    results = check_binaries(index, binaries, args.jobs)
+    elapsed = time.monotonic() - start
+
+    revoked = [r for r in results if r["revoked"]]
+    errors = [r for r in results if "error" in r]
+    print(f"🛡️  dbx: {index.summary()}")
+    print(f"🔍 Checked {len(results)} EFI binaries in {elapsed:.2f}s")
+    for r in revoked:
+        reasons = ", ".join(f"{m['reason']}:{m['digest'][:16]}" for m in r["matches"])
+        print(f"🚫 REVOKED {r['path']} ({reasons})")
+    for r in errors:
+        print(f"⚠️  {r['path']}: {r['error']}")
+    if not revoked:
+        print("✅ No revoked binaries found")
+
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump({"dbx": index.summary(), "elapsed_seconds": round(elapsed, 3), "results": results}, f, indent=2)
+    return 1 if revoked else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
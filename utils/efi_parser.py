@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard EFI Signature Database Parser
+Part of the edk2-bootkit-defense project
+
+Parses SecureBoot signature databases (PK, KEK, db, dbx, MokList) into a
+common structure. Binary EFI_SIGNATURE_LIST data is read straight from
+efivarfs, .esl files or time-based authenticated .auth files; the text output
+of efitools' efi-readvar is still accepted by parse_string().
+
+Signature payloads are returned as memoryview slices of the input buffer, so
+walking a dbx with hundreds of hashes copies nothing and spawns no process.
+Certificate subjects and issuers are decoded when the optional
+'cryptography' package is installed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import re
+import struct
+import sys
+import uuid
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, NamedTuple, Optional, Union
+
+try:
+    from cryptography import x509
+    HAVE_CRYPTOGRAPHY = True
+except ImportError:
+    HAVE_CRYPTOGRAPHY = False
+
+logger = logging.getLogger(__name__)
+
+EFIVARS_PATH = Path("/sys/firmware/efi/efivars")
+
+EFI_GLOBAL_VARIABLE = "8be4df61-93ca-11d2-aa0d-00e098032b8c"
+EFI_IMAGE_SECURITY_DATABASE = "d719b2cb-3d3a-4596-a3bc-dad00e67656f"
+SHIM_LOCK_GUID = "605dab50-e046-4300-abb6-3dd810dd8b23"
+
+# Variable name -> vendor GUID, in efi-readvar's order
+SECUREBOOT_VARIABLES = {
+    "PK": EFI_GLOBAL_VARIABLE,
+    "KEK": EFI_GLOBAL_VARIABLE,
+    "db": EFI_IMAGE_SECURITY_DATABASE,
+    "dbx": EFI_IMAGE_SECURITY_DATABASE,
+    "MokListRT": SHIM_LOCK_GUID,
+}
+
+# Signature type GUID -> (efi-readvar type name, payload is a certificate)
+SIGNATURE_TYPES = {
+    "c1c41626-504c-4092-aca9-41f936934328": ("SHA256", False),
+    "a5c059a1-94e4-4aa7-87b5-ab155c2bf072": ("X509", True),
+    "3c5766e8-269c-4e34-aa14-ed776e85b3b6": ("RSA2048", False),
+    "e2b36190-879b-4a3d-ad8d-f2e7bba32784": ("RSA2048+SHA256", False),
+    "826ca512-cf10-4ac9-b187-be01496631bd": ("SHA1", False),
+    "67f8444f-8743-48f1-a328-1eaab8736580": ("RSA2048+SHA1", False),
+    "0b6e5233-a65c-44c9-9407-d9ab83bfc8bd": ("SHA224", False),
+    "ff3e5307-9fd0-48c9-85f1-8ad56c701e01": ("SHA384", False),
+    "093e0fae-a6c4-4f50-9f1b-d41e2b89c19a": ("SHA512", False),
+    "3bd2a492-96c0-4079-b420-fcf98ef103ed": ("X509+SHA256", False),
+    "7076876e-80c2-4ee6-aad2-28b349a6865b": ("X509+SHA384", False),
+    "446dbf63-2502-4cda-bcfa-2465d2b0fe9d": ("X509+SHA512", False),
+    "4aafd29d-68df-49ee-8aa9-347d375665a7": ("PKCS7", False),
+}
+
+ESL_HEADER = struct.Struct("<16sIII")   # SignatureType, ListSize, HeaderSize, SignatureSize
+GUID_SIZE = 16
+ATTRIBUTES_SIZE = 4
+EFI_TIME_SIZE = 16
+WIN_CERT_TYPE_EFI_GUID = 0x0EF1
+
+
+class EFIParseError(ValueError):
+    """Malformed signature database"""
+
+
+class EFISignature(NamedTuple):
+    owner: str
+    data: memoryview           # certificate DER or hash bytes (zero-copy)
+
+
+class EFISignatureList(NamedTuple):
+    type_guid: str
+    type: str
+    header: memoryview
+    signature_size: int
+    signatures: List[EFISignature]
+
+
+# Owner GUIDs repeat across a whole dbx; decode each distinct one once
+_GUID_CACHE: Dict[bytes, str] = {}
+
+
+def _guid(raw: Union[bytes, memoryview]) -> str:
+    raw = bytes(raw)
+    guid = _GUID_CACHE.get(raw)
+    if guid is None:
+        guid = _GUID_CACHE[raw] = str(uuid.UUID(bytes_le=raw))
+    return guid
+
+
+def iter_signature_lists(buf: Union[bytes, bytearray, memoryview]) -> Iterator[EFISignatureList]:
+    """Walk concatenated EFI_SIGNATURE_LISTs, yielding views into buf"""
+    view = memoryview(buf)
+    off = 0
+    end = len(view)
+    while off < end:
+        if end - off < ESL_HEADER.size:
+            raise EFIParseError(f"truncated signature list header at offset {off}")
+        raw_type, list_size, header_size, sig_size = ESL_HEADER.unpack_from(view, off)
+        body = off + ESL_HEADER.size + header_size
+        if list_size < ESL_HEADER.size or off + list_size > end or body > off + list_size:
+            raise EFIParseError(f"bad signature list size {list_size} at offset {off}")
+        if sig_size <= GUID_SIZE or (off + list_size - body) % sig_size:
+            raise EFIParseError(f"bad signature size {sig_size} at offset {off}")
+        type_guid = _guid(raw_type)
+        type_name = SIGNATURE_TYPES.get(type_guid, (type_guid, False))[0]
+        signatures = [
+            EFISignature(_guid(view[pos:pos + GUID_SIZE]), view[pos + GUID_SIZE:pos + sig_size])
+            for pos in range(body, off + list_size, sig_size)
+        ]
+        yield EFISignatureList(type_guid, type_name, view[off + ESL_HEADER.size:body], sig_size, signatures)
+        off += list_size
+
+
+def _looks_like_esl(view: memoryview) -> bool:
+    if len(view) < ESL_HEADER.size:
+        return False
+    raw_type, list_size, header_size, sig_size = ESL_HEADER.unpack_from(view, 0)
+    return (_guid(raw_type) in SIGNATURE_TYPES and ESL_HEADER.size + header_size <= list_size <= len(view)
+            and sig_size > GUID_SIZE)
+
+
+def _auth_payload(view: memoryview) -> memoryview:
+    """Signature lists following an EFI_VARIABLE_AUTHENTICATION_2 header"""
+    if len(view) < EFI_TIME_SIZE + 8 + GUID_SIZE:
+        raise EFIParseError("truncated authentication header")
+    cert_length, _revision, cert_type = struct.unpack_from("<IHH", view, EFI_TIME_SIZE)
+    if cert_type != WIN_CERT_TYPE_EFI_GUID or cert_length < 8 + GUID_SIZE:
+        raise EFIParseError(f"unsupported WIN_CERTIFICATE type 0x{cert_type:x}")
+    start = EFI_TIME_SIZE + cert_length
+    if start > len(view):
+        raise EFIParseError("authentication header longer than file")
+    return view[start:]
+
+
+def signature_lists_from_bytes(data: Union[bytes, bytearray, memoryview], fmt: str = "auto") -> List[EFISignatureList]:
+    """
+    Parse signature lists from raw bytes.
+
+    fmt is 'esl' (bare lists), 'efivar' (efivarfs file: 4-byte attributes
+    first), 'auth' (EFI_VARIABLE_AUTHENTICATION_2 + lists) or 'auto'.
+    """
+    view = memoryview(data)
+    if fmt == "auto":
+        if not view:
+            return []
+        if _looks_like_esl(view):
+            fmt = "esl"
+        elif _looks_like_esl(view[ATTRIBUTES_SIZE:]):
+            fmt = "efivar"
+        else:
+            fmt = "auth"
+    if fmt == "efivar":
+        view = view[ATTRIBUTES_SIZE:]
+    elif fmt == "auth":
+        view = _auth_payload(view)
+    elif fmt != "esl":
+        raise ValueError(f"unknown signature database format: {fmt}")
+    return list(iter_signature_lists(view))
+
+
+def _x509_name(name: "x509.Name") -> str:
+    # efi-readvar prints OpenSSL's one-line form: C=US, ST=..., CN=...
+    return ", ".join(attr.rfc4514_string() for attr in name)
+
+
+def _certificate_details(der: memoryview) -> Dict[str, Any]:
+    details: Dict[str, Any] = {"sha256": hashlib.sha256(der).hexdigest()}
+    if HAVE_CRYPTOGRAPHY:
+        try:
+            cert = x509.load_der_x509_certificate(bytes(der))
+            details["subject"] = _x509_name(cert.subject)
+            details["issuer"] = _x509_name(cert.issuer)
+        except ValueError as e:
+            logger.debug(f"Undecodable certificate: {e}")
+    return details
+
+
+class EFIParser:
+    """Parse SecureBoot signature databases into a summary structure"""
+
+    VARIABLE_RE = re.compile(r"^Variable (\S+)(?:, length (\d+)| has no entries)")
+    LIST_RE = re.compile(r"^(\S+): List (\d+), type (\S+)")
+    SIGNATURE_RE = re.compile(r"^\s+Signature (\d+), size (\d+), owner ([0-9a-fA-F-]+)")
+    HASH_RE = re.compile(r"^\s+Hash:\s*([0-9a-fA-F]+)")
+    FIELD_RE = re.compile(r"^\s+(Subject|Issuer):\s*$")
+
+    def __init__(self, decode_certificates: bool = True):
+        self.decode_certificates = decode_certificates
+
+    @staticmethod
+    def _variable(length: int) -> Dict[str, Any]:
+        return {"length": length, "has_entries": False, "lists": []}
+
+    @staticmethod
+    def _result(variables: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        lists = [l for v in variables.values() for l in v["lists"]]
+        return {
+            "efi_variables": variables,
+            "summary": {
+                "total_variables": len(variables),
+                "variables_with_entries": sum(1 for v in variables.values() if v["has_entries"]),
+                "total_lists": len(lists),
+                "total_signatures": sum(len(l["signatures"]) for l in lists),
+            },
+        }
+
+    def parse_string(self, text: str) -> Dict[str, Any]:
+        """Parse efi-readvar text output"""
+        variables: Dict[str, Dict[str, Any]] = {}
+        var = sig = None
+        pending_field = None
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            m = self.VARIABLE_RE.match(line)
+            if m:
+                var = variables[m.group(1)] = self._variable(int(m.group(2) or 0))
+                sig = pending_field = None
+                continue
+            m = self.LIST_RE.match(line)
+            if m and var is not None:
+                var["lists"].append({"list_id": int(m.group(2)), "type": m.group(3), "signatures": []})
+                var["has_entries"] = True
+                sig = pending_field = None
+                continue
+            m = self.SIGNATURE_RE.match(line)
+            if m and var is not None and var["lists"]:
+                sig = {"signature_id": int(m.group(1)), "size": int(m.group(2)),
+                       "owner": m.group(3).lower(), "details": {}}
+                var["lists"][-1]["signatures"].append(sig)
+                pending_field = None
+                continue
+            if sig is None:
+                continue
+            m = self.HASH_RE.match(line)
+            if m:
+                sig["details"]["hash"] = m.group(1).lower()
+                continue
+            m = self.FIELD_RE.match(line)
+            if m:
+                pending_field = m.group(1).lower()
+                continue
+            if pending_field:
+                sig["details"][pending_field] = line.strip()
+                pending_field = None
+        return self._result(variables)
+
+    def describe_lists(self, lists: List[EFISignatureList], length: int) -> Dict[str, Any]:
+        """Per-variable structure for parsed signature lists"""
+        var = self._variable(length)
+        for list_id, esl in enumerate(lists):
+            is_cert = SIGNATURE_TYPES.get(esl.type_guid, (None, False))[1]
+            signatures = []
+            for sig_id, signature in enumerate(esl.signatures):
+                if is_cert:
+                    details = _certificate_details(signature.data) if self.decode_certificates else {}
+                else:
+                    details = {"hash": signature.data.hex()}
+                signatures.append({
+                    "signature_id": sig_id,
+                    "size": esl.signature_size,
+                    "owner": signature.owner,
+                    "details": details,
+                })
+            var["lists"].append({"list_id": list_id, "type": esl.type, "signatures": signatures})
+        var["has_entries"] = bool(var["lists"])
+        return var
+
+    def parse_bytes(self, data: Union[bytes, bytearray, memoryview], fmt: str = "auto") -> Dict[str, Any]:
+        """Per-variable structure for one binary signature database"""
+        lists = signature_lists_from_bytes(data, fmt)
+        length = len(data) - (ATTRIBUTES_SIZE if fmt == "efivar" else 0)
+        return self.describe_lists(lists, length)
+
+    def parse_files(self, paths: List[Union[str, Path]]) -> Dict[str, Any]:
+        """Parse .esl/.auth/efivarfs files; variables are named by file stem"""
+        variables = {}
+        for path in map(Path, paths):
+            fmt = {".esl": "esl", ".auth": "auth"}.get(path.suffix.lower(), "auto")
+            variables[path.stem.split("-")[0]] = self.parse_bytes(path.read_bytes(), fmt)
+        return self._result(variables)
+
+    def parse_efivars(self, efivars_dir: Union[str, Path] = EFIVARS_PATH,
+                      names: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Parse the SecureBoot databases from efivarfs (absent ones have no entries)"""
+        variables = {}
+        for name, guid in (names or SECUREBOOT_VARIABLES).items():
+            path = Path(efivars_dir) / f"{name}-{guid}"
+            try:
+                raw = path.read_bytes()
+            except FileNotFoundError:
+                variables[name] = self._variable(0)
+                continue
+            except OSError as e:
+                logger.warning(f"Cannot read {path}: {e}")
+                variables[name] = self._variable(0)
+                continue
+            try:
+                variables[name] = self.parse_bytes(raw, "efivar")
+            except EFIParseError as e:
+                logger.error(f"Malformed {name}: {e}")
+                variables[name] = dict(self._variable(len(raw) - ATTRIBUTES_SIZE), error=str(e))
+        return self._result(variables)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Parse SecureBoot signature databases")
+    parser.add_argument("files", nargs="*", help=".esl/.auth/efivarfs files (default: live PK/KEK/db/dbx/MokListRT)")
+    parser.add_argument("--efivars", default=str(EFIVARS_PATH), help="efivarfs directory")
+    parser.add_argument("--text", help="Parse saved efi-readvar output instead")
+    parser.add_argument("--summary", action="store_true", help="Print only the summary")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    efi = EFIParser()
+    try:
+        if args.text:
+            result = efi.parse_string(Path(args.text).read_text())
+        elif args.files:
+            result = efi.parse_files(args.files)
+        else:
+            result = efi.parse_efivars(args.efivars)
+    except (OSError, EFIParseError) as e:
+        logger.error(str(e))
+        return 1
+    print(json.dumps(result["summary"] if args.summary else result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
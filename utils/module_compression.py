@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard Compressed Kernel Module Support
+Part of the edk2-bootkit-defense project
+
+Distributions ship modules as .ko.xz, .ko.gz or .ko.zst. The signature
+covers the uncompressed module and goes inside the compressed file, so signing
+means: decompress into memory, sign, recompress the way the module was
+compressed, and replace the file.
+
+The codec parameters are read back from the existing file so recompression
+matches it: the xz integrity check and LZMA2 dictionary size (the kernel builds
+with --check=crc32 --lzma2=dict=1MiB), the gzip level hinted by the XFL byte
+and the original mtime, and whether a zstd frame carries a checksum. zstd needs
+the optional 'zstandard' package. lzma, zlib and zstandard release the GIL, so
+pgmodsign's worker threads (de)compress modules in parallel.
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import lzma
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+try:
+    import zstandard
+    HAVE_ZSTANDARD = True
+except ImportError:
+    HAVE_ZSTANDARD = False
+
+MODULE_SUFFIXES = {".ko": None, ".ko.xz": "xz", ".ko.gz": "gzip", ".ko.zst": "zstd"}
+
+XZ_MAGIC = b"\xfd7zXZ\x00"
+XZ_FILTER_LZMA2 = 0x21
+XZ_BCJ_FILTERS = {0x04: lzma.FILTER_X86, 0x05: lzma.FILTER_POWERPC, 0x07: lzma.FILTER_ARM,
+                  0x08: lzma.FILTER_ARMTHUMB, 0x09: lzma.FILTER_SPARC}
+XZ_DEFAULT_DICT = 1 << 20
+GZIP_XFL_LEVEL = {2: 9, 4: 1}
+GZIP_DEFAULT_LEVEL = 6
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZSTD_DEFAULT_LEVEL = 3                   # zstd's default, what the kernel's modules_install uses
+READ_CHUNK = 1 << 20
+
+
+def is_module_name(name: str) -> bool:
+    return any(name.endswith(suffix) for suffix in MODULE_SUFFIXES)
+
+
+def module_codec(path: Union[str, Path]) -> Optional[str]:
+    """'xz', 'gzip', 'zstd', or None for a plain .ko"""
+    name = str(path)
+    for suffix, codec in MODULE_SUFFIXES.items():
+        if codec and name.endswith(suffix):
+            return codec
+    return None
+
+
+def _xz_vli(buf: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        value |= (b & 0x7F) << shift
+        shift += 7
+        if not b & 0x80:
+            return value, pos
+
+
+def _xz_params(head: bytes) -> Dict[str, Any]:
+    """Integrity check and filter chain of the first block"""
+    params: Dict[str, Any] = {"codec": "xz", "check": lzma.CHECK_CRC64,
+                              "filters": [{"id": lzma.FILTER_LZMA2, "preset": 6, "dict_size": XZ_DEFAULT_DICT}]}
+    if not head.startswith(XZ_MAGIC) or len(head) < 13:
+        raise ValueError("not an xz stream")
+    params["check"] = head[7] & 0x0F
+    try:
+        pos = 12                                     # stream header, then the first block header
+        flags = head[pos + 1]
+        pos += 2
+        if flags & 0x40:
+            _size, pos = _xz_vli(head, pos)
+        if flags & 0x80:
+            _size, pos = _xz_vli(head, pos)
+        filters = []
+        for _ in range((flags & 0x03) + 1):
+            filter_id, pos = _xz_vli(head, pos)
+            props_size, pos = _xz_vli(head, pos)
+            props = head[pos:pos + props_size]
+            pos += props_size
+            if filter_id == XZ_FILTER_LZMA2:
+                bits = props[0] & 0x3F
+                dict_size = 0xFFFFFFFF if bits == 40 else (2 | (bits & 1)) << (bits // 2 + 11)
+                filters.append({"id": lzma.FILTER_LZMA2, "preset": 6, "dict_size": dict_size})
+            elif filter_id in XZ_BCJ_FILTERS:
+                filters.append({"id": XZ_BCJ_FILTERS[filter_id]})
+            else:
+                raise ValueError(f"unsupported xz filter {filter_id:#x}")
+        params["filters"] = filters
+    except (IndexError, ValueError):
+        pass                                         # keep the kernel's defaults
+    return params
+
+
+def _gzip_params(head: bytes) -> Dict[str, Any]:
+    if head[:2] != b"\x1f\x8b":
+        raise ValueError("not a gzip stream")
+    mtime, xfl = struct.unpack_from("<IB", head, 4)
+    return {"codec": "gzip", "level": GZIP_XFL_LEVEL.get(xfl, GZIP_DEFAULT_LEVEL), "mtime": mtime}
+
+
+def _zstd_params(head: bytes) -> Dict[str, Any]:
+    if not head.startswith(ZSTD_MAGIC):
+        raise ValueError("not a zstd frame")
+    return {"codec": "zstd", "level": ZSTD_DEFAULT_LEVEL, "checksum": bool(head[4] & 0x04)}
+
+
+def _decompress(f, codec: str) -> Tuple[bytes, Dict[str, Any]]:
+    head = f.read(64)
+    f.seek(0)
+    if codec == "xz":
+        params = _xz_params(head)
+        stream = lzma.open(f, "rb")
+    elif codec == "gzip":
+        params = _gzip_params(head)
+        stream = gzip.GzipFile(fileobj=f, mode="rb")
+    else:
+        params = _zstd_params(head)
+        if not HAVE_ZSTANDARD:
+            raise RuntimeError("zstd modules need the 'zstandard' package")
+        stream = zstandard.ZstdDecompressor().stream_reader(f)
+    out = io.BytesIO()
+    with stream:
+        for chunk in iter(lambda: stream.read(READ_CHUNK), b""):
+            out.write(chunk)
+    return out.getvalue(), params
+
+
+def decompress_module(path: Union[str, Path]) -> Tuple[bytes, Optional[Dict[str, Any]]]:
+    """(uncompressed module, codec parameters); parameters are None for a plain .ko"""
+    codec = module_codec(path)
+    if codec is None:
+        return Path(path).read_bytes(), None
+    with open(path, "rb") as f:
+        return _decompress(f, codec)
+
+
+def decompress_data(data: bytes, codec: Optional[str]) -> Tuple[bytes, Optional[Dict[str, Any]]]:
+    """decompress_module() for a module already in memory"""
+    if codec is None:
+        return data, None
+    return _decompress(io.BytesIO(data), codec)
+
+
+def compress_module(data: bytes, params: Dict[str, Any]) -> bytes:
+    """Compress a module with the parameters decompress_module() found"""
+    codec = params["codec"]
+    if codec == "xz":
+        return lzma.compress(data, format=lzma.FORMAT_XZ, check=params["check"], filters=params["filters"])
+    if codec == "gzip":
+        out = io.BytesIO()
+        with gzip.GzipFile(filename="", fileobj=out, mode="wb", compresslevel=params["level"],
+                           mtime=params["mtime"]) as gz:
+            gz.write(data)
+        return out.getvalue()
+    if codec == "zstd":
+        if not HAVE_ZSTANDARD:
+            raise RuntimeError("zstd modules need the 'zstandard' package")
+        return zstandard.ZstdCompressor(level=params["level"], write_checksum=params["checksum"]).compress(data)
+    raise ValueError(f"unknown module codec: {codec}")
+
+
+def write_module(path: Union[str, Path], data: bytes, params: Optional[Dict[str, Any]]) -> bytes:
+    """Replace a module (compressing it like the original) via a temp file and rename; returns what was written"""
+    path = Path(path)
+    payload = compress_module(data, params) if params else data
+    tmp = path.with_name(path.name + ".~signed~")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.chmod(tmp, path.stat().st_mode & 0o7777)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return payload
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard Kernel Module Signatures
+Part of the edk2-bootkit-defense project
+
+Reads the signature appended to a kernel module without spawning modinfo:
+
+  [ module ][ signature (sig_len bytes) ][ struct module_signature (12) ]
+  [ "~Module signature appended~\\n" (28) ]
+
+is_signed() looks at the last 40 bytes only (of the decompressed module for
+.ko.xz/.ko.gz/.ko.zst). read_module_signature() also
+reads the PKCS#7 blob and walks just enough DER to report what
+`modinfo -F signer/sig_key/sig_hashalgo` would: the issuer CN and serial of
+the first SignerInfo (or its subjectKeyIdentifier) and its digest algorithm.
+
+ModuleSigner is the kernel's scripts/sign-file done in-process: the key and
+certificate are loaded once, and each module gets the same detached,
+attribute-less, certificate-less PKCS#7 and trailer that sign-file writes.
+It needs the optional 'cryptography' package for the private key operation;
+the DER around it is built here so the bytes match sign-file's.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import BinaryIO, Iterator, NamedTuple, Optional, Tuple, Union
+
+from module_compression import decompress_module, module_codec, write_module
+
+try:
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa
+    HAVE_CRYPTOGRAPHY = True
+except ImportError:
+    HAVE_CRYPTOGRAPHY = False
+
+MODULE_SIG_MAGIC = b"~Module signature appended~\n"
+# algo, hash, id_type, signer_len, key_id_len, pad[3], sig_len (big-endian)
+MODULE_SIG_INFO = struct.Struct(">BBBBB3xI")
+MODULE_SIG_TRAILER = MODULE_SIG_INFO.size + len(MODULE_SIG_MAGIC)
+
+ID_TYPES = {0: "PGP", 1: "X509", 2: "PKCS#7"}
+PKEY_ID_PKCS7 = 2
+
+OID_DATA = "1.2.840.113549.1.7.1"
+OID_SIGNED_DATA = "1.2.840.113549.1.7.2"
+OID_RSA_ENCRYPTION = "1.2.840.113549.1.1.1"
+ECDSA_OIDS = {
+    "sha1": "1.2.840.10045.4.1",
+    "sha224": "1.2.840.10045.4.3.1",
+    "sha256": "1.2.840.10045.4.3.2",
+    "sha384": "1.2.840.10045.4.3.3",
+    "sha512": "1.2.840.10045.4.3.4",
+}
+OID_COMMON_NAME = "2.5.4.3"
+OID_ORGANIZATION = "2.5.4.10"
+DIGEST_OIDS = {
+    "1.3.14.3.2.26": "sha1",
+    "2.16.840.1.101.3.4.2.4": "sha224",
+    "2.16.840.1.101.3.4.2.1": "sha256",
+    "2.16.840.1.101.3.4.2.2": "sha384",
+    "2.16.840.1.101.3.4.2.3": "sha512",
+    "2.16.840.1.101.3.4.2.8": "sha3-256",
+    "2.16.840.1.101.3.4.2.9": "sha3-384",
+    "2.16.840.1.101.3.4.2.10": "sha3-512",
+}
+
+# DER tags used below
+SEQUENCE, SET, INTEGER, OID = 0x30, 0x31, 0x02, 0x06
+NULL, OCTET_STRING = 0x05, 0x04
+CONTEXT_0, CONTEXT_0_PRIMITIVE = 0xA0, 0x80
+STRING_CODECS = {0x0C: "utf-8", 0x13: "ascii", 0x16: "ascii", 0x14: "latin-1", 0x1E: "utf-16-be"}
+
+
+class ModuleSignature(NamedTuple):
+    id_type: str
+    sig_len: int
+    offset: int                 # where the signature data starts (= unsigned module size)
+    signer: Optional[str]       # issuer CN of the signing certificate
+    key_id: Optional[str]       # serial number or subjectKeyIdentifier, modinfo's AA:BB:.. form
+    hash_algo: Optional[str]
+
+
+def _tlv(der: bytes, pos: int, end: int) -> Tuple[int, int, int]:
+    """(tag, content start, content end) of the DER element at pos"""
+    if pos + 2 > end:
+        raise ValueError("truncated DER element")
+    tag, length = der[pos], der[pos + 1]
+    pos += 2
+    if length & 0x80:
+        n = length & 0x7F
+        if not n or n > 4 or pos + n > end:
+            raise ValueError("unsupported DER length")
+        length = int.from_bytes(der[pos:pos + n], "big")
+        pos += n
+    if pos + length > end:
+        raise ValueError("DER element overruns its parent")
+    return tag, pos, pos + length
+
+
+def _children(der: bytes, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+    pos = start
+    while pos < end:
+        tag, cstart, cend = _tlv(der, pos, end)
+        yield tag, cstart, cend
+        pos = cend
+
+
+def _oid(raw: bytes) -> str:
+    parts, value = [], 0
+    for b in raw:
+        value = (value << 7) | (b & 0x7F)
+        if not b & 0x80:
+            parts.append(value)
+            value = 0
+    if not parts:
+        return ""
+    first = min(parts[0] // 40, 2)
+    return ".".join(str(p) for p in [first, parts[0] - 40 * first] + parts[1:])
+
+
+def _hex_id(raw: bytes) -> str:
+    return ":".join(f"{b:02X}" for b in raw)
+
+
+def _name_attribute(der: bytes, start: int, end: int, oid: str) -> Optional[str]:
+    """Value of an attribute (e.g. CN) in an X.501 Name"""
+    for tag, rstart, rend in _children(der, start, end):       # RelativeDistinguishedName SETs
+        for _tag, astart, aend in _children(der, rstart, rend):  # AttributeTypeAndValue
+            (otag, ostart, oend), (vtag, vstart, vend) = list(_children(der, astart, aend))[:2]
+            if otag == OID and _oid(der[ostart:oend]) == oid:
+                return der[vstart:vend].decode(STRING_CODECS.get(vtag, "latin-1"), "replace")
+    return None
+
+
+def parse_pkcs7_signer(der: bytes) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """(signer, key_id, hash_algo) of the first SignerInfo in a PKCS#7 SignedData"""
+    tag, start, end = _tlv(der, 0, len(der))
+    if tag != SEQUENCE:
+        raise ValueError("not a PKCS#7 ContentInfo")
+    content = list(_children(der, start, end))
+    if len(content) < 2 or _oid(der[content[0][1]:content[0][2]]) != OID_SIGNED_DATA:
+        raise ValueError("not PKCS#7 SignedData")
+    _tag, sstart, send = _tlv(der, content[1][1], content[1][2])
+    signer_infos = [c for c in _children(der, sstart, send) if c[0] == SET][-1:]
+    if not signer_infos:
+        raise ValueError("SignedData has no SignerInfos")
+    _tag, istart, iend = signer_infos[0]
+    first = next(_children(der, istart, iend), None)
+    if first is None:
+        raise ValueError("empty SignerInfos")
+    fields = list(_children(der, first[1], first[2]))
+    if len(fields) < 3:
+        raise ValueError("truncated SignerInfo")
+
+    signer = key_id = None
+    sid_tag, sid_start, sid_end = fields[1]
+    if sid_tag == SEQUENCE:                 # IssuerAndSerialNumber
+        issuer, serial = list(_children(der, sid_start, sid_end))[:2]
+        signer = (_name_attribute(der, issuer[1], issuer[2], OID_COMMON_NAME)
+                  or _name_attribute(der, issuer[1], issuer[2], OID_ORGANIZATION))
+        key_id = _hex_id(der[serial[1]:serial[2]].lstrip(b"\0") or b"\0")
+    elif sid_tag == CONTEXT_0_PRIMITIVE:    # [0] SubjectKeyIdentifier
+        key_id = _hex_id(der[sid_start:sid_end])
+
+    hash_algo = None
+    digest_tag, dstart, dend = fields[2]
+    if digest_tag == SEQUENCE:
+        otag, ostart, oend = next(_children(der, dstart, dend))
+        if otag == OID:
+            oid = _oid(der[ostart:oend])
+            hash_algo = DIGEST_OIDS.get(oid, oid)
+    return signer, key_id, hash_algo
+
+
+def certificate_identity(cert_path: Union[str, Path]) -> dict:
+    """
+    SHA-256 fingerprint of a signing certificate (PEM or DER), plus the
+    signer/key_id its module signatures carry (issuer CN and serial).
+    """
+    data = Path(cert_path).read_bytes()
+    if b"-----BEGIN CERTIFICATE-----" in data:
+        body = data.split(b"-----BEGIN CERTIFICATE-----", 1)[1].split(b"-----END CERTIFICATE-----", 1)[0]
+        data = base64.b64decode(b"".join(body.split()))
+    _tag, start, end = _tlv(data, 0, len(data))
+    _tag, tstart, tend = _tlv(data, start, end)                  # tbsCertificate
+    fields = [f for f in _children(data, tstart, tend) if f[0] != CONTEXT_0]   # skip [0] version
+    serial, issuer = fields[0], fields[2]
+    return {
+        "fingerprint": hashlib.sha256(data).hexdigest(),
+        "signer": (_name_attribute(data, issuer[1], issuer[2], OID_COMMON_NAME)
+                   or _name_attribute(data, issuer[1], issuer[2], OID_ORGANIZATION)),
+        "key_id": _hex_id(data[serial[1]:serial[2]].lstrip(b"\0") or b"\0"),
+    }
+
+
+def _der(tag: int, content: bytes) -> bytes:
+    n = len(content)
+    if n < 0x80:
+        return bytes((tag, n)) + content
+    length = n.to_bytes((n.bit_length() + 7) // 8, "big")
+    return bytes((tag, 0x80 | len(length))) + length + content
+
+
+def _der_oid(dotted: str) -> bytes:
+    parts = [int(p) for p in dotted.split(".")]
+    body = bytearray()
+    for value in [40 * parts[0] + parts[1]] + parts[2:]:
+        chunk = [value & 0x7F]
+        while value > 0x7F:
+            value >>= 7
+            chunk.append(0x80 | (value & 0x7F))
+        body += bytes(reversed(chunk))
+    return _der(OID, bytes(body))
+
+
+def _der_int(value: int) -> bytes:
+    return _der(INTEGER, value.to_bytes(value.bit_length() // 8 + 1, "big", signed=True))
+
+
+def module_signature_trailer(signature: bytes) -> bytes:
+    """What follows the module: PKCS#7 signature, struct module_signature, magic"""
+    return signature + MODULE_SIG_INFO.pack(0, 0, PKEY_ID_PKCS7, 0, 0, len(signature)) + MODULE_SIG_MAGIC
+
+
+class ModuleSigner:
+    """sign-file without the subprocess: key and certificate parsed once, reused per module"""
+
+    HASHES = {"sha1": "SHA1", "sha224": "SHA224", "sha256": "SHA256", "sha384": "SHA384", "sha512": "SHA512"}
+
+    def __init__(self, cert_path: Union[str, Path], key_path: Union[str, Path], hash_algo: str = "sha256",
+                 use_keyid: bool = False, password: Optional[bytes] = None):
+        if not HAVE_CRYPTOGRAPHY:
+            raise RuntimeError("native module signing needs the 'cryptography' package")
+        if hash_algo not in self.HASHES:
+            raise ValueError(f"Unsupported hash algorithm for native signing: {hash_algo}")
+        # sign-file takes the certificate as PEM or DER and the PIN from KBUILD_SIGN_PIN
+        cert_data = Path(cert_path).read_bytes()
+        self.cert = (x509.load_pem_x509_certificate(cert_data) if b"-----BEGIN" in cert_data
+                     else x509.load_der_x509_certificate(cert_data))
+        if password is None and os.environ.get("KBUILD_SIGN_PIN"):
+            password = os.environ["KBUILD_SIGN_PIN"].encode()
+        key_data = Path(key_path).read_bytes()
+        self.key = (serialization.load_pem_private_key(key_data, password) if b"-----BEGIN" in key_data
+                    else serialization.load_der_private_key(key_data, password))
+        if not isinstance(self.key, (rsa.RSAPrivateKey, ec.EllipticCurvePrivateKey)):
+            raise ValueError(f"Unsupported signing key type: {type(self.key).__name__}")
+        self.hash_algo = hash_algo
+        self.hash = getattr(hashes, self.HASHES[hash_algo])()
+
+        digest_algorithm = _der(SEQUENCE, _der_oid(next(o for o, n in DIGEST_OIDS.items() if n == hash_algo)))
+        if isinstance(self.key, rsa.RSAPrivateKey):
+            signature_algorithm = _der(SEQUENCE, _der_oid(OID_RSA_ENCRYPTION) + _der(NULL, b""))
+        else:
+            signature_algorithm = _der(SEQUENCE, _der_oid(ECDSA_OIDS[hash_algo]))
+        if use_keyid:
+            skid = self.cert.extensions.get_extension_for_class(x509.SubjectKeyIdentifier).value.digest
+            version, sid = 3, _der(CONTEXT_0_PRIMITIVE, skid)
+        else:
+            version, sid = 1, _der(SEQUENCE, self.cert.issuer.public_bytes() + _der_int(self.cert.serial_number))
+        # Everything but the signature value is the same for every module
+        self._signer_prefix = _der_int(version) + sid + digest_algorithm + signature_algorithm
+        self._signed_data_prefix = (_der_int(version) + _der(SET, digest_algorithm)
+                                    + _der(SEQUENCE, _der_oid(OID_DATA)))
+
+    def signature(self, data: bytes) -> bytes:
+        """Detached PKCS#7 SignedData over data, as sign-file writes it"""
+        if isinstance(self.key, rsa.RSAPrivateKey):
+            value = self.key.sign(data, padding.PKCS1v15(), self.hash)
+        else:
+            value = self.key.sign(data, ec.ECDSA(self.hash))
+        signer_info = _der(SEQUENCE, self._signer_prefix + _der(OCTET_STRING, value))
+        signed_data = _der(SEQUENCE, self._signed_data_prefix + _der(SET, signer_info))
+        return _der(SEQUENCE, _der_oid(OID_SIGNED_DATA) + _der(CONTEXT_0, signed_data))
+
+    def signed(self, data: bytes) -> bytes:
+        """An uncompressed module with its signature appended"""
+        return data + module_signature_trailer(self.signature(data))
+
+    def sign_module(self, module_path: Union[str, Path]) -> None:
+        """
+        Append the signature like sign-file (write <module>.~signed~, rename
+        over); compressed modules are signed inside and recompressed alike.
+        """
+        data, params = decompress_module(module_path)
+        write_module(module_path, self.signed(data), params)
+
+
+def _trailer(f, size: int) -> Optional[Tuple[int, int, int]]:
+    """(id_type, sig_len, signature offset) from the last 40 bytes, else None"""
+    if size < MODULE_SIG_TRAILER:
+        return None
+    f.seek(size - MODULE_SIG_TRAILER)
+    tail = f.read(MODULE_SIG_TRAILER)
+    if len(tail) != MODULE_SIG_TRAILER or not tail.endswith(MODULE_SIG_MAGIC):
+        return None
+    _algo, _hash, id_type, signer_len, key_id_len, sig_len = MODULE_SIG_INFO.unpack_from(tail)
+    offset = size - MODULE_SIG_TRAILER - sig_len - signer_len - key_id_len
+    if sig_len == 0 or offset < 0:
+        return None
+    return id_type, sig_len, offset
+
+
+def _open_module(module_path: Union[str, Path]) -> BinaryIO:
+    """The module's uncompressed bytes as a seekable file"""
+    if module_codec(module_path):
+        return io.BytesIO(decompress_module(module_path)[0])
+    return open(module_path, "rb")
+
+
+def is_signed(module_path: Union[str, Path]) -> bool:
+    """True if the module ends with a well-formed signature trailer"""
+    with _open_module(module_path) as f:
+        return _trailer(f, f.seek(0, os.SEEK_END)) is not None
+
+
+def _read_signature(f: BinaryIO) -> Optional[ModuleSignature]:
+    size = f.seek(0, os.SEEK_END)
+    trailer = _trailer(f, size)
+    if trailer is None:
+        return None
+    id_type, sig_len, offset = trailer
+    signer = key_id = hash_algo = None
+    if id_type == PKEY_ID_PKCS7:
+        f.seek(size - MODULE_SIG_TRAILER - sig_len)
+        try:
+            signer, key_id, hash_algo = parse_pkcs7_signer(f.read(sig_len))
+        except (ValueError, StopIteration):
+            pass                    # signed, but not by anything we can name
+    return ModuleSignature(ID_TYPES.get(id_type, str(id_type)), sig_len, offset, signer, key_id, hash_algo)
+
+
+def read_module_signature(module_path: Union[str, Path]) -> Optional[ModuleSignature]:
+    """The appended signature with its signer, or None for an unsigned module"""
+    with _open_module(module_path) as f:
+        return _read_signature(f)
+
+
+def signature_from_bytes(data: bytes) -> Optional[ModuleSignature]:
+    """read_module_signature() for an uncompressed module already in memory"""
+    return _read_signature(io.BytesIO(data))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Show the signature appended to kernel modules")
+    parser.add_argument("modules", nargs="+", help="Kernel module files (.ko, .ko.xz, .ko.gz, .ko.zst)")
+    parser.add_argument("--json", action="store_true", help="JSON output")
+    args = parser.parse_args()
+
+    results = {}
+    for module in args.modules:
+        try:
+            sig = read_module_signature(module)
+            results[module] = sig._asdict() if sig else None
+        except OSError as e:
+            results[module] = {"error": str(e)}
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for module, sig in results.items():
+            if sig is None:
+                print(f"❌ {module}: unsigned")
+            elif "error" in sig:
+                print(f"⚠️  {module}: {sig['error']}")
+            else:
+                print(f"✅ {module}: {sig['id_type']} signer={sig['signer']} key={sig['key_id']} hash={sig['hash_algo']}")
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard Kernel Module Tree
+Part of the edk2-bootkit-defense project
+
+Enumerates the modules of an installed kernel (/lib/modules/<release>) from
+depmod's own index files instead of walking the tree or running modinfo per
+module. modules.dep lists every installed module and its dependencies.
+modules.order lists the modules kbuild built with the kernel, so a module in
+modules.dep but not in modules.order (updates/, extra/, DKMS) is out-of-tree.
+Loaded modules come from /proc/modules.
+
+TreeCheckpoint records which modules a tree signing run has finished, so an
+interrupted run over a whole kernel resumes where it stopped instead of
+starting again.
+
+Usage:
+  python3 utils/module_tree.py                      # running kernel, all modules
+  python3 utils/module_tree.py 6.8.0-45-generic --out-of-tree
+  python3 utils/module_tree.py --loaded --closure nvidia_drm
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from module_compression import MODULE_SUFFIXES
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+MODULES_ROOT = Path("/lib/modules")
+PROC_MODULES = Path("/proc/modules")
+DEFAULT_CHECKPOINT_DIR = REPO_ROOT / "out" / "cache"
+# Longest first, so ".ko.xz" is stripped whole rather than as ".ko"
+_SUFFIXES = sorted(MODULE_SUFFIXES, key=len, reverse=True)
+
+
+def module_name(path: str) -> str:
+    """Module name as the kernel and kmod see it: basename without suffix, '-' -> '_'"""
+    base = path.rsplit("/", 1)[-1]
+    for suffix in _SUFFIXES:
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+            break
+    return base.replace("-", "_")
+
+
+def _uncompressed(path: str) -> str:
+    """kernel/x/foo.ko.xz -> kernel/x/foo.ko (modules.order never carries the codec)"""
+    for suffix in _SUFFIXES:
+        if path.endswith(suffix):
+            return path[:-len(suffix)] + ".ko"
+    return path
+
+
+def tree_root(spec: Optional[str] = None) -> Path:
+    """A module tree directory, a kernel release under /lib/modules, or (None) the running kernel"""
+    if spec and Path(spec).is_dir():
+        return Path(spec).resolve()
+    return MODULES_ROOT / (spec or os.uname().release)
+
+
+class KernelModule(NamedTuple):
+    name: str
+    path: Path
+    depends: Tuple[str, ...]       # names, as listed by depmod (already transitive)
+    in_tree: bool
+
+
+class ModuleTree:
+    """The modules of one kernel, as modules.dep and modules.order describe them"""
+
+    def __init__(self, root=None):
+        self.root = tree_root(root) if root is None or isinstance(root, str) else Path(root)
+        dep_file = self.root / "modules.dep"
+        if not dep_file.exists():
+            raise FileNotFoundError(f"No modules.dep in {self.root} (run depmod)")
+
+        order_file = self.root / "modules.order"
+        order: List[str] = []
+        if order_file.exists():
+            order = [line.strip() for line in order_file.read_text().splitlines() if line.strip()]
+        else:
+            logger.info("No modules.order in %s; treating modules outside kernel/ as out-of-tree", self.root)
+        built = set(order)
+
+        deps: Dict[str, Tuple[str, List[str]]] = {}
+        with open(dep_file) as f:
+            for line in f:
+                rel, sep, rest = line.partition(":")
+                if not sep:
+                    continue
+                deps[module_name(rel)] = (rel, [module_name(d) for d in rest.split()])
+
+        # modules.order sequence first (kbuild's order), then what only depmod knows about
+        ranked = {module_name(rel): i for i, rel in enumerate(order)}
+        names = sorted(deps, key=lambda n: ranked.get(n, len(ranked)))
+        self.modules: Dict[str, KernelModule] = {}
+        for name in names:
+            rel, depends = deps[name]
+            in_tree = _uncompressed(rel) in built if built else rel.startswith("kernel/")
+            self.modules[name] = KernelModule(name, self.root / rel, tuple(depends), in_tree)
+
+    def __len__(self) -> int:
+        return len(self.modules)
+
+    def __iter__(self) -> Iterator[KernelModule]:
+        return iter(self.modules.values())
+
+    def get(self, name: str) -> Optional[KernelModule]:
+        return self.modules.get(module_name(name))
+
+    @staticmethod
+    def loaded() -> Set[str]:
+        """Names of the modules currently loaded (of whichever kernel is running)"""
+        try:
+            with open(PROC_MODULES) as f:
+                return {line.split(" ", 1)[0] for line in f if line.strip()}
+        except OSError as e:
+            logger.warning("Cannot read %s: %s", PROC_MODULES, e)
+            return set()
+
+    def closure(self, names: Iterable[str]) -> Set[str]:
+        """The named modules and everything they depend on"""
+        result: Set[str] = set()
+        todo = []
+        for name in names:
+            module = self.get(name)
+            if module is None:
+                raise ValueError(f"Module not in {self.root / 'modules.dep'}: {name}")
+            todo.append(module.name)
+        while todo:
+            name = todo.pop()
+            if name in result or name not in self.modules:
+                continue
+            result.add(name)
+            todo.extend(self.modules[name].depends)
+        return result
+
+    def select(self, loaded: bool = False, out_of_tree: bool = False,
+               closure: Optional[Iterable[str]] = None) -> List[KernelModule]:
+        """Modules passing every given filter, in tree order"""
+        wanted = self.closure(closure) if closure else None
+        running = self.loaded() if loaded else None
+        return [m for m in self
+                if (wanted is None or m.name in wanted)
+                and (running is None or m.name in running)
+                and not (out_of_tree and m.in_tree)]
+
+
+class TreeCheckpoint:
+    """
+    Progress of one tree signing run, rewritten atomically after each batch.
+
+    A checkpoint only resumes the same run: same tree, filters, hash and key.
+    Modules that were signed or skipped are done; failed ones are retried on
+    the next run. A run that finishes without failures removes its checkpoint.
+    """
+
+    def __init__(self, path, run: Dict[str, Any], restart: bool = False):
+        self.path = Path(path)
+        self.run = run
+        self.done: Set[str] = set()
+        self.failed: Set[str] = set()
+        if self.path.exists() and not restart:
+            try:
+                data = json.loads(self.path.read_text())
+                if data.get("run") == run:
+                    self.done = set(data.get("done", []))
+                    self.failed = set(data.get("failed", []))
+                else:
+                    logger.info("Checkpoint %s is for a different run; starting over", self.path)
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable checkpoint %s: %s", self.path, e)
+
+    @classmethod
+    def default_path(cls, tree: ModuleTree) -> Path:
+        return DEFAULT_CHECKPOINT_DIR / f"tree_signing_{tree.root.name}.json"
+
+    def pending(self, paths: List[str]) -> List[str]:
+        return [p for p in paths if p not in self.done]
+
+    def update(self, paths: List[str], results: List[Dict[str, Any]]) -> None:
+        for path, result in zip(paths, results):
+            status = result.get("status")
+            if status in ("success", "skipped"):
+                self.done.add(path)
+                self.failed.discard(path)
+            elif status in ("failed", "error"):
+                self.failed.add(path)
+        self.save()
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({
+            "run": self.run,
+            "updated": datetime.now().isoformat(),
+            "done": sorted(self.done),
+            "failed": sorted(self.failed),
+        }, indent=1))
+        os.replace(tmp, self.path)
+
+    def finish(self) -> None:
+        if self.failed:
+            self.save()
+            logger.info("%d module(s) failed; checkpoint kept at %s to retry them", len(self.failed), self.path)
+        else:
+            self.path.unlink(missing_ok=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="List a kernel's modules from modules.dep / modules.order")
+    parser.add_argument("tree", nargs="?", help="Kernel release or module directory (default: running kernel)")
+    parser.add_argument("--loaded", action="store_true", help="Only modules currently loaded")
+    parser.add_argument("--out-of-tree", action="store_true", help="Only modules not built with the kernel")
+    parser.add_argument("--closure", action="append", metavar="MODULE",
+                        help="Only this module and its dependencies (repeatable)")
+    parser.add_argument("--json", action="store_true", help="JSON output")
+    args = parser.parse_args()
+
+    try:
+        tree = ModuleTree(args.tree)
+        modules = tree.select(loaded=args.loaded, out_of_tree=args.out_of_tree, closure=args.closure)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    if args.json:
+        print(json.dumps([{"name": m.name, "path": str(m.path), "depends": list(m.depends),
+                           "in_tree": m.in_tree} for m in modules], indent=2))
+        return 0
+    for m in modules:
+        print(f"{'  ' if m.in_tree else '➕'} {m.name:<28} {m.path}")
+    print(f"📦 {len(modules)} of {len(tree)} module(s) in {tree.root}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
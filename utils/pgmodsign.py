@@ -15,16 +15,31 @@ import json
 import logging
 import subprocess
 import hashlib
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import traceback
 
+from backup_store import DEFAULT_BACKUP_DIR, Backup, BackupStore
+from module_signature import (MODULE_SIG_INFO, MODULE_SIG_MAGIC, ModuleSigner, certificate_identity,
+                              is_signed, module_signature_trailer, read_module_signature, signature_from_bytes)
+from module_compression import decompress_data, is_module_name, module_codec, write_module
+from module_tree import ModuleTree, TreeCheckpoint
+from signing_manifest import DEFAULT_MANIFEST_PATH, SigningManifest
+
 # Resolve repo root (assumes this file lives in <repo>/utils/)
 REPO_ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_OUT_DIR = REPO_ROOT / "out" / "keys" / "mok"
 DEFAULT_CERT = DEFAULT_OUT_DIR / "PGMOK.crt"
 DEFAULT_KEY = DEFAULT_OUT_DIR / "PGMOK.key"
+# native: in-process PKCS#7 (needs cryptography); sign-file: the kernel's tool; auto: native if possible
+ENGINES = ("auto", "native", "sign-file")
+# Tree runs checkpoint after every batch of this many modules
+TREE_BATCH = 64
 
 
 def _choose_log_file() -> Path:
@@ -61,7 +76,8 @@ logger = logging.getLogger(__name__)
 
 
 class PhoenixGuardModuleSigner:
-    def __init__(self, cert_path: Optional[str] = None, key_path: Optional[str] = None):
+    def __init__(self, cert_path: Optional[str] = None, key_path: Optional[str] = None, engine: str = "auto",
+                 manifest: Optional[SigningManifest] = None, backup_store: Optional[BackupStore] = None):
         # Allow env override, then CLI, then defaults
         env_cert = os.environ.get("KMOD_CERT") or os.environ.get("PG_KMOD_CERT")
         env_key = os.environ.get("KMOD_KEY") or os.environ.get("PG_KMOD_KEY")
@@ -75,6 +91,19 @@ class PhoenixGuardModuleSigner:
             f"/usr/src/kernels/{rel}/scripts/sign-file",
         ]
         self.signing_log: List[Dict[str, Any]] = []
+        # Batch workers append to the log and share one sign-file lookup
+        self._lock = threading.Lock()
+        self._sign_file: Optional[str] = None
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown signing engine: {engine}")
+        self.engine = engine
+        # hash_algo -> ModuleSigner (None: fall back to sign-file)
+        self._native: Dict[str, Optional[ModuleSigner]] = {}
+        # Persistent record of signed modules; unchanged ones are skipped unread
+        self.manifest = manifest
+        self._identity: Optional[Dict[str, str]] = None
+        # Content-addressed pre-sign backups (replaces <module>.unsigned beside each module)
+        self.backup_store = backup_store or BackupStore()
 
         # Pre-resolve certificate paths
         self.cert_file = Path(self.cert_path)
@@ -92,36 +121,42 @@ class PhoenixGuardModuleSigner:
         The struct module_signature has a big-endian 32-bit sig_len field at
         offset 8. We iterate and truncate trailers until no magic is found.
         """
-        magic = b"~Module signature appended~\n"
-        removed = 0
         try:
             with open(module_path, "rb+") as f:
-                while True:
-                    f.seek(0, os.SEEK_END)
-                    size = f.tell()
-                    if size < len(magic) + 12:
-                        break
-                    f.seek(size - len(magic))
-                    tail = f.read(len(magic))
-                    if tail != magic:
-                        break
-                    sig_info_off = size - len(magic) - 12
-                    f.seek(sig_info_off)
-                    sig_hdr = f.read(12)
-                    if len(sig_hdr) != 12:
-                        break
-                    # sig_len is big-endian 32-bit at offset 8
-                    sig_len = int.from_bytes(sig_hdr[8:12], "big", signed=False)
-                    if sig_len <= 0 or sig_len > size:
-                        # Corrupt trailer; stop to avoid damaging the file
-                        break
-                    new_size = sig_info_off - sig_len
-                    if new_size < 0:
-                        break
-                    f.truncate(new_size)
-                    removed += 1
+                return self._strip_signatures(f)
         except Exception as e:
             logger.warning("Failed stripping existing signatures from %s: %s", module_path, e)
+        return 0
+
+    @staticmethod
+    def _strip_signatures(f) -> int:
+        """strip_trailing_signatures() on an open file or BytesIO"""
+        magic = MODULE_SIG_MAGIC
+        removed = 0
+        while True:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size < len(magic) + MODULE_SIG_INFO.size:
+                break
+            f.seek(size - len(magic))
+            tail = f.read(len(magic))
+            if tail != magic:
+                break
+            sig_info_off = size - len(magic) - MODULE_SIG_INFO.size
+            f.seek(sig_info_off)
+            sig_hdr = f.read(MODULE_SIG_INFO.size)
+            if len(sig_hdr) != MODULE_SIG_INFO.size:
+                break
+            # sig_len is big-endian 32-bit at offset 8
+            sig_len = MODULE_SIG_INFO.unpack(sig_hdr)[-1]
+            if sig_len <= 0 or sig_len > size:
+                # Corrupt trailer; stop to avoid damaging the file
+                break
+            new_size = sig_info_off - sig_len
+            if new_size < 0:
+                break
+            f.truncate(new_size)
+            removed += 1
         return removed
 
     def run_command(self, cmd: List[str], check: bool = True) -> subprocess.CompletedProcess:
@@ -170,6 +205,40 @@ class PhoenixGuardModuleSigner:
         logger.error("Could not locate sign-file utility")
         return None
 
+    def sign_file_utility(self) -> Optional[str]:
+        """find_sign_file_utility(), resolved once per signer."""
+        with self._lock:
+            if self._sign_file is None:
+                self._sign_file = self.find_sign_file_utility()
+            return self._sign_file
+
+    def native_signer(self, hash_algo: str = "sha256") -> Optional[ModuleSigner]:
+        """In-process signer with the key loaded once per hash algorithm, or None to use sign-file."""
+        if self.engine == "sign-file":
+            return None
+        with self._lock:
+            if hash_algo not in self._native:
+                try:
+                    self._native[hash_algo] = ModuleSigner(self.cert_path, self.key_path, hash_algo)
+                    logger.info("Native signing with %s (%s)", self.cert_path, hash_algo)
+                except Exception as e:
+                    if self.engine == "native":
+                        raise RuntimeError(f"Native signing unavailable: {e}") from e
+                    logger.info("Native signing unavailable (%s); using sign-file", e)
+                    self._native[hash_algo] = None
+            return self._native[hash_algo]
+
+    def key_identity(self) -> Dict[str, str]:
+        """Fingerprint, serial and CN of the signing certificate (computed once)."""
+        if self._identity is None:
+            self._identity = certificate_identity(self.cert_path)
+        return self._identity
+
+    def _record(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self.signing_log.append(result)
+        return result
+
     @staticmethod
     def calculate_module_hash(module_path: str) -> str:
         """Calculate SHA256 hash of a module file."""
@@ -180,61 +249,78 @@ class PhoenixGuardModuleSigner:
         return h.hexdigest()
 
     def is_module_signed(self, module_path: str) -> bool:
-        """Heuristic: modinfo fields present => signed."""
+        """Signature trailer present (reads the last 40 bytes; no modinfo)."""
         try:
-            result = self.run_command(["modinfo", "-F", "sig_id", module_path], check=False)
-            return bool(result.stdout.strip())
-        except Exception as e:
+            return is_signed(module_path)
+        except OSError as e:
             logger.warning("Could not determine signature status for %s: %s", module_path, e)
             return False
 
+    def module_signature(self, module_path: str) -> Optional[Dict[str, Any]]:
+        """Appended signature with signer, key ID and hash algorithm, or None."""
+        try:
+            sig = read_module_signature(module_path)
+        except OSError as e:
+            logger.warning("Could not read signature of %s: %s", module_path, e)
+            return None
+        return sig._asdict() if sig else None
+
     def sign_kernel_module(self, module_path: str, hash_algo: str = "sha256", force: bool = False) -> Dict[str, Any]:
         """Sign a kernel module with the configured certificate/key."""
         module = Path(module_path).resolve()
         if not module.exists():
             raise FileNotFoundError(f"Module file not found: {module}")
-        if module.suffix != ".ko":
-            raise ValueError(f"Not a kernel module (.ko): {module}")
+        if not is_module_name(module.name):
+            raise ValueError(f"Not a kernel module (.ko, .ko.xz, .ko.gz, .ko.zst): {module}")
         if not Path(self.cert_path).exists():
             raise FileNotFoundError(f"Signing cert not found: {self.cert_path}")
         if not Path(self.key_path).exists():
             raise FileNotFoundError(f"Signing key not found: {self.key_path}")
 
         logger.info("Starting module signing: %s", module)
-        if not force and self.is_module_signed(str(module)):
-            logger.info("Already signed; skipping (use --force to re-sign)")
-            return {
+        if not force and self.manifest and self.manifest.is_current(module, self.key_identity(), hash_algo):
+            logger.info("Unchanged since signed with this key; skipping (manifest)")
+            return self._record({
+                "status": "skipped",
+                "reason": "manifest_current",
+                "module_path": str(module),
+                "timestamp": datetime.now().isoformat(),
+            })
+
+        existing = None if force else self.module_signature(str(module))
+        if existing:
+            logger.info("Already signed by %s; skipping (use --force to re-sign)", existing["signer"] or existing["key_id"])
+            if self.manifest:
+                ours = existing["key_id"] == self.key_identity()["key_id"]
+                self.manifest.record(module, "signed", sig_key=existing["key_id"], signer=existing["signer"],
+                                     hash_algo=existing["hash_algo"],
+                                     key_fingerprint=self.key_identity()["fingerprint"] if ours else None)
+            return self._record({
                 "status": "skipped",
                 "reason": "already_signed",
                 "module_path": str(module),
+                "signer": existing["signer"],
+                "sig_key": existing["key_id"],
                 "timestamp": datetime.now().isoformat(),
-            }
+            })
 
-        sign_file = self.find_sign_file_utility()
-        if not sign_file:
+        native = self.native_signer(hash_algo)
+        sign_file = None if native else self.sign_file_utility()
+        if not native and not sign_file:
             raise RuntimeError("Could not locate sign-file utility")
 
-        pre_hash = self.calculate_module_hash(str(module))
-
-        # Backup original
-        backup_path = module.with_suffix(".ko.unsigned")
-        if not backup_path.exists():
-            import shutil
-            shutil.copy2(module, backup_path)
-            logger.info("Created backup: %s", backup_path)
+        # The only read of the module: pre-sign digest, backup and the bytes to sign
+        backup = self.backup_store.backup(module)
+        pre_hash = backup.sha256.hexdigest()
+        logger.info("Backup %s: %s", "deduplicated" if backup.deduplicated else
+                    "reflinked" if backup.reflinked else "copied", backup.path)
 
         stripped = 0
-        if force:
-            # Ensure re-sign replaces any existing appended signature(s)
-            stripped = self.strip_trailing_signatures(module)
-            if stripped:
-                logger.info("Removed %d existing signature trailer(s) before re-signing", stripped)
-
-        cmd = [sign_file, hash_algo, self.key_path, self.cert_path, str(module)]
         try:
-            self.run_command(cmd)
-            post_hash = self.calculate_module_hash(str(module))
-            if self.is_module_signed(str(module)):
+            stripped, post_hash, signed = self._sign_in_place(module, backup, native, sign_file, hash_algo, force)
+            sig = signature_from_bytes(signed)
+            signature = sig._asdict() if sig else None
+            if signature:
                 result = {
                     "status": "success",
                     "module_path": str(module),
@@ -243,12 +329,20 @@ class PhoenixGuardModuleSigner:
                     "hash_algorithm": hash_algo,
                     "pre_signing_hash": pre_hash,
                     "post_signing_hash": post_hash,
-                    "backup_created": str(backup_path),
+                    "backup_created": str(backup.path),
+                    "backup_reflinked": backup.reflinked,
+                    "backup_deduplicated": backup.deduplicated,
                     "timestamp": datetime.now().isoformat(),
-                    "sign_file_utility": sign_file,
-                    "command_executed": " ".join(cmd),
+                    "engine": "native" if native else "sign-file",
                     "stripped_signatures": stripped,
+                    "signer": signature["signer"],
+                    "sig_key": signature["key_id"],
+                    "sig_hashalgo": signature["hash_algo"],
                 }
+                if not native:
+                    result["sign_file_utility"] = sign_file
+                    result["command_executed"] = " ".join(
+                        [sign_file, hash_algo, self.key_path, self.cert_path, str(module)])
                 logger.info("✅ Module signed successfully")
             else:
                 result = {
@@ -267,25 +361,149 @@ class PhoenixGuardModuleSigner:
             }
             logger.error("❌ Module signing error: %s", e)
 
-        self.signing_log.append(result)
-        return result
+        if self.manifest and module.exists():
+            if result["status"] == "success":
+                self.manifest.record(module, "signed", pre_sha256=pre_hash, post_sha256=post_hash,
+                                     key_fingerprint=self.key_identity()["fingerprint"],
+                                     sig_key=result["sig_key"], signer=result["signer"], hash_algo=hash_algo)
+            else:
+                self.manifest.record(module, "unsigned", pre_sha256=pre_hash,
+                                     error=result.get("error", result.get("reason")))
+        return self._record(result)
 
-    def sign_multiple_modules(self, module_paths: List[str], **kwargs) -> List[Dict[str, Any]]:
-        results: List[Dict[str, Any]] = []
-        logger.info("Batch signing %d module(s)", len(module_paths))
-        for m in module_paths:
+    def _sign_in_place(self, module: Path, backup: Backup, native: Optional[ModuleSigner], sign_file: Optional[str],
+                       hash_algo: str, force: bool) -> Tuple[int, str, bytes]:
+        """
+        Sign the bytes backup() already read and replace the module.
+
+        Returns (trailers stripped, post-sign SHA-256, signed uncompressed
+        module). For a plain .ko signed natively the post-sign digest extends
+        the pre-sign hash state with the trailer, so the module is not hashed
+        twice; compressed modules hash the payload just written, and only the
+        sign-file engine on a plain .ko reads the result back.
+        """
+        data, params = decompress_data(backup.data, module_codec(module))
+        stripped = 0
+        if force:
+            # Ensure re-sign replaces any existing appended signature(s)
+            buf = io.BytesIO(data)
+            stripped = self._strip_signatures(buf)
+            if stripped:
+                logger.info("Removed %d existing signature trailer(s) before re-signing", stripped)
+                data = buf.getvalue()
+
+        if native:
+            trailer = module_signature_trailer(native.signature(data))
+            signed = data + trailer
+        elif params is None:
+            if stripped:
+                write_module(module, data, None)
+            self.run_command([sign_file, hash_algo, self.key_path, self.cert_path, str(module)])
+            signed = module.read_bytes()
+            return stripped, hashlib.sha256(signed).hexdigest(), signed
+        else:
+            # sign-file only takes files: sign an uncompressed copy next to the module
+            unpacked = module.with_name(module.name + ".~unpacked~")
             try:
-                results.append(self.sign_kernel_module(m, **kwargs))
-            except Exception as e:
-                results.append({
-                    "status": "error",
-                    "error": str(e),
+                unpacked.write_bytes(data)
+                self.run_command([sign_file, hash_algo, self.key_path, self.cert_path, str(unpacked)])
+                signed = unpacked.read_bytes()
+            finally:
+                unpacked.unlink(missing_ok=True)
+
+        payload = write_module(module, signed, params)
+        if native and params is None and not stripped:
+            post = backup.sha256.copy()
+            post.update(trailer)
+        else:
+            post = hashlib.sha256(payload)
+        return stripped, post.hexdigest(), signed
+
+    def _sign_one(self, module_path: str, abort: threading.Event, **kwargs) -> Dict[str, Any]:
+        if abort.is_set():
+            return {
+                "status": "cancelled",
+                "reason": "batch_aborted",
+                "module_path": module_path,
+                "timestamp": datetime.now().isoformat(),
+            }
+        try:
+            return self.sign_kernel_module(module_path, **kwargs)
+        except Exception as e:
+            logger.error("Failed to sign %s: %s", module_path, e)
+            return self._record({
+                "status": "error",
+                "error": str(e),
+                "module_path": module_path,
+                "timestamp": datetime.now().isoformat(),
+            })
+
+    def sign_multiple_modules(self, module_paths: List[str], jobs: Optional[int] = None,
+                              fail_fast: bool = False, **kwargs) -> List[Dict[str, Any]]:
+        """
+        Sign modules on a pool of `jobs` workers (default: one per CPU).
+
+        sign-file and hashing run outside the GIL, so threads scale with the
+        CPUs. Results come back in the order of module_paths. With fail_fast,
+        the first failed/error result stops further signing; modules not yet
+        started are reported as "cancelled".
+        """
+        jobs = max(1, min(jobs or os.cpu_count() or 1, len(module_paths) or 1))
+        logger.info("Batch signing %d module(s) with %d worker(s)", len(module_paths), jobs)
+        start = time.monotonic()
+        abort = threading.Event()
+        if not self.native_signer(kwargs.get("hash_algo", "sha256")):
+            self.sign_file_utility()
+
+        def work(module_path: str) -> Dict[str, Any]:
+            result = self._sign_one(module_path, abort, **kwargs)
+            if fail_fast and result.get("status") in ("failed", "error"):
+                abort.set()
+            return result
+
+        if jobs == 1:
+            results = [work(m) for m in module_paths]
+        else:
+            with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="pgmodsign") as pool:
+                results = list(pool.map(work, module_paths))
+
+        ok = len([r for r in results if r.get("status") == "success"])
+        cancelled = len([r for r in results if r.get("status") == "cancelled"])
+        logger.info("Batch complete: %d/%d signed in %.1fs%s", ok, len(module_paths),
+                    time.monotonic() - start, f" ({cancelled} cancelled after a failure)" if cancelled else "")
+        return results
+
+    def sign_tree(self, module_paths: List[str], checkpoint: Optional[TreeCheckpoint] = None,
+                  batch: int = TREE_BATCH, fail_fast: bool = False, **kwargs) -> List[Dict[str, Any]]:
+        """
+        sign_multiple_modules() in batches, checkpointing after each one.
+
+        Modules the checkpoint has as done are not revisited, so an
+        interrupted run resumes with at most one batch to redo (and those
+        modules, already in the manifest, are skipped without being read).
+        """
+        pending = checkpoint.pending(module_paths) if checkpoint else list(module_paths)
+        if len(pending) < len(module_paths):
+            logger.info("Resuming from %s: %d of %d module(s) already done", checkpoint.path,
+                        len(module_paths) - len(pending), len(module_paths))
+        results: List[Dict[str, Any]] = []
+        for i in range(0, len(pending), batch):
+            chunk = pending[i:i + batch]
+            chunk_results = self.sign_multiple_modules(chunk, fail_fast=fail_fast, **kwargs)
+            results.extend(chunk_results)
+            if checkpoint:
+                checkpoint.update(chunk, chunk_results)
+            if fail_fast and any(r.get("status") in ("failed", "error") for r in chunk_results):
+                results.extend({
+                    "status": "cancelled",
+                    "reason": "batch_aborted",
                     "module_path": m,
                     "timestamp": datetime.now().isoformat(),
-                })
-                logger.error("Failed to sign %s: %s", m, e)
-        ok = len([r for r in results if r.get("status") == "success"])
-        logger.info("Batch complete: %d/%d signed", ok, len(module_paths))
+                } for m in pending[i + batch:])
+                break
+        else:
+            if checkpoint:
+                checkpoint.finish()
         return results
 
     def save_signing_log(self, output_file: Optional[str] = None) -> str:
@@ -303,6 +521,7 @@ class PhoenixGuardModuleSigner:
                 "successful_signings": len([r for r in self.signing_log if r.get("status") == "success"]),
                 "failed_signings": len([r for r in self.signing_log if r.get("status") == "failed"]),
                 "errors": len([r for r in self.signing_log if r.get("status") == "error"]),
+                "skipped": len([r for r in self.signing_log if r.get("status") == "skipped"]),
             },
             "signing_events": self.signing_log,
             "environment": {
@@ -328,10 +547,14 @@ def main() -> int:
             "  pgmodsign module.ko                    # Sign single module\n"
             "  pgmodsign *.ko                         # Sign all .ko files\n"
             "  pgmodsign --force module.ko            # Re-sign already signed module\n"
+            "  pgmodsign -j 16 /lib/modules/$(uname -r)  # Sign a tree on 16 workers\n"
+            "  pgmodsign --tree --out-of-tree           # DKMS/extra modules of the running kernel\n"
+            "  pgmodsign --tree 6.8.0-45 --closure nvidia_drm  # A module and its dependencies\n"
         ),
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
-    parser.add_argument("modules", nargs="+", help="Kernel module files or directories to sign (.ko)")
+    parser.add_argument("modules", nargs="*",
+                        help="Kernel module files or directories to sign (.ko, .ko.xz, .ko.gz, .ko.zst)")
     parser.add_argument("--cert-path", help="Path to signing certificate (PEM)")
     parser.add_argument("--key-path", help="Path to signing private key (PEM)")
     parser.add_argument(
@@ -343,23 +566,65 @@ def main() -> int:
     parser.add_argument("--force", "-f", action="store_true", help="Force re-signing of already signed modules")
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose logging")
     parser.add_argument("--output", "-o", help="Output log file path")
+    parser.add_argument(
+        "--engine",
+        default="auto",
+        choices=ENGINES,
+        help="native: in-process PKCS#7 (needs python3-cryptography); sign-file: kernel tool (default: auto)",
+    )
+    parser.add_argument("--manifest", default=str(DEFAULT_MANIFEST_PATH),
+                        help="Signing manifest; modules unchanged since signed with this key are skipped unread")
+    parser.add_argument("--no-manifest", action="store_true", help="Neither consult nor update the manifest")
+    parser.add_argument("--backup-dir", default=str(DEFAULT_BACKUP_DIR),
+                        help="Deduplicated store for pre-signing module backups")
+    parser.add_argument("--restore", action="store_true",
+                        help="Put the original (oldest backed-up) content of the given modules back and exit")
+    parser.add_argument("--jobs", "-j", type=int, help="Modules signed in parallel (default: CPU count)")
+    parser.add_argument("--fail-fast", action="store_true", help="Stop starting new modules after the first failure")
+    parser.add_argument("--tree", nargs="?", const="", metavar="RELEASE|DIR",
+                        help="Sign a kernel's modules as listed in modules.dep (default: running kernel)")
+    parser.add_argument("--loaded", action="store_true", help="--tree: only modules currently loaded")
+    parser.add_argument("--out-of-tree", action="store_true",
+                        help="--tree: only modules not in modules.order (DKMS, extra/, updates/)")
+    parser.add_argument("--closure", action="append", metavar="MODULE",
+                        help="--tree: only MODULE and its dependencies (repeatable)")
+    parser.add_argument("--checkpoint",
+                        help="--tree: progress file for resuming (default: out/cache/tree_signing_<release>.json)")
+    parser.add_argument("--restart", action="store_true", help="--tree: ignore an existing checkpoint")
 
     args = parser.parse_args()
 
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
+    if args.tree is None and (args.loaded or args.out_of_tree or args.closure):
+        parser.error("--loaded, --out-of-tree and --closure need --tree")
+    if (args.tree is None) == (not args.modules):
+        parser.error("give either module files/directories or --tree")
 
     try:
-        signer = PhoenixGuardModuleSigner(args.cert_path, args.key_path)
+        manifest = None if args.no_manifest else SigningManifest(args.manifest)
+        backups = BackupStore(args.backup_dir)
+        signer = PhoenixGuardModuleSigner(args.cert_path, args.key_path, engine=args.engine, manifest=manifest,
+                                          backup_store=backups)
 
         # Expand globs and support directory recursion
         module_files: List[str] = []
+        tree = None
+        if args.tree is not None:
+            tree = ModuleTree(args.tree or None)
+            selected = tree.select(loaded=args.loaded, out_of_tree=args.out_of_tree, closure=args.closure)
+            module_files = [str(m.path) for m in selected]
+            logger.info("%d of %d module(s) selected from %s", len(module_files), len(tree), tree.root)
+            if not module_files:
+                print(f"No modules in {tree.root} match the filters")
+                return 0
+
         for pattern in args.modules:
             path_obj = Path(pattern)
             if path_obj.is_dir():
                 for root, _dirs, files in os.walk(path_obj):
                     for fn in files:
-                        if fn.endswith('.ko'):
+                        if is_module_name(fn):
                             module_files.append(str(Path(root) / fn))
                 continue
             if path_obj.is_absolute():
@@ -371,9 +636,9 @@ def main() -> int:
                         if x.is_dir():
                             for r, _d, fs in os.walk(x):
                                 for fn in fs:
-                                    if fn.endswith('.ko'):
+                                    if is_module_name(fn):
                                         module_files.append(str(Path(r) / fn))
-                        elif x.suffix == '.ko':
+                        elif is_module_name(x.name):
                             module_files.append(str(x))
                 else:
                     # Non-matching glob; allow downstream error to report clearly
@@ -383,25 +648,62 @@ def main() -> int:
             logger.error("No kernel module files specified")
             return 1
 
-        if len(module_files) == 1:
+        if args.restore:
+            missing = 0
+            for m in module_files:
+                restored = backups.restore(m)
+                if restored:
+                    # The restored bytes are not what the manifest says was signed
+                    if manifest:
+                        manifest.forget(Path(m).resolve())
+                    print(f"♻️  {m} <- {restored}")
+                else:
+                    print(f"❌ {m}: no backup in {backups.root}")
+                    missing += 1
+            if manifest:
+                manifest.close()
+            return 1 if missing else 0
+
+        if tree is not None:
+            checkpoint = TreeCheckpoint(args.checkpoint or TreeCheckpoint.default_path(tree), {
+                "tree": str(tree.root),
+                "loaded": args.loaded,
+                "out_of_tree": args.out_of_tree,
+                "closure": sorted(args.closure or []),
+                "hash_algo": args.hash_algo,
+                "force": args.force,
+                "key": signer.key_identity()["fingerprint"],
+            }, restart=args.restart)
+            results = signer.sign_tree(module_files, checkpoint, jobs=args.jobs, fail_fast=args.fail_fast,
+                                       hash_algo=args.hash_algo, force=args.force)
+        elif len(module_files) == 1:
             results = [
                 signer.sign_kernel_module(
                     module_files[0], hash_algo=args.hash_algo, force=args.force
                 )
             ]
         else:
-            results = signer.sign_multiple_modules(module_files, hash_algo=args.hash_algo, force=args.force)
+            results = signer.sign_multiple_modules(module_files, jobs=args.jobs, fail_fast=args.fail_fast,
+                                                   hash_algo=args.hash_algo, force=args.force)
 
         log_file = signer.save_signing_log(args.output)
+        if manifest:
+            manifest.close()
 
         successful = len([r for r in results if r.get("status") == "success"])
         skipped = len([r for r in results if r.get("status") == "skipped"])
         failed = len([r for r in results if r.get("status") in ("failed", "error")])
+        cancelled = len([r for r in results if r.get("status") == "cancelled"])
 
         print("\n📊 Signing Summary:")
         print(f"  ✅ Successfully signed: {successful}")
         print(f"  ⏭️  Skipped (already signed): {skipped}")
+        unchanged = len([r for r in results if r.get("reason") == "manifest_current"])
+        if unchanged:
+            print(f"     of which unchanged per manifest (not read): {unchanged}")
         print(f"  ❌ Failed: {failed}")
+        if cancelled:
+            print(f"  🛑 Not attempted (--fail-fast): {cancelled}")
         print(f"  📄 Log file: {log_file}")
 
         if failed:
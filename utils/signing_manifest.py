@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+PhoenixGuard Module Signing Manifest
+Part of the edk2-bootkit-defense project
+
+Remembers, per module path, what pgmodsign last saw and did: the file's
+size/mtime/ctime after signing, the digest before and after signing, and
+which key (certificate fingerprint, serial, issuer CN) signed it. A batch run
+whose module still has the recorded size and timestamps and whose key has
+not changed skips it without opening the file.
+
+The manifest also answers fleet questions on its own, without touching the
+modules: which modules under a directory are unsigned or carry a
+signature from a key other than the current one.
+
+Usage:
+  python3 utils/signing_manifest.py stale /lib/modules/$(uname -r) --cert out/keys/mok/PGMOK.crt
+  python3 utils/signing_manifest.py summary
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from module_signature import certificate_identity
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_MANIFEST_PATH = REPO_ROOT / "out" / "cache" / "module_signing.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS modules (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    ctime_ns INTEGER NOT NULL,
+    status TEXT NOT NULL,            -- signed | unsigned (signing failed; see error)
+    pre_sha256 TEXT,
+    post_sha256 TEXT,
+    key_fingerprint TEXT,            -- certificate that pgmodsign signed with (NULL if signed elsewhere)
+    sig_key TEXT,                    -- serial / key ID in the signature, as modinfo prints it
+    signer TEXT,
+    hash_algo TEXT,
+    error TEXT,
+    updated_utc TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+COLUMNS = ("path", "size", "mtime_ns", "ctime_ns", "status", "pre_sha256", "post_sha256",
+           "key_fingerprint", "sig_key", "signer", "hash_algo", "error", "updated_utc")
+
+
+def stat_key(st: os.stat_result) -> tuple:
+    return st.st_size, st.st_mtime_ns, st.st_ctime_ns
+
+
+def _under(directory: str) -> tuple:
+    """WHERE clause for paths below a directory (a range scan on the primary key)"""
+    prefix = str(Path(directory).resolve()).rstrip("/") + "/"
+    return "path >= ? AND path < ?", (prefix, prefix[:-1] + "0")     # '0' sorts right after '/'
+
+
+class SigningManifest:
+    """SQLite record of signed modules; safe to share between signing threads"""
+
+    def __init__(self, db_path=DEFAULT_MANIFEST_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _rows(self, sql: str, args=()) -> List[Dict[str, Any]]:
+        with self._lock:
+            cursor = self.conn.execute(sql, args)
+            return [dict(zip(COLUMNS, row)) for row in cursor.fetchall()]
+
+    def lookup(self, path, st: Optional[os.stat_result] = None) -> Optional[Dict[str, Any]]:
+        """The entry for path, if the file still has the recorded size and timestamps"""
+        path = str(path)
+        st = st or os.stat(path)
+        rows = self._rows(f"SELECT {', '.join(COLUMNS)} FROM modules WHERE path = ?", (path,))
+        if rows and (rows[0]["size"], rows[0]["mtime_ns"], rows[0]["ctime_ns"]) == stat_key(st):
+            return rows[0]
+        return None
+
+    def is_current(self, path, identity: Dict[str, str], hash_algo: str,
+                   st: Optional[os.stat_result] = None) -> bool:
+        """Signed by pgmodsign with this certificate and hash, and unchanged since"""
+        entry = self.lookup(path, st)
+        return bool(entry and entry["status"] == "signed" and entry["hash_algo"] == hash_algo
+                    and entry["key_fingerprint"] == identity["fingerprint"])
+
+    def record(self, path, status: str, st: Optional[os.stat_result] = None, **fields) -> None:
+        """Insert or replace the entry for path (fields: pre_sha256, post_sha256, sig_key, ...)"""
+        path = str(path)
+        size, mtime_ns, ctime_ns = stat_key(st or os.stat(path))
+        row = dict.fromkeys(COLUMNS)
+        row.update(fields, path=path, size=size, mtime_ns=mtime_ns, ctime_ns=ctime_ns, status=status,
+                   updated_utc=datetime.utcnow().isoformat())
+        with self._lock, self.conn:
+            self.conn.execute(f"INSERT OR REPLACE INTO modules ({', '.join(COLUMNS)}) "
+                              f"VALUES ({', '.join('?' * len(COLUMNS))})", [row[c] for c in COLUMNS])
+
+    def forget(self, path) -> None:
+        """Drop the entry for path, so the next run reads the module again"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM modules WHERE path = ?", (str(path),))
+
+    def stale(self, directory: str, identity: Dict[str, str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Modules under directory that are unsigned or not signed by identity's key"""
+        where, args = _under(directory)
+        result: Dict[str, List[Dict[str, Any]]] = {"unsigned": [], "other_key": []}
+        for row in self._rows(f"SELECT {', '.join(COLUMNS)} FROM modules WHERE {where} AND "
+                              "(status != 'signed' OR sig_key IS NOT ? OR "
+                              " (key_fingerprint IS NOT NULL AND key_fingerprint != ?)) ORDER BY path",
+                              args + (identity["key_id"], identity["fingerprint"])):
+            result["other_key" if row["status"] == "signed" else row["status"]].append(row)
+        return result
+
+    def summary(self, directory: Optional[str] = None) -> Dict[str, Any]:
+        """Module counts per status and per signing key"""
+        where, args = _under(directory) if directory else ("1", ())
+        with self._lock:
+            by_status = dict(self.conn.execute(
+                f"SELECT status, COUNT(*) FROM modules WHERE {where} GROUP BY status", args).fetchall())
+            by_key = self.conn.execute(
+                f"SELECT sig_key, signer, COUNT(*) FROM modules WHERE {where} AND status = 'signed' "
+                "GROUP BY sig_key, signer ORDER BY 3 DESC", args).fetchall()
+        return {
+            "modules": sum(by_status.values()),
+            "by_status": by_status,
+            "by_key": [{"sig_key": k, "signer": s, "modules": n} for k, s, n in by_key],
+        }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Query the PhoenixGuard module signing manifest")
+    parser.add_argument("--manifest", default=str(DEFAULT_MANIFEST_PATH), help="Manifest database")
+    parser.add_argument("--json", action="store_true", help="JSON output")
+    sub = parser.add_subparsers(dest="command", required=True)
+    st = sub.add_parser("stale", help="Modules that are unsigned or signed by another key")
+    st.add_argument("directory", help="e.g. /lib/modules/<release>")
+    st.add_argument("--cert", default=str(REPO_ROOT / "out" / "keys" / "mok" / "PGMOK.crt"),
+                    help="Current signing certificate")
+    sm = sub.add_parser("summary", help="Counts per status and signing key")
+    sm.add_argument("directory", nargs="?")
+    args = parser.parse_args()
+
+    if not Path(args.manifest).exists():
+        print(f"❌ No signing manifest at {args.manifest}")
+        return 1
+    with SigningManifest(args.manifest) as manifest:
+        if args.command == "summary":
+            summary = manifest.summary(args.directory)
+            if args.json:
+                print(json.dumps(summary, indent=2))
+                return 0
+            print(f"📋 {summary['modules']} module(s): " +
+                  ", ".join(f"{n} {s}" for s, n in sorted(summary["by_status"].items())))
+            for key in summary["by_key"]:
+                print(f"   🔑 {key['signer']} [{key['sig_key']}]: {key['modules']}")
+            return 0
+
+        identity = certificate_identity(args.cert)
+        stale = manifest.stale(args.directory, identity)
+        if args.json:
+            print(json.dumps(stale, indent=2))
+        else:
+            print(f"🔑 Current key: {identity['signer']} [{identity['key_id']}]")
+            for status, label in (("unsigned", "Unsigned"), ("other_key", "Signed by another key")):
+                print(f"{label}: {len(stale[status])}")
+                for row in stale[status]:
+                    why = (f"{row['signer']} [{row['sig_key']}]" if status == "other_key" else row["error"])
+                    print(f"   • {row['path']}" + (f"  ({why})" if why else ""))
+        return 1 if any(stale.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())